@@ -0,0 +1,53 @@
+"""CRC8/sum8 cost of a batch of frames, one by one against the batch API.
+
+Run with ``python -m benchmarks.checksum_bench``.
+"""
+
+import os
+import timeit
+from collections.abc import Callable
+
+from midealocal.checksum import crc8_many, sum8, sum8_many
+from midealocal.crc8 import calculate
+
+NUMBER = 200
+# 0xAA header and body of a typical status frame
+HEADER = bytearray(os.urandom(10))
+BODY = bytearray(os.urandom(24))
+
+
+def _report(name: str, before: float, after: float) -> None:
+    print(
+        f"{name:<22} one by one {before:9.2f} us  batch {after:9.2f} us"
+        f"  x{before / after:.1f}",
+    )
+
+
+def _time(func: Callable[[], object]) -> float:
+    return timeit.timeit(func, number=NUMBER) / NUMBER * 1e6
+
+
+def main() -> None:
+    """Run the benchmark."""
+    _report(
+        "sum8 header+body",
+        _time(lambda: (~sum(HEADER[1:] + BODY) + 1) & 0xFF),
+        _time(lambda: sum8(HEADER[1:], BODY)),
+    )
+    for count in (10, 100, 1000):
+        # a capture replay or a fleet-wide fan-out
+        frames = [os.urandom(34) for _ in range(count)]
+        _report(
+            f"crc8 {count} frames",
+            _time(lambda frames=frames: [calculate(frame) for frame in frames]),
+            _time(lambda frames=frames: crc8_many(frames)),
+        )
+        _report(
+            f"sum8 {count} frames",
+            _time(lambda frames=frames: [(~sum(f) + 1) & 0xFF for f in frames]),
+            _time(lambda frames=frames: sum8_many(frames)),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""ED status body decode cost, hand-written and BodyParser against the table.
+
+"hand-written" is EDMessageBody01, "parsers" the same fields as a BodyParser
+list applied by parse_all() and "table" as a TableMessageBody.
+Run with ``python -m benchmarks.decoder_bench``.
+"""
+
+import os
+import timeit
+from collections.abc import Callable
+
+from midealocal.body_decoder import Field, TableMessageBody
+from midealocal.devices.ed.message import EDMessageBody01
+from midealocal.message import BodyParser, BoolParser, IntParser, MessageBody
+
+NUMBER = 20000
+# ED 0x01 status body
+BODY = bytearray([0x01]) + bytearray(os.urandom(39))
+
+
+def _days(hours: int) -> int:
+    return round(hours / 24)
+
+
+class _Table(TableMessageBody):
+    FIELDS = (
+        Field("power", 2, mask=0x01, boolean=True),
+        Field("water_consumption", 7, length=2),
+        Field("in_tds", 36, length=2),
+        Field("out_tds", 38, length=2),
+        Field("child_lock", 15, boolean=True),
+        Field("filter1", 25, length=2, transform=_days),
+        Field("filter2", 27, length=2, transform=_days),
+        Field("filter3", 29, length=2, transform=_days),
+        Field("life1", 16),
+        Field("life2", 17),
+        Field("life3", 18),
+    )
+
+
+PARSERS: list[BodyParser] = [
+    BoolParser("power", 2, bit=0),
+    IntParser("water_consumption", 7, max_value=0xFFFF, length_in_bytes=2),
+    IntParser("in_tds", 36, max_value=0xFFFF, length_in_bytes=2),
+    IntParser("out_tds", 38, max_value=0xFFFF, length_in_bytes=2),
+    IntParser("child_lock", 15, transform_func=bool),
+    IntParser("filter1", 25, 0xFFFF, length_in_bytes=2, transform_func=_days),
+    IntParser("filter2", 27, 0xFFFF, length_in_bytes=2, transform_func=_days),
+    IntParser("filter3", 29, 0xFFFF, length_in_bytes=2, transform_func=_days),
+    IntParser("life1", 16),
+    IntParser("life2", 17),
+    IntParser("life3", 18),
+]
+
+
+def _time(func: Callable[[], object]) -> float:
+    return timeit.timeit(func, number=NUMBER) / NUMBER * 1e6
+
+
+def main() -> None:
+    """Run the benchmark."""
+    results = {
+        "hand-written body": _time(lambda: EDMessageBody01(BODY)),
+        "BodyParser body": _time(lambda: MessageBody(BODY, PARSERS)),
+        "table body": _time(lambda: _Table(BODY)),
+        "table record only": _time(lambda: _Table.decode(BODY)),
+    }
+    base = results["hand-written body"]
+    for name, us in results.items():
+        print(f"{name:<20} {us:6.2f} us  x{base / us:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Time to sweep a /22 with unicast discovery probes.
+
+The sweep targets 127.1.0.0/22 (loopback, 1022 hosts) with one fake
+appliance answering on 127.1.0.77, so nothing leaves the machine. Probing
+host by host with discover() waits for the 5 s reply window every time.
+Run with ``python -m benchmarks.discover_bench``.
+"""
+
+import asyncio
+from unittest.mock import patch
+
+from midealocal.discover import DISCOVERY_TIMEOUT, iter_sweep
+from midealocal.security import LocalSecurity
+
+NETWORK = "127.1.0.0/22"
+APPLIANCE = "127.1.0.77"
+HOSTS = 1022
+# seconds replies are awaited after the last probe
+LISTEN_TIME = 0.2
+
+
+class _Appliance(asyncio.DatagramProtocol):
+    """Answer every probe with a v2 discovery reply."""
+
+    def __init__(self, reply: bytes) -> None:
+        self.reply = reply
+        self.transport: asyncio.DatagramTransport | None = None
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport  # type: ignore[assignment]
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:  # noqa: ARG002
+        if self.transport is not None:
+            self.transport.sendto(self.reply, addr)
+
+
+def _reply() -> bytes:
+    ssid = b"net_ac_0000"
+    sn = b"000000000" + b"12345678" + b"abbccddeeff" + b"0000"
+    reply = (
+        bytes(8)
+        + sn
+        + bytes([len(ssid)])
+        + ssid
+        + bytes(22)
+        + bytes.fromhex("aabbccddeeff")
+    )
+    header = bytearray(40)
+    header[0:2] = b"\x5a\x5a"
+    header[20:26] = (12345).to_bytes(6, "little")
+    return bytes(header) + bytes(LocalSecurity().aes_encrypt(reply)) + bytes(16)
+
+
+async def _sweep(rate: float, window: int) -> tuple[float, int]:
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(
+        lambda: _Appliance(_reply()),
+        local_addr=(APPLIANCE, 0),
+    )
+    port = transport.get_extra_info("sockname")[1]
+    try:
+        with patch("midealocal.discover.DISCOVERY_PORTS", (port,)):
+            start = loop.time()
+            found = [
+                device
+                async for device in iter_sweep(
+                    [NETWORK],
+                    rate=rate,
+                    window=window,
+                    listen_time=LISTEN_TIME,
+                )
+            ]
+            return loop.time() - start - LISTEN_TIME, len(found)
+    finally:
+        transport.close()
+
+
+def main() -> None:
+    """Run the benchmark."""
+    print(f"host by host: {HOSTS * DISCOVERY_TIMEOUT:9.0f} s")
+    for rate, window in ((500, 32), (2000, 64), (10000, 256)):
+        elapsed, found = asyncio.run(_sweep(rate, window))
+        print(
+            f"sweep rate {rate:>5}/s window {window:>3}: {elapsed:6.2f} s"
+            f"  {HOSTS / elapsed:8.0f} hosts/s  found {found}",
+        )
+
+
+if __name__ == "__main__":
+    main()
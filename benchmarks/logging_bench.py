@@ -0,0 +1,69 @@
+"""AC status frame parse throughput with the library logging at INFO and DEBUG.
+
+Every V2 frame goes through parse_message(): decryption, the debug log of the
+decrypted payload, the response parse and its "Received" log. At INFO none of
+the debug arguments may be formatted, at DEBUG the records are formatted into
+a buffer like a log file handler would. Run with
+``python -m benchmarks.logging_bench``.
+"""
+
+import io
+import logging
+import timeit
+
+from midealocal.const import ProtocolVersion
+from midealocal.devices.ac import MideaACDevice
+from midealocal.packet_builder import PacketBuilder
+
+NUMBER = 5000
+# AC 0xC0 status response: power on, cool, 24.5 degrees, auto fan
+HEADER = bytearray([0xAA, 0x21, 0xAC, 0x00, 0x00, 0x00, 0x00, 0x00, 0x03, 0x03])
+BODY = bytearray([0xC0, 0x01, 0x58, 0x66, 0x00, 0x00, 0x00] + [0x00] * 16)
+
+
+def _device() -> MideaACDevice:
+    device = MideaACDevice(
+        name="Benchmark",
+        device_id=1,
+        ip_address="127.0.0.1",
+        port=6444,
+        token="",
+        key="",
+        device_protocol=ProtocolVersion.V2,
+        model="",
+        subtype=0,
+        customize="",
+    )
+    device._appliance_query = False
+    device._is_run = True
+    return device
+
+
+def _time(device: MideaACDevice, packet: bytes, level: int) -> float:
+    logging.getLogger("midealocal").setLevel(level)
+    return (
+        timeit.timeit(lambda: device.parse_message(packet), number=NUMBER)
+        / NUMBER
+        * 1e6
+    )
+
+
+def main() -> None:
+    """Run the benchmark."""
+    handler = logging.StreamHandler(io.StringIO())
+    handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+    logger = logging.getLogger("midealocal")
+    logger.addHandler(handler)
+    logger.propagate = False
+    frame = HEADER + BODY
+    packet = bytes(PacketBuilder(1, frame + bytes([0x00])).finalize(msg_type=1))
+    device = _device()
+    info = _time(device, packet, logging.INFO)
+    debug = _time(device, packet, logging.DEBUG)
+    print(f"INFO   {info:7.2f} us per frame  {1e6 / info:8.0f} frames/s")
+    print(f"DEBUG  {debug:7.2f} us per frame  {1e6 / debug:8.0f} frames/s")
+    print(f"debug logging costs x{debug / info:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Memory and time of parsing a capture of AC/CD/ED status responses.
+
+"before" copies the body attributes onto the response one by one like the
+previous MessageResponse.set_attr(), "after" is the current implementation.
+Run with ``python -m benchmarks.message_memory_bench``.
+"""
+
+import gc
+import timeit
+import tracemalloc
+from collections.abc import Callable
+from unittest.mock import patch
+
+from midealocal.devices.ac.message import MessageACResponse
+from midealocal.devices.cd.message import MessageCDResponse
+from midealocal.devices.ed.message import MessageEDResponse
+from midealocal.message import MessageResponse
+
+FRAMES = 3000
+
+
+def _frame(device_type: int, message_type: int, body: bytearray) -> bytearray:
+    header = bytearray([0xAA, 0x00, device_type, 0, 0, 0, 0, 0, 0x03, message_type])
+    return header + body + bytearray([0x00])
+
+
+def _capture() -> list[tuple[Callable[[bytearray], MessageResponse], bytearray]]:
+    ac = bytearray([0xC0, 0x01, 0x58, 0x66] + [0x00] * 20)
+    cd = bytearray(63)
+    cd[0], cd[2], cd[3], cd[10] = 0x01, 0x05, 110, 160
+    ed = bytearray(40)
+    ed[0], ed[2] = 0x01, 0x01
+    frames = [
+        (MessageACResponse, _frame(0xAC, 0x03, ac)),
+        (MessageCDResponse, _frame(0xCD, 0x03, cd)),
+        (MessageEDResponse, _frame(0xED, 0x03, ed)),
+    ]
+    return frames * (FRAMES // len(frames))
+
+
+def _legacy_set_attr(self: MessageResponse) -> None:
+    for key in vars(self._body):
+        if key != "data":
+            setattr(self, key, getattr(self._body, key, None))
+
+
+def _measure(capture: list) -> tuple[float, float, float]:
+    """Return retained and transient bytes per frame, and microseconds."""
+    gc.collect()
+    tracemalloc.start()
+    responses = [parse(frame) for parse, frame in capture]
+    retained, _ = tracemalloc.get_traced_memory()
+    transient = 0
+    for parse, frame in capture:
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        parse(frame)
+        transient += tracemalloc.get_traced_memory()[1] - current
+    tracemalloc.stop()
+    del responses
+    us = (
+        timeit.timeit(
+            lambda: [parse(frame) for parse, frame in capture],
+            number=5,
+        )
+        / 5
+        / len(capture)
+        * 1e6
+    )
+    return retained / len(capture), transient / len(capture), us
+
+
+def main() -> None:
+    """Run the benchmark."""
+    capture = _capture()
+    with patch.object(MessageResponse, "set_attr", _legacy_set_attr):
+        before = _measure(capture)
+    after = _measure(capture)
+    for name, unit, old, new in zip(
+        ("retained per frame", "peak per frame", "parse per frame"),
+        ("B", "B", "us"),
+        before,
+        after,
+        strict=True,
+    ):
+        print(f"{name:<20} before {old:8.1f} {unit:<2}  after {new:8.1f} {unit}")
+
+
+if __name__ == "__main__":
+    main()
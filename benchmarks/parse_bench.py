@@ -0,0 +1,91 @@
+"""AC status response throughput, before and after the attribute plans.
+
+"Before" probes every attribute of the device on the response like the
+previous update_attributes_from_message(), "after" goes through the compiled
+plan. Run with ``python -m benchmarks.parse_bench``.
+"""
+
+import timeit
+from collections.abc import Callable
+from typing import Any
+
+from midealocal.const import ProtocolVersion
+from midealocal.device import SKIP_ATTRIBUTE
+from midealocal.devices.ac import MideaACDevice
+from midealocal.devices.ac.message import MessageACResponse
+
+NUMBER = 20000
+# AC 0xC0 status response: power on, cool, 24.5 degrees, auto fan
+HEADER = bytearray([0xAA, 0x00, 0xAC, 0x00, 0x00, 0x00, 0x00, 0x00, 0x03, 0x03])
+BODY = bytearray([0xC0, 0x01, 0x58, 0x66, 0x00, 0x00, 0x00] + [0x00] * 16)
+
+
+def _unplanned(
+    device: MideaACDevice,
+    message: object,
+    translators: dict[str, Callable[[Any], Any]],
+) -> dict[str, Any]:
+    new_status: dict[str, Any] = {}
+    for status in device._attributes:
+        if hasattr(message, str(status)):
+            value = getattr(message, str(status))
+            if status in translators:
+                value = translators[status](value)
+            if value is SKIP_ATTRIBUTE:
+                continue
+            device._attributes[status] = value
+            new_status[str(status)] = value
+    return new_status
+
+
+def _report(
+    name: str,
+    before: Callable[[], object],
+    after: Callable[[], object],
+) -> None:
+    before_us = timeit.timeit(before, number=NUMBER) / NUMBER * 1e6
+    after_us = timeit.timeit(after, number=NUMBER) / NUMBER * 1e6
+    print(
+        f"{name:<28} before {before_us:6.2f} us  after {after_us:6.2f} us"
+        f"  x{before_us / after_us:.1f}",
+    )
+
+
+def main() -> None:
+    """Run the benchmark."""
+    device = MideaACDevice(
+        name="Benchmark",
+        device_id=1,
+        ip_address="127.0.0.1",
+        port=6444,
+        token="",
+        key="",
+        device_protocol=ProtocolVersion.V3,
+        model="",
+        subtype=0,
+        customize="",
+    )
+    frame = HEADER + BODY
+    message = MessageACResponse(frame)
+    translators: dict[str, Callable[[Any], Any]] = {
+        "wind_lr_angle": MideaACDevice._wind_lr_angles.get,
+        "wind_ud_angle": MideaACDevice._wind_ud_angles.get,
+    }
+    print(f"{len(device._attributes)} attributes, response of {len(BODY)} bytes")
+    _report(
+        "attribute projection",
+        lambda: _unplanned(device, message, translators),
+        lambda: device.update_attributes_from_message(message, translators),
+    )
+    _report(
+        "parse and projection",
+        lambda: _unplanned(device, MessageACResponse(frame), translators),
+        lambda: device.update_attributes_from_message(
+            MessageACResponse(frame),
+            translators,
+        ),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""AC B1 new protocol body parse, byte by byte copies against the TLV index.
+
+"before" is NewProtocolMessageBody.parse() as it was before index(), "index"
+returns views of every param and "index one tag" only the asked one. The
+"XBX body" rows decode the whole AC body, with the previous parse patched in
+for "before".
+Run with ``python -m benchmarks.tlv_bench``.
+"""
+
+import timeit
+from collections.abc import Callable
+from unittest.mock import patch
+
+from midealocal.devices.ac.message import NewProtocolTags, XBXMessageBody
+from midealocal.message import (
+    ListTypes,
+    NewProtocolMessageBody,
+    NewProtocolPackLength,
+)
+
+NUMBER = 20000
+TAGS = [
+    NewProtocolTags.indirect_wind,
+    NewProtocolTags.indoor_humidity,
+    NewProtocolTags.breezeless,
+    NewProtocolTags.screen_display,
+    NewProtocolTags.fresh_air_1,
+    NewProtocolTags.wind_lr_angle,
+    NewProtocolTags.wind_ud_angle,
+    NewProtocolTags.rate_select,
+    NewProtocolTags.out_silent,
+    NewProtocolTags.buzzer_all,
+    NewProtocolTags.error_code_query,
+    NewProtocolTags.self_clean,
+]
+# B1 body: a 2 bytes value per tag, five bytes packing
+BODY = bytearray([0xB1, len(TAGS)]) + b"".join(
+    NewProtocolMessageBody.pack(tag, bytearray([0x02, 0x01]), pack_len=5)
+    for tag in TAGS
+)
+
+
+def _legacy_parse(
+    body: NewProtocolMessageBody,
+    _: object = None,
+) -> dict[int, bytearray]:
+    data = body.data
+    result = {}
+    pos = 2
+    for _ in range(data[1]):
+        if pos + 2 > len(data):
+            break
+        param = data[pos] + (data[pos + 1] << 8)
+        pos += 2
+        if body._pack_len == NewProtocolPackLength.FIVE:
+            if pos >= len(data):
+                break
+            pos += 1
+        if pos >= len(data):
+            break
+        length = data[pos]
+        pos += 1
+        if length > 0:
+            if pos + length > len(data):
+                break
+            result[param] = bytearray(data[pos : pos + length])
+            pos += length
+    # built for the debug log whatever the level
+    {hex(k): v for k, v in result.items()}
+    return result
+
+
+def _time(func: Callable[[], object]) -> float:
+    return timeit.timeit(func, number=NUMBER) / NUMBER * 1e6
+
+
+def main() -> None:
+    """Run the benchmark."""
+    body = NewProtocolMessageBody(BODY, ListTypes.B1)
+    with patch.object(NewProtocolMessageBody, "index", _legacy_parse):
+        xbx_before = _time(lambda: XBXMessageBody(BODY, ListTypes.B1))
+    results = {
+        "before": _time(lambda: _legacy_parse(body)),
+        "parse": _time(body.parse),
+        "index": _time(body.index),
+        "index one tag": _time(lambda: body.index((NewProtocolTags.self_clean,))),
+        "XBX body before": xbx_before,
+        "XBX body": _time(lambda: XBXMessageBody(BODY, ListTypes.B1)),
+    }
+    base = results["before"]
+    print(f"{len(TAGS)} params, body of {len(BODY)} bytes")
+    for name, us in results.items():
+        if name == "XBX body before":
+            base = us
+        print(f"{name:<16} {us:6.2f} us  x{base / us:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,565 @@
+"""Midea local asyncio device transport."""
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections.abc import Callable, Iterable, Mapping
+from types import TracebackType
+from typing import Any, Self, cast
+
+from .const import ProtocolVersion
+from .device import (
+    QUERY_PROBE_RETRIES,
+    QUERY_TIMEOUT,
+    RESPONSE_TIMEOUT,
+    SOCKET_TIMEOUT,
+    AuthException,
+    MessageResult,
+    MideaDevice,
+    NoSupportedProtocol,
+    ResponseException,
+)
+from .exceptions import SocketException
+from .message import MessageRequest
+
+_LOGGER = logging.getLogger(__name__)
+
+# service loop wake-up period, drives the refresh/heartbeat checks
+SERVICE_TICK = 1.0
+
+
+class StatusChanges:
+    """Async iterator over the status changes of a device.
+
+    Changes published while the consumer is busy are merged, the latest value
+    of a key wins, so a slow consumer neither blocks the device nor lets a
+    backlog grow. Use as a context manager to unsubscribe when done.
+    """
+
+    def __init__(
+        self,
+        device: MideaDevice,
+        attributes: Iterable[str] | None = None,
+        debounce: float = 0.0,
+    ) -> None:
+        """Initialize status changes.
+
+        ``debounce`` waits that many seconds after a change for more of them
+        before yielding the batch.
+        """
+        self._debounce = debounce
+        self._pending: dict[str, Any] = {}
+        self._ready = asyncio.Event()
+        self._closed = False
+        self._unsubscribe = device.subscribe(self._changed, attributes)
+
+    def _changed(self, changes: dict[str, Any]) -> None:
+        self._pending.update(changes)
+        self._ready.set()
+
+    def close(self) -> None:
+        """Unsubscribe, iteration ends once the pending changes are consumed."""
+        self._unsubscribe()
+        self._closed = True
+        self._ready.set()
+
+    def __enter__(self) -> Self:
+        """Enter the subscription."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Leave the subscription."""
+        self.close()
+
+    def __aiter__(self) -> Self:
+        """Return the iterator."""
+        return self
+
+    async def __anext__(self) -> dict[str, Any]:
+        """Wait for and return the next batch of changes."""
+        await self._ready.wait()
+        if self._debounce and not self._closed:
+            await asyncio.sleep(self._debounce)
+        if not self._pending:
+            raise StopAsyncIteration
+        changes, self._pending = self._pending, {}
+        if not self._closed:
+            self._ready.clear()
+        return changes
+
+
+class AsyncMideaDevice(asyncio.BufferedProtocol):
+    """Drive a MideaDevice from an asyncio event loop instead of its own thread.
+
+    The wrapped device is never started as a thread: its framing, encryption,
+    ``build_query``/``process_message`` and ``update_all`` are reused as-is,
+    only the socket I/O and the timers move onto the running event loop. Many
+    devices can therefore share a single thread. Callbacks registered with
+    ``register_update`` or ``subscribe`` are invoked from the event loop.
+    """
+
+    def __init__(
+        self,
+        device: MideaDevice,
+        *,
+        scheduled: bool = False,
+        limiter: asyncio.Semaphore | None = None,
+    ) -> None:
+        """Initialize asyncio device transport.
+
+        ``scheduled`` hands the refresh/heartbeat timers over to an external
+        scheduler (see ``DeviceManager``); ``limiter`` bounds the protocol
+        probe and polls shared with other devices.
+        """
+        self._device = device
+        self._scheduled = scheduled
+        self._limiter = limiter
+        self._task: asyncio.Task[None] | None = None
+        self._disconnected: asyncio.Future[None] | None = None
+        self._auth_waiter: asyncio.Future[bytes] | None = None
+        self._query_waiter: asyncio.Future[MessageResult] | None = None
+        # one exchange awaiting a response at a time: probe, poll or command
+        self._exchange = asyncio.Lock()
+        self._last_received = 0.0
+
+    @property
+    def device(self) -> MideaDevice:
+        """Wrapped device."""
+        return self._device
+
+    @property
+    def device_id(self) -> int:
+        """Device ID."""
+        return self._device.device_id
+
+    @property
+    def available(self) -> bool:
+        """Device available."""
+        return self._device.available
+
+    @property
+    def connected(self) -> bool:
+        """Whether a connection to the device is open."""
+        return self._device._transport is not None
+
+    def register_update(self, update: Callable[[dict[str, Any]], None]) -> None:
+        """Register update."""
+        self._device.register_update(update)
+
+    def unregister_update(self, update: Callable[[dict[str, Any]], None]) -> None:
+        """Unregister update."""
+        self._device.unregister_update(update)
+
+    def subscribe(
+        self,
+        update: Callable[[dict[str, Any]], None],
+        attributes: Iterable[str] | None = None,
+    ) -> Callable[[], None]:
+        """Register update for the changed status keys only, return unsubscribe."""
+        return self._device.subscribe(update, attributes)
+
+    def changes(
+        self,
+        attributes: Iterable[str] | None = None,
+        debounce: float = 0.0,
+    ) -> StatusChanges:
+        """Return an async iterator over batches of status changes."""
+        return StatusChanges(self._device, attributes, debounce)
+
+    def set_attribute(self, attr: str, value: bool | float | str) -> None:
+        """Set attribute, the frame is queued on the transport without blocking."""
+        self._device.set_attribute(attr, value)
+
+    def set_attributes(self, attributes: Mapping[str, bool | float | str]) -> None:
+        """Set attributes, in one frame per message family."""
+        self._device.set_attributes(attributes)
+
+    async def apply(self, attr: str, value: bool | float | str) -> bool:
+        """Set attribute and wait for the device to answer, return whether it did.
+
+        Commands to the device are applied one after the other, each awaiting
+        its response, so they take effect in order. False is returned at once
+        when the change needs no frame.
+        """
+        async with self._exchange:
+            if not self.connected:
+                return False
+            written = self._device._frames_written
+            self._device.set_attribute(attr, value)
+            if self._device._frames_written == written:
+                _LOGGER.debug("[%s] Nothing sent to set %s", self.device_id, attr)
+                return False
+            # set after the write, without awaiting in between, so only a
+            # frame received after the command can answer it
+            waiter = asyncio.get_running_loop().create_future()
+            self._query_waiter = waiter
+            try:
+                async with asyncio.timeout(QUERY_TIMEOUT):
+                    result = await waiter
+            except TimeoutError:
+                _LOGGER.debug("[%s] No response to set %s", self.device_id, attr)
+                return False
+            finally:
+                self._query_waiter = None
+            return bool(result == MessageResult.SUCCESS)
+
+    # asyncio.BufferedProtocol callbacks, received bytes go straight into the
+    # device's stream buffer
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        """Attach the new connection to the wrapped device."""
+        self._device._transport = cast("asyncio.WriteTransport", transport)
+        self._last_received = time.monotonic()
+        self._disconnected = asyncio.get_running_loop().create_future()
+        _LOGGER.debug("[%s] Connected", self.device_id)
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        """Get free space of the device's receive buffer."""
+        return self._device._buffer.get_buffer(sizehint)
+
+    def buffer_updated(self, nbytes: int) -> None:
+        """Parse the bytes received into the buffer."""
+        self._device._buffer.buffer_updated(nbytes)
+        self._received()
+
+    def data_received(self, data: bytes) -> None:
+        """Feed received bytes to the device parser."""
+        self._device._buffer.feed(data)
+        self._received()
+
+    def _received(self) -> None:
+        """Handle the bytes pending in the device's receive buffer."""
+        self._last_received = time.monotonic()
+        buffer = self._device._buffer
+        if self._auth_waiter is not None and not self._auth_waiter.done():
+            self._auth_waiter.set_result(bytes(buffer))
+            buffer.clear()
+            return
+        try:
+            result = self._device._parse_buffer()
+        except Exception as e:
+            _LOGGER.exception(
+                "[%s] Unexpected error parsing message",
+                self.device_id,
+                exc_info=e,
+            )
+            self._abort(e)
+            # the bad bytes would stay ahead of every later chunk, start over
+            # on a new connection
+            self._device.close_socket()
+            return
+        if self._query_waiter is not None and result != MessageResult.PADDING:
+            if not self._query_waiter.done():
+                self._query_waiter.set_result(result)
+        elif result == MessageResult.ERROR:
+            _LOGGER.debug("[%s] Message 'ERROR' received", self.device_id)
+            self._device.close_socket()
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        """Release the connection and wake up every waiter."""
+        _LOGGER.debug("[%s] Connection lost: %s", self.device_id, exc)
+        self._device._transport = None
+        self._abort(exc or ConnectionResetError("Connection closed by peer."))
+        if self._disconnected is not None and not self._disconnected.done():
+            self._disconnected.set_result(None)
+
+    def _abort(self, exc: BaseException) -> None:
+        """Fail pending auth/query waiters with exc."""
+        for waiter in (self._auth_waiter, self._query_waiter):
+            if waiter is not None and not waiter.done():
+                waiter.set_exception(exc)
+
+    # connection handling, mirrors MideaDevice.connect()/authenticate()
+
+    async def connect(self, check_protocol: bool = False) -> bool:
+        """Connect to device."""
+        device = self._device
+        connected = False
+        try:
+            _LOGGER.debug(
+                "[%s] Connecting to %s:%s",
+                self.device_id,
+                device._ip_address,
+                device._port,
+            )
+            async with asyncio.timeout(SOCKET_TIMEOUT):
+                await asyncio.get_running_loop().create_connection(
+                    lambda: self,
+                    device._ip_address,
+                    device._port,
+                )
+            if device._device_protocol_version == ProtocolVersion.V3:
+                await self.authenticate()
+            if check_protocol:
+                if device._restore_capabilities():
+                    await self.refresh_status()
+                else:
+                    await self.refresh_status(check_protocol=check_protocol)
+                    await asyncio.to_thread(device._store_capabilities)
+            connected = True
+        except TimeoutError:
+            _LOGGER.debug("[%s] Connection timed out", self.device_id)
+        except OSError:
+            _LOGGER.debug("[%s] Connection error", self.device_id)
+        except AuthException:
+            _LOGGER.debug("[%s] Authentication failed", self.device_id)
+        except SocketException:
+            _LOGGER.debug("[%s] Connect socket exception", self.device_id)
+        except NoSupportedProtocol:
+            _LOGGER.debug("[%s] No supported query protocol", self.device_id)
+        except Exception as e:
+            _LOGGER.exception(
+                "[%s] Unknown error during connect device",
+                self.device_id,
+                exc_info=e,
+            )
+        finally:
+            if not connected:
+                device.close_socket()
+        if check_protocol:
+            device.set_available(connected)
+        return connected
+
+    async def authenticate(self) -> None:
+        """Authenticate to device. V3 only."""
+        transport = self._device._transport
+        if transport is None:
+            raise SocketException
+        waiter = asyncio.get_running_loop().create_future()
+        self._auth_waiter = waiter
+        try:
+            _LOGGER.debug("[%s] Authentication handshaking", self.device_id)
+            transport.write(self._device._auth_request())
+            async with asyncio.timeout(SOCKET_TIMEOUT):
+                response = await waiter
+        finally:
+            self._auth_waiter = None
+        # a rejected token is dropped from the key cache, file I/O
+        await asyncio.to_thread(self._device._auth_complete, response)
+
+    async def _query(self, cmd: MessageRequest) -> None:
+        """Send a query and wait for its response, retrying once on timeout."""
+        attempt = 0
+        while True:
+            waiter = asyncio.get_running_loop().create_future()
+            self._query_waiter = waiter
+            try:
+                self._device.build_send(cmd, query=True)
+                async with asyncio.timeout(QUERY_TIMEOUT):
+                    result = await waiter
+            except TimeoutError:
+                attempt += 1
+                if attempt >= QUERY_PROBE_RETRIES:
+                    raise
+                continue
+            finally:
+                self._query_waiter = None
+            if result != MessageResult.SUCCESS:
+                raise ResponseException
+            return
+
+    async def _pipelined_probe(self, cmds: list) -> list:
+        """Send the supported queries back to back and collect the responses.
+
+        Mirrors MideaDevice._pipelined_probe(), returns the queries left
+        without a response.
+        """
+        device = self._device
+        pending = [
+            cmd
+            for cmd in cmds
+            if cmd.__class__.__name__ not in device._unsupported_protocol
+        ]
+        if not pending:
+            return cmds
+        sent = list(pending)
+        device._responses = []
+        try:
+            for cmd in sent:
+                device.build_send(cmd, query=True)
+            async with asyncio.timeout(QUERY_TIMEOUT):
+                while pending:
+                    waiter = asyncio.get_running_loop().create_future()
+                    self._query_waiter = waiter
+                    result = await waiter
+                    if result == MessageResult.ERROR:
+                        break
+                    device._match_responses(pending)
+        except TimeoutError:
+            pass
+        finally:
+            self._query_waiter = None
+            device._responses = None
+        _LOGGER.debug(
+            "[%s] pipelined probe, %s of %s queries answered",
+            self.device_id,
+            len(sent) - len(pending),
+            len(sent),
+        )
+        return [cmd for cmd in cmds if cmd not in sent or cmd in pending]
+
+    async def refresh_status(self, check_protocol: bool = False) -> None:
+        """Refresh device status.
+
+        Without ``check_protocol`` the supported queries are only written, their
+        responses are parsed as they arrive. With it every query is awaited
+        and the ones that time out are marked unsupported for the connection.
+        With pipelined refresh enabled the queries are first sent back to back,
+        only the unanswered ones are then awaited one at a time.
+        """
+        device = self._device
+        cmds, real_cmds = device._query_commands()
+        if check_protocol and device._pipelined_refresh:
+            cmds = await self._pipelined_probe(cmds)
+        unsupported = device._unsupported_protocol
+        error_count = 0
+        for cmd in cmds:
+            if cmd.__class__.__name__ in unsupported:
+                _LOGGER.debug(
+                    "[%s] refresh_status with cmd: %s, unsupported protocol, SKIP",
+                    self.device_id,
+                    cmd,
+                )
+                if cmd in real_cmds:
+                    error_count += 1
+                continue
+            if not check_protocol:
+                device.build_send(cmd, query=True)
+                continue
+            try:
+                await self._query(cmd)
+            except TimeoutError:
+                if cmd in real_cmds:
+                    error_count += 1
+                unsupported.append(cmd.__class__.__name__)
+                _LOGGER.debug(
+                    "[%s] Does not supports the protocol %s, cmd %s, ignored",
+                    self.device_id,
+                    cmd.__class__.__name__,
+                    cmd,
+                )
+            except ResponseException:
+                if cmd in real_cmds:
+                    error_count += 1
+                _LOGGER.debug(
+                    "[%s] refresh_status ResponseException %s, cmd %s",
+                    self.device_id,
+                    cmd.__class__.__name__,
+                    cmd,
+                )
+        if real_cmds and error_count == len(real_cmds):
+            _LOGGER.debug(
+                "[%s] all the query cmds failed %s, please report bug",
+                self.device_id,
+                cmds,
+            )
+            raise NoSupportedProtocol
+
+    # service loop, mirrors MideaDevice.run()
+
+    def open(self) -> None:
+        """Start the service task on the running event loop."""
+        if not self._device._is_run:
+            self._device._is_run = True
+            self._task = asyncio.get_running_loop().create_task(
+                self._run(),
+                name=f"midea-{self.device_id}",
+            )
+
+    async def close(self) -> None:
+        """Stop the service task and close the connection."""
+        self._device._is_run = False
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        self._device.close_socket()
+
+    async def _connect_loop(self) -> None:
+        """Connect loop until device online."""
+        connection_retries = 0
+        while not self.connected and self._device._should_run():
+            async with self._exchange, self._limiter or contextlib.nullcontext():
+                connected = await self.connect(check_protocol=True)
+            if connected:
+                return
+            connection_retries += 1
+            sleep_time = min(5 * (2 ** (connection_retries - 1)), 600)
+            _LOGGER.warning(
+                "[%s] Unable to connect, sleep %s seconds and retry",
+                self.device_id,
+                sleep_time,
+            )
+            await asyncio.sleep(sleep_time)
+
+    async def poll(self) -> None:
+        """Send the refresh queries and wait, bounded, for the first response."""
+        async with self._exchange:
+            waiter = asyncio.get_running_loop().create_future()
+            self._query_waiter = waiter
+            try:
+                async with self._limiter or contextlib.nullcontext():
+                    await self.refresh_status()
+                    async with asyncio.timeout(QUERY_TIMEOUT):
+                        await waiter
+            except TimeoutError:
+                _LOGGER.debug("[%s] No response to refresh", self.device_id)
+            finally:
+                self._query_waiter = None
+
+    async def _revalidate(self) -> None:
+        """Probe again the protocols of a stale stored record."""
+        device = self._device
+        device._revalidate_capabilities = False
+        device._unsupported_protocol = []
+        async with self._exchange, self._limiter or contextlib.nullcontext():
+            await self.refresh_status(check_protocol=True)
+        await asyncio.to_thread(device._store_capabilities)
+
+    def _service_tick(self, now: float) -> None:
+        """Run the periodic refresh/heartbeat checks."""
+        if self._scheduled:
+            return
+        self._device._check_refresh(now)
+        self._device._check_heartbeat(now)
+
+    async def _service_loop(self) -> None:
+        """Keep the connection alive until it drops or times out."""
+        device = self._device
+        disconnected = self._disconnected
+        if disconnected is None:
+            return
+        device._previous_refresh = device._previous_heartbeat = time.time()
+        while not disconnected.done():
+            try:
+                if device._revalidate_capabilities:
+                    await self._revalidate()
+                self._service_tick(time.time())
+            except NoSupportedProtocol:
+                _LOGGER.debug("[%s] No Supported protocol", self.device_id)
+            except (SocketException, OSError):
+                _LOGGER.debug("[%s] Socket error", self.device_id)
+                device.close_socket()
+                break
+            if time.monotonic() - self._last_received >= (
+                RESPONSE_TIMEOUT * SOCKET_TIMEOUT
+            ):
+                _LOGGER.debug("[%s] Heartbeat timed out", self.device_id)
+                device.close_socket()
+                break
+            await asyncio.wait({disconnected}, timeout=SERVICE_TICK)
+
+    async def _run(self) -> None:
+        """Run the service loop until closed."""
+        while self._device._should_run():
+            await self._connect_loop()
+            if not self._device._should_run():
+                break
+            await self._service_loop()
@@ -0,0 +1,161 @@
+"""Midea local table driven message body decoders.
+
+Most bodies decode fixed positions of the buffer: a byte or a little endian
+word, masked, shifted, maybe scaled or mapped to an enum. Such a body is
+declared as a table of Field, compiled once per table into a single
+generated function returning a compact record, instead of decoding one
+attribute after the other.
+"""
+
+from collections import namedtuple
+from collections.abc import Callable
+from dataclasses import dataclass
+from enum import IntEnum
+from functools import cache
+from typing import Any, ClassVar, NamedTuple
+
+from .message import MessageBody
+
+
+class _Required:
+    def __repr__(self) -> str:
+        return "REQUIRED"
+
+
+# default of the fields a short body can't go without: reading them raises
+# IndexError like the indexing of hand-written decoders
+REQUIRED: Any = _Required()
+
+
+@dataclass(frozen=True)
+class Field:
+    """Position and conversion of a body attribute.
+
+    The raw value is read from length bytes at byte (least significant first
+    unless first_upper), then masked, shifted and converted in this order:
+    boolean (raw != 0), scale, enum (unknown values give default) and
+    transform. default is used when the body is too short.
+    """
+
+    name: str
+    byte: int
+    mask: int | None = None
+    shift: int = 0
+    length: int = 1
+    first_upper: bool = False
+    boolean: bool = False
+    scale: float | None = None
+    enum: type[IntEnum] | None = None
+    transform: Callable[[Any], Any] | None = None
+    default: Any = REQUIRED
+
+
+def _expression(field: Field, index: int, namespace: dict[str, Any]) -> str:
+    positions = range(field.byte, field.byte + field.length)
+    if field.first_upper:
+        positions = positions[::-1]
+    expr = " | ".join(
+        f"b[{byte}] << {8 * i}" if i else f"b[{byte}]"
+        for i, byte in enumerate(positions)
+    )
+    if field.mask is not None:
+        expr = f"({expr}) & {field.mask:#x}"
+    if field.shift:
+        expr = f"({expr}) >> {field.shift}"
+    if field.boolean:
+        expr = f"({expr}) != 0"
+    if field.scale is not None:
+        namespace[f"s{index}"] = field.scale
+        expr = f"({expr}) * s{index}"
+    if field.enum is not None:
+        namespace[f"e{index}"] = {member.value: member for member in field.enum}.get
+        namespace[f"ed{index}"] = None if field.default is REQUIRED else field.default
+        expr = f"e{index}({expr}, ed{index})"
+    if field.transform is not None:
+        namespace[f"t{index}"] = field.transform
+        expr = f"t{index}({expr})"
+    if field.default is not REQUIRED:
+        namespace[f"d{index}"] = field.default
+        expr = f"({expr}) if n > {field.byte + field.length - 1} else d{index}"
+    return expr
+
+
+def _compile(
+    fields: tuple[Field, ...],
+    name: str,
+    record: type | None,
+) -> Callable[..., Any]:
+    namespace: dict[str, Any] = {"Record": record, "new": tuple.__new__}
+    values = [
+        _expression(field, index, namespace) for index, field in enumerate(fields)
+    ]
+    if record is not None:
+        lines = [
+            "def decode(b):",
+            "    n = len(b)",
+            "    return new(Record, (",
+            *(f"        {value}," for value in values),
+            "    ))",
+        ]
+    else:
+        lines = [
+            "def decode(o, b):",
+            "    n = len(b)",
+            *(
+                f"    o.{field.name} = {value}"
+                for field, value in zip(fields, values, strict=True)
+            ),
+        ]
+    # the source only holds field names, integer literals and namespace names
+    exec("\n".join(lines), namespace)  # noqa: S102
+    decode: Callable[..., Any] = namespace["decode"]
+    decode.__qualname__ = f"{name}.decode"
+    return decode
+
+
+@cache
+def compile_decoder(
+    fields: tuple[Field, ...],
+    name: str = "Body",
+) -> Callable[[bytes | bytearray], NamedTuple]:
+    """Return a function decoding a body into a record of the fields."""
+    record = namedtuple(f"{name}Record", [field.name for field in fields])  # type: ignore[misc]  # noqa: PYI024
+    return _compile(fields, name, record)
+
+
+@cache
+def compile_setter(
+    fields: tuple[Field, ...],
+    name: str = "Body",
+) -> Callable[[object, bytes | bytearray], None]:
+    """Return a function decoding a body into attributes of an object."""
+    return _compile(fields, name, None)
+
+
+class TableMessageBody(MessageBody):
+    """Message body decoded from its FIELDS table.
+
+    The decoders are compiled once per class, every field becomes an
+    attribute of the body and record holds them all.
+    """
+
+    FIELDS: ClassVar[tuple[Field, ...]] = ()
+    # record of the fields of a body buffer, without building the body
+    decode: ClassVar[Callable[[bytes | bytearray], NamedTuple]]
+    _set_fields: ClassVar[Callable[[object, bytes | bytearray], None]]
+
+    def __init_subclass__(cls, **kwargs: object) -> None:
+        """Compile the decoders of the class."""
+        super().__init_subclass__(**kwargs)
+        cls.decode = staticmethod(compile_decoder(cls.FIELDS, cls.__name__))
+        cls._set_fields = staticmethod(compile_setter(cls.FIELDS, cls.__name__))
+
+    def __init__(self, body: bytearray) -> None:
+        """Initialize table message body."""
+        super().__init__(body)
+        type(self)._set_fields(self, body)  # noqa: SLF001
+
+    @property
+    def record(self) -> NamedTuple:
+        """Record of the fields."""
+        return type(self).decode(self._data)
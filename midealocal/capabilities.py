@@ -0,0 +1,98 @@
+"""Midea local persistent protocol capability store.
+
+The protocol probe run on every connection (every query class, with a retry
+on timeout, plus the appliance query for the message protocol version) costs
+up to ``2 * QUERY_TIMEOUT`` per unsupported query. Its outcome only depends
+on the appliance, so it is kept in a JSON file and reused on warm starts.
+"""
+
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from .json_store import JsonFile
+
+# layout version of the file, bump when CapabilityRecord changes
+STORE_VERSION = 1
+# records older than this are ignored and the device is probed again
+DEFAULT_MAX_AGE = 7 * 24 * 3600
+# records older than this are used but revalidated once the device is online
+DEFAULT_REVALIDATE_AGE = 24 * 3600
+
+
+@dataclass
+class CapabilityRecord:
+    """Outcome of a protocol probe."""
+
+    message_protocol_version: int
+    unsupported_protocol: list[str]
+    # device type specific capabilities, e.g. the AC B5 capabilities
+    extra: dict[str, Any] = field(default_factory=dict)
+    updated_at: float = field(default_factory=time.time)
+
+
+class CapabilityStore:
+    """JSON file backed store of probe outcomes, shared by many devices."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_age: float = DEFAULT_MAX_AGE,
+        revalidate_age: float = DEFAULT_REVALIDATE_AGE,
+    ) -> None:
+        """Initialize capability store."""
+        self._file = JsonFile(path, STORE_VERSION, "capability store", indent=2)
+        self._max_age = max_age
+        self._revalidate_age = revalidate_age
+        self._records: dict[str, CapabilityRecord] | None = None
+
+    @staticmethod
+    def key(device_id: int, model: str, subtype: int, protocol: int) -> str:
+        """Return the record key of a device."""
+        return f"{device_id}/{model}/{subtype}/{protocol}"
+
+    @staticmethod
+    def _parse(data: dict[str, Any]) -> dict[str, CapabilityRecord]:
+        return {
+            key: CapabilityRecord(**record) for key, record in data["devices"].items()
+        }
+
+    def _load(self) -> dict[str, CapabilityRecord]:
+        if self._records is None:
+            self._records = self._file.read(self._parse) or {}
+        return self._records
+
+    def _save(self, records: dict[str, CapabilityRecord]) -> None:
+        self._file.write(
+            {"devices": {key: asdict(record) for key, record in records.items()}},
+        )
+
+    def get(self, key: str) -> CapabilityRecord | None:
+        """Return the record of key, None if missing or expired."""
+        with self._file.lock:
+            record = self._load().get(key)
+        if record is None or time.time() - record.updated_at >= self._max_age:
+            return None
+        return record
+
+    def is_stale(self, record: CapabilityRecord) -> bool:
+        """Return whether the record should be revalidated."""
+        return time.time() - record.updated_at >= self._revalidate_age
+
+    def set(self, key: str, record: CapabilityRecord) -> None:
+        """Store the record of key."""
+        with self._file.locked():
+            # the records stored by other processes are kept
+            self._records = None
+            records = self._load()
+            records[key] = record
+            self._save(records)
+
+    def discard(self, key: str) -> None:
+        """Forget the record of key, the device is probed on next connection."""
+        with self._file.locked():
+            self._records = None
+            records = self._load()
+            if records.pop(key, None) is not None:
+                self._save(records)
@@ -5,6 +5,7 @@ import contextlib
 import inspect
 import json
 import logging
+import os
 import sys
 from argparse import ArgumentParser, BooleanOptionalAction, Namespace
 from pathlib import Path
@@ -21,6 +22,7 @@ from midealocal.cloud import (
     get_midea_cloud,
     get_preset_account_cloud,
 )
+from midealocal.cloud_session import CloudSessionStore
 from midealocal.const import ProtocolVersion
 from midealocal.device import (
     AuthException,
@@ -30,6 +32,8 @@ from midealocal.device import (
 from midealocal.devices import device_selector
 from midealocal.discover import SERIAL_TYPE1_LENGTH, discover
 from midealocal.exceptions import SocketException
+from midealocal.key_cache import KeyCache
+from midealocal.replay import DEVICE_PORT, read_capture, replay
 from midealocal.version import __version__
 
 _LOGGER = logging.getLogger("cli")
@@ -39,11 +43,33 @@ LOG_FORMAT = (
 )
 
 
+# environment variable holding the key cache secret, the password otherwise
+KEY_CACHE_SECRET_ENV = "MIDEA_KEY_CACHE_SECRET"  # noqa: S105
+
+
 class MideaCLI:
     """Midea CLI."""
 
     session: aiohttp.ClientSession
     namespace: Namespace
+    key_cache: KeyCache | None
+
+    def _get_key_cache(self) -> KeyCache | None:
+        """Get the key cache given with --key-cache, if any."""
+        if hasattr(self, "key_cache"):
+            return self.key_cache
+        self.key_cache = None
+        path = getattr(self.namespace, "key_cache", None)
+        if path:
+            secret = os.environ.get(KEY_CACHE_SECRET_ENV) or self.namespace.password
+            if secret:
+                self.key_cache = KeyCache(path, secret)
+            else:
+                _LOGGER.warning(
+                    "Key cache needs %s or a password, not using it.",
+                    KEY_CACHE_SECRET_ENV,
+                )
+        return self.key_cache
 
     async def _get_cloud(self) -> MideaCloud:
         """Get cloud instance."""
@@ -58,19 +84,22 @@ class MideaCLI:
             default_cloud = get_preset_account_cloud()
             default_cloud_name = get_default_cloud()
             _LOGGER.info("Using preset account.")
-            return get_midea_cloud(
+            cloud = get_midea_cloud(
                 cloud_name=default_cloud_name,
                 session=self.session,
                 account=default_cloud["username"],
                 password=default_cloud["password"],
             )
-
-        return get_midea_cloud(
-            cloud_name=self.namespace.cloud_name,
-            session=self.session,
-            account=self.namespace.username,
-            password=self.namespace.password,
-        )
+        else:
+            cloud = get_midea_cloud(
+                cloud_name=self.namespace.cloud_name,
+                session=self.session,
+                account=self.namespace.username,
+                password=self.namespace.password,
+            )
+        if session_file := getattr(self.namespace, "session_file", None):
+            cloud.set_session_store(CloudSessionStore(session_file))
+        return cloud
 
     async def _get_keys(self, device_id: int) -> dict[int, dict[str, Any]]:
         cloud = await self._get_cloud()
@@ -84,6 +113,41 @@ class MideaCLI:
 
         return {**cloud_keys, **default_keys}
 
+    async def _get_keys_many(
+        self,
+        device_ids: list[int],
+    ) -> dict[int, dict[int, dict[str, Any]]]:
+        """Get the keys of many devices with a single cloud login.
+
+        Keys found in the key cache are used as is, only the other devices are
+        looked up in the cloud.
+        """
+        cloud = await self._get_cloud()
+        default_keys = await cloud.get_default_keys()
+        keys = dict.fromkeys(device_ids, default_keys)
+        cache = self._get_key_cache()
+        missing = []
+        for device_id in device_ids:
+            # the cache derives its key and locks its file, off the event loop
+            if cache is not None and (
+                cached_keys := await asyncio.to_thread(cache.get, device_id)
+            ):
+                keys[device_id] = {**cached_keys, **default_keys}
+            else:
+                missing.append(device_id)
+        if not missing:
+            return keys
+        if not await cloud.login():
+            _LOGGER.warning(
+                "Failed to authenticate to the cloud. Using only default keys.",
+            )
+            return keys
+        async for device_id, cloud_keys in cloud.get_cloud_keys_many(missing):
+            keys[device_id] = {**cloud_keys, **default_keys}
+            if cache is not None and cloud_keys:
+                await asyncio.to_thread(cache.set, device_id, cloud_keys)
+        return keys
+
     async def discover(self) -> list[MideaDevice]:
         """Discover device information."""
         device_list: list[MideaDevice] = []
@@ -100,12 +164,16 @@ class MideaCLI:
         if getattr(self.namespace, "get_sn", False):
             _LOGGER.info("Found devices: %s", devices)
             return device_list
+        # fetch the keys of every V3 device at once
+        v3_keys = await self._get_keys_many(
+            [
+                device["device_id"]
+                for device in devices.values()
+                if device["protocol"] == ProtocolVersion.V3
+            ],
+        )
         for device in devices.values():
-            keys = (
-                {0: {"token": "", "key": ""}}
-                if device["protocol"] != ProtocolVersion.V3
-                else await self._get_keys(device["device_id"])
-            )
+            keys = v3_keys.get(device["device_id"], {0: {"token": "", "key": ""}})
 
             for key in keys.values():
                 dev = device_selector(
@@ -123,6 +191,7 @@ class MideaCLI:
                     mac=device["mac"],
                     serial_number=device["sn"],
                 )
+                dev.set_key_cache(self._get_key_cache())
                 _LOGGER.debug("Opening socket for device.")
                 if dev.connect():
                     success = False
@@ -172,6 +241,34 @@ class MideaCLI:
 
         _LOGGER.info("Parsed message: %s", result)
 
+    def replay(self) -> None:
+        """Replay a capture of device traffic and report its decode cost."""
+        streams = read_capture(self.namespace.capture, self.namespace.port)
+        device = device_selector(
+            device_id=self.namespace.device_id,
+            name="",
+            device_type=self.namespace.device_type,
+            ip_address="192.168.192.168",
+            port=self.namespace.port,
+            device_protocol=ProtocolVersion(self.namespace.protocol),
+            model="0000",
+            token=self.namespace.token,
+            key=self.namespace.key,
+            subtype=0,
+            customize="",
+        )
+        report = replay(
+            device,
+            streams,
+            repeat=self.namespace.repeat,
+            trace_allocations=self.namespace.allocations,
+        )
+        _LOGGER.info(
+            "Replayed %s:\n%s",
+            self.namespace.capture,
+            "\n".join(report.lines()),
+        )
+
     def save(self) -> None:
         """Save credentials to config file."""
         data = {
@@ -359,6 +456,11 @@ def main() -> NoReturn:
         help="Set Cloud name",
         choices=SUPPORTED_CLOUDS.keys(),
     )
+    common_parser.add_argument(
+        "--session-file",
+        type=str,
+        help="Reuse the cloud login session stored in this file.",
+    )
 
     # Setup discover parser
     discover_parser = subparsers.add_parser(
@@ -371,6 +473,14 @@ def main() -> NoReturn:
         help="Hostname or IP address of a single device to discover.",
         default=None,
     )
+    discover_parser.add_argument(
+        "--key-cache",
+        help=(
+            "File caching the cloud tokens and keys, encrypted with "
+            f"{KEY_CACHE_SECRET_ENV} or the password."
+        ),
+        default=None,
+    )
     discover_parser.add_argument(
         "--get_sn",
         help="Get device SN with host ip.",
@@ -391,6 +501,51 @@ def main() -> NoReturn:
     )
     decode_msg_parser.set_defaults(func=cli.message)
 
+    replay_parser = subparsers.add_parser(
+        "replay",
+        description="Replay captured device traffic and report its decode cost.",
+        parents=[common_parser],
+    )
+    replay_parser.add_argument(
+        "capture",
+        help="pcap or JSON lines (.jsonl) capture of the device traffic.",
+    )
+    replay_parser.add_argument(
+        "--device-type",
+        help="Device type in hexadecimal, e.g. ac.",
+        type=lambda value: int(value, 16),
+        required=True,
+    )
+    replay_parser.add_argument(
+        "--protocol",
+        help="Device protocol version.",
+        type=int,
+        default=ProtocolVersion.V3,
+        choices=[ProtocolVersion.V2, ProtocolVersion.V3],
+    )
+    replay_parser.add_argument("--device-id", help="Device ID", type=int, default=0)
+    replay_parser.add_argument("--token", help="V3 token of the capture.", default="")
+    replay_parser.add_argument("--key", help="V3 key of the capture.", default="")
+    replay_parser.add_argument(
+        "--port",
+        help="TCP port of the device in the pcap capture.",
+        type=int,
+        default=DEVICE_PORT,
+    )
+    replay_parser.add_argument(
+        "--repeat",
+        help="Number of times the capture is replayed.",
+        type=int,
+        default=1,
+    )
+    replay_parser.add_argument(
+        "--allocations",
+        help="Trace the memory allocated while decoding.",
+        default=True,
+        action=BooleanOptionalAction,
+    )
+    replay_parser.set_defaults(func=cli.replay)
+
     save_parser = subparsers.add_parser(
         "save",
         description="Save config file with cloud parameters.",
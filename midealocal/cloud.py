@@ -1,29 +1,52 @@
 """Midea Local cloud."""
 
+import asyncio
 import base64
+import contextlib
 import json
 import logging
 import re
+import shutil
 import time
-from asyncio import Lock
+from asyncio import Lock, Semaphore
+from collections.abc import AsyncIterator, Iterable, Mapping
+from dataclasses import dataclass, field
 from datetime import UTC, datetime
-from http import HTTPStatus
+from hashlib import sha256
+from pathlib import Path
 from secrets import token_hex
 from typing import Any, cast
 
 import aiofiles
-from aiohttp import ClientConnectionError, ClientSession, ClientTimeout
+from aiohttp import ClientSession
 
 from midealocal.exceptions import ElementMissing
 
+from .cloud_session import CloudSessionStore
+from .cloud_transport import CloudTransport
+from .download_cache import DownloadCache
 from .security import (
     CloudSecurity,
     MeijuCloudSecurity,
     MideaAirSecurity,
     MSmartCloudSecurity,
+    StreamDecryptor,
 )
 
 SN8_MIN_SERIAL_LENGTH = 17
+# default bound of concurrent getToken requests of get_cloud_keys_many()
+KEYS_MAX_CONCURRENCY = 8
+# error codes answered to a request made with an expired session: 3106 by the
+# Midea Air API, 40001 by the MAS API, the request is retried after a login
+SESSION_EXPIRED_CODES = frozenset({3106, 40001})
+# bytes read at a time from a Lua or plugin download
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# transport stats entry of the Lua and plugin downloads
+DOWNLOAD_ENDPOINT = "download"
+# default bound of concurrent requests of download_lua_many()
+DOWNLOAD_MAX_CONCURRENCY = 8
+# prepended to every decrypted Lua file
+LUA_HEADER = b'local bit = require "bit"\n'
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -154,6 +177,64 @@ def _redact_data(data: str) -> str:
     return data
 
 
+@dataclass
+class InventoryDiff:
+    """Changes between two appliance inventories, by appliance id."""
+
+    added: dict[int, dict[str, Any]] = field(default_factory=dict)
+    removed: dict[int, dict[str, Any]] = field(default_factory=dict)
+    # current information of the appliances whose online status changed
+    online_changed: dict[int, dict[str, Any]] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        """Return whether anything changed."""
+        return bool(self.added or self.removed or self.online_changed)
+
+
+def diff_inventory(
+    previous: Mapping[int, dict[str, Any]],
+    current: Mapping[int, dict[str, Any]],
+) -> InventoryDiff:
+    """Return the changes from the previous inventory to the current one."""
+    diff = InventoryDiff()
+    for appliance_id, info in current.items():
+        if (old := previous.get(appliance_id)) is None:
+            diff.added[appliance_id] = info
+        elif old.get("online") != info.get("online"):
+            diff.online_changed[appliance_id] = info
+    for appliance_id, info in previous.items():
+        if appliance_id not in current:
+            diff.removed[appliance_id] = info
+    return diff
+
+
+class _LuaDecoder:
+    """Decrypt a Lua file received in chunks, with unix line endings."""
+
+    def __init__(self, decryptor: StreamDecryptor) -> None:
+        self._decryptor = decryptor
+        self._header = LUA_HEADER
+        self._cr = False
+
+    def update(self, chunk: bytes) -> bytes:
+        if not chunk:
+            return b""
+        header, self._header = self._header, b""
+        return header + self._normalize(self._decryptor.update(chunk.decode("ascii")))
+
+    def finalize(self) -> bytes:
+        return self._normalize(self._decryptor.finalize(), final=True)
+
+    def _normalize(self, data: bytes, final: bool = False) -> bytes:
+        if self._cr:
+            data = b"\r" + data
+        # a \r ending the chunk may start a \r\n split over two chunks
+        self._cr = not final and data.endswith(b"\r")
+        if self._cr:
+            data = data[:-1]
+        return data.replace(b"\r\n", b"\n")
+
+
 class MideaCloud:
     """Midea Cloud."""
 
@@ -170,7 +251,9 @@ class MideaCloud:
         """Initialize Midea Cloud."""
         self._device_id = CloudSecurity.get_deviceid(account)
         self._session = session
+        self._transport = CloudTransport(session)
         self._security = security
+        # serializes the logins, the requests themselves run concurrently
         self._api_lock = Lock()
         self._app_id = app_id
         self._app_key = app_key
@@ -180,17 +263,41 @@ class MideaCloud:
         self._access_token: str | None = None
         self._uid: str | None = None
         self._login_id = ""
+        # (key, iv) given to the security by the last login
+        self._aes_keys: tuple[str, str] | None = None
+        self._session_store: CloudSessionStore | None = None
+        # decrypted serial numbers by ciphertext, valid for the current keys
+        self._sn_cache: dict[str, str] = {}
+        self._inventory: dict[int, dict[str, Any]] = {}
 
     def _make_general_data(self) -> dict[Any, Any]:
         return {}
 
+    @property
+    def transport(self) -> CloudTransport:
+        """Return the HTTP transport of the API requests."""
+        return self._transport
+
+    def set_transport(self, transport: CloudTransport) -> None:
+        """Share a transport, its rate limits and stats, with other clouds."""
+        self._transport = transport
+        self._session = transport.session
+
+    def _refresh_session_data(self, data: dict[str, Any]) -> dict[str, Any]:
+        """Update the session fields of a request data after a new login."""
+        if "uid" in data:
+            data["uid"] = self._uid
+        return data
+
     async def _api_request(
         self,
         endpoint: str,
         data: dict[str, Any],
         header: dict[str, Any] | None = None,
+        relogin: bool = True,
     ) -> dict | None:
         header = header or {}
+        access_token = self._access_token
         if not data.get("reqId"):
             data.update({"reqId": token_hex(16)})
         if not data.get("stamp"):
@@ -211,36 +318,31 @@ class MideaCloud:
         )
         if self._uid is not None:
             header.update({"uid": self._uid})
-        if self._access_token is not None:
-            header.update({"accessToken": self._access_token})
-        response: dict = {"code": -1}
-        for _ in range(3):
-            try:
-                async with self._api_lock:
-                    r = await self._session.request(
-                        "POST",
-                        url,
-                        headers=header,
-                        data=dump_data,
-                        timeout=ClientTimeout(10),
-                    )
-                    raw = await r.read()
-                    _LOGGER.debug(
-                        "Midea cloud API url: %s, \n data: %s, \n response: %s",
-                        url,
-                        _redact_data(str(data)),
-                        _redact_data(str(raw)),
-                    )
-                    response = json.loads(raw)
-                    break
-            except (TimeoutError, ClientConnectionError, json.JSONDecodeError) as e:
-                _LOGGER.warning(
-                    "Midea cloud API error, url: %s, error: %s",
-                    url,
-                    repr(e),
-                )
-        if int(response["code"]) == 0 and "data" in response:
+        if access_token is not None:
+            header.update({"accessToken": access_token})
+        response = await self._transport.post(url, endpoint, header, dump_data)
+        _LOGGER.debug(
+            "Midea cloud API url: %s, \n data: %s, \n response: %s",
+            url,
+            _redact_data(str(data)),
+            _redact_data(str(response)),
+        )
+        response = response or {"code": -1}
+        code = int(response["code"])
+        if code == 0 and "data" in response:
             return cast("dict", response["data"])
+        if (
+            relogin
+            and code in SESSION_EXPIRED_CODES
+            and access_token is not None
+            and await self._relogin(access_token)
+        ):
+            return await self._api_request(
+                endpoint,
+                self._refresh_session_data(data),
+                header,
+                relogin=False,
+            )
         return None
 
     async def _get_login_id(self) -> str | None:
@@ -254,44 +356,206 @@ class MideaCloud:
         return None
 
     async def login(self) -> bool:
-        """Authenticate."""
+        """Authenticate, reusing the stored session if there is one."""
+        # concurrent logins would interleave the session tokens they set
+        async with self._api_lock:
+            if await self._restore_session():
+                return True
+            # a stale token would be rejected and trigger _relogin(), which
+            # waits for the lock held here
+            self._reset_session()
+            if await self._login():
+                await self._store_session()
+                return True
+            return False
+
+    async def _relogin(self, access_token: str) -> bool:
+        """Log in again after the API rejected access_token."""
+        async with self._api_lock:
+            if self._access_token != access_token:
+                # a concurrent request already logged in again
+                return self._access_token is not None
+            if await self._restore_session() and self._access_token != access_token:
+                # another process already logged in again
+                return True
+            _LOGGER.debug("Cloud session expired for device %s", self._device_id)
+            self._reset_session()
+            if await self._login():
+                await self._store_session()
+                return True
+            if self._session_store is not None:
+                await asyncio.to_thread(self._session_store.discard, self._session_key)
+            return False
+
+    async def _login(self) -> bool:
         raise NotImplementedError
 
+    def set_session_store(self, store: CloudSessionStore | None) -> None:
+        """Set the store sharing the login session with other instances."""
+        self._session_store = store
+
+    @property
+    def _session_key(self) -> str:
+        return f"{self._app_id}/{self._account}"
+
+    def _set_aes_keys(self, key: str | bytes, iv: str | bytes) -> None:
+        """Set the AES keys of the session."""
+        if isinstance(key, bytes):
+            key = key.decode("ascii")
+        if isinstance(iv, bytes):
+            iv = iv.decode("ascii")
+        self._aes_keys = (key, iv)
+        self._security.set_aes_keys(key, iv)
+        self._sn_cache.clear()
+
+    def _decrypt_sn(self, sn: str) -> str:
+        """Decrypt a serial number, each ciphertext is decrypted only once."""
+        if (plain := self._sn_cache.get(sn)) is None:
+            plain = self._sn_cache[sn] = self._security.aes_decrypt(sn)
+        return plain
+
+    def _export_session(self) -> dict[str, Any]:
+        """Return the login session to store."""
+        return {
+            "access_token": self._access_token,
+            "uid": self._uid,
+            "login_id": self._login_id,
+            "api_url": self._api_url,
+            "aes_keys": self._aes_keys,
+        }
+
+    def _import_session(self, session: dict[str, Any]) -> None:
+        """Restore a stored login session."""
+        self._access_token = session["access_token"]
+        self._uid = session["uid"]
+        self._login_id = session["login_id"]
+        self._api_url = session["api_url"]
+        if aes_keys := session["aes_keys"]:
+            self._set_aes_keys(*aes_keys)
+
+    def _reset_session(self) -> None:
+        """Forget the login session."""
+        self._access_token = None
+        self._uid = None
+        self._login_id = ""
+        self._aes_keys = None
+
+    async def _restore_session(self) -> bool:
+        """Apply the stored session, return whether there was one."""
+        if self._session_store is None:
+            return False
+        # keep the file I/O off the event loop
+        session = await asyncio.to_thread(self._session_store.get, self._session_key)
+        if not session or not session.get("access_token"):
+            return False
+        try:
+            self._import_session(session)
+        except (KeyError, TypeError, ValueError) as e:
+            _LOGGER.warning("Ignoring stored cloud session: %s", e)
+            self._reset_session()
+            return False
+        _LOGGER.debug("Reusing stored cloud session for device %s", self._device_id)
+        return True
+
+    async def _store_session(self) -> None:
+        """Store the session of a successful login."""
+        if self._session_store is not None:
+            await asyncio.to_thread(
+                self._session_store.set,
+                self._session_key,
+                self._export_session(),
+            )
+
     @staticmethod
     async def get_default_keys() -> dict[int, dict[str, Any]]:
         """Get default cloud keys."""
         return DEFAULT_KEYS
 
-    async def get_cloud_keys(self, appliance_id: int) -> dict[int, dict[str, Any]]:
-        """Get keys for device."""
-        result = {}
-        for method in [1, 2]:
-            udp_id = self._security.get_udp_id(appliance_id, method)
-            data = self._make_general_data()
-            # The MSmartHome ("SmartHome") cloud rejects getToken with
-            # 3004 "value is illegal" unless the appliance id is also sent as
-            # `applianceCodes`; the official app includes it. Harmless on other
-            # clouds, which ignore the extra field.
-            data.update({"udpid": udp_id, "applianceCodes": str(appliance_id)})
+    async def _get_token(
+        self,
+        appliance_id: int,
+        method: int,
+        limiter: Semaphore | None = None,
+    ) -> dict[str, str] | None:
+        """Get the token and key of a UDP ID method, None if not found."""
+        udp_id = self._security.get_udp_id(appliance_id, method)
+        data = self._make_general_data()
+        # The MSmartHome ("SmartHome") cloud rejects getToken with
+        # 3004 "value is illegal" unless the appliance id is also sent as
+        # `applianceCodes`; the official app includes it. Harmless on other
+        # clouds, which ignore the extra field.
+        data.update({"udpid": udp_id, "applianceCodes": str(appliance_id)})
+        async with limiter or contextlib.nullcontext():
             response = await self._api_request(
                 endpoint="/v1/iot/secure/getToken",
                 data=data,
             )
-            _LOGGER.debug(
-                "Response from get_keys() for appliance_id %s with method %s: %s",
-                appliance_id,
-                method,
-                response,
-            )
-            if response and "tokenlist" in response:
-                for token in response["tokenlist"]:
-                    if token["udpId"] == udp_id:
-                        result[method] = {
-                            "token": token["token"].lower(),
-                            "key": token["key"].lower(),
-                        }
+        _LOGGER.debug(
+            "Response from get_keys() for appliance_id %s with method %s: %s",
+            appliance_id,
+            method,
+            response,
+        )
+        result = None
+        if response and "tokenlist" in response:
+            for token in response["tokenlist"]:
+                if token["udpId"] == udp_id:
+                    result = {
+                        "token": token["token"].lower(),
+                        "key": token["key"].lower(),
+                    }
         return result
 
+    async def get_cloud_keys(self, appliance_id: int) -> dict[int, dict[str, Any]]:
+        """Get keys for device."""
+        result = {}
+        for method in [1, 2]:
+            if token := await self._get_token(appliance_id, method):
+                result[method] = token
+        return result
+
+    async def get_cloud_keys_many(
+        self,
+        appliance_ids: Iterable[int],
+        max_concurrency: int = KEYS_MAX_CONCURRENCY,
+    ) -> AsyncIterator[tuple[int, dict[int, dict[str, Any]]]]:
+        """Get keys for many devices, yielding (appliance_id, keys) as completed.
+
+        The getToken requests of every device and method run concurrently, at
+        most max_concurrency at a time. A failed request is logged and its
+        method left out of the keys.
+        """
+        limiter = Semaphore(max_concurrency)
+
+        async def get_keys(appliance_id: int) -> tuple[int, dict[int, dict[str, Any]]]:
+            tokens = await asyncio.gather(
+                *(self._get_token(appliance_id, method, limiter) for method in [1, 2]),
+                return_exceptions=True,
+            )
+            keys = {}
+            for method, token in zip([1, 2], tokens, strict=True):
+                if isinstance(token, BaseException):
+                    _LOGGER.warning(
+                        "Unable to get the token of appliance %s with method %s: %r",
+                        appliance_id,
+                        method,
+                        token,
+                    )
+                elif token:
+                    keys[method] = token
+            return appliance_id, keys
+
+        tasks = [
+            asyncio.create_task(get_keys(appliance_id))
+            for appliance_id in dict.fromkeys(appliance_ids)
+        ]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
     @staticmethod
     async def get_cloud_servers() -> dict[int, str]:
         """Get available cloud servers."""
@@ -308,6 +572,44 @@ class MideaCloud:
         """List appliances."""
         raise NotImplementedError
 
+    async def list_all_appliances(self) -> dict[int, dict[str, Any]] | None:
+        """List the appliances of every home, the homes are listed concurrently.
+
+        Return None if any home could not be listed.
+        """
+        if (homes := await self.list_home()) is None:
+            return None
+        results = await asyncio.gather(
+            *(self.list_appliances(str(home_id)) for home_id in homes),
+        )
+        appliances: dict[int, dict[str, Any]] = {}
+        for result in results:
+            if result is None:
+                return None
+            appliances.update(result)
+        return appliances
+
+    @property
+    def inventory(self) -> dict[int, dict[str, Any]]:
+        """Return the appliances found by the last refresh_inventory()."""
+        return self._inventory
+
+    async def refresh_inventory(
+        self,
+        previous: Mapping[int, dict[str, Any]] | None = None,
+    ) -> InventoryDiff | None:
+        """List every appliance and return the changes since previous.
+
+        previous defaults to the inventory of the last call. Return None,
+        keeping that inventory, if the appliances could not be listed.
+        """
+        if (appliances := await self.list_all_appliances()) is None:
+            return None
+        if previous is None:
+            previous = self._inventory
+        self._inventory = appliances
+        return diff_inventory(previous, appliances)
+
     async def get_device_info(self, device_id: int) -> dict[str, Any] | None:
         """Get device information."""
         if (response := await self.list_appliances(home_id=None)) and (
@@ -316,6 +618,68 @@ class MideaCloud:
             return cast("dict", response[device_id])
         return None
 
+    async def _lua_request(
+        self,
+        device_type: int,
+        sn: str,
+        model_number: str | None,
+        manufacturer_code: str,
+    ) -> dict[str, Any] | None:
+        """Request the url and file name of a lua integration."""
+        raise NotImplementedError
+
+    async def _fetch(
+        self,
+        url: str,
+        fnm: Path,
+        decoder: _LuaDecoder | None = None,
+    ) -> str | None:
+        """Stream url to fnm, return the sha256 of the file, None if not written."""
+        digest = sha256()
+        written = False
+        # written aside, an interrupted download never leaves a partial file
+        tmp = fnm.with_name(f"{fnm.name}.part")
+        async with self._transport.get(url, DOWNLOAD_ENDPOINT) as res:
+            if res is None:
+                return None
+            try:
+                async with aiofiles.open(tmp, "wb") as fp:
+                    async for chunk in res.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                        written = written or bool(chunk)
+                        data = decoder.update(chunk) if decoder else chunk
+                        digest.update(data)
+                        await fp.write(data)
+                    if written and decoder is not None:
+                        data = decoder.finalize()
+                        digest.update(data)
+                        await fp.write(data)
+                if written:
+                    tmp.replace(fnm)
+            finally:
+                tmp.unlink(missing_ok=True)
+        return digest.hexdigest() if written else None
+
+    async def _fetch_lua(
+        self,
+        url: str,
+        fnm: Path,
+        cache: DownloadCache | None = None,
+    ) -> bool:
+        """Download and decrypt a lua file, return whether it was written."""
+        if cache is not None and (cached := await asyncio.to_thread(cache.get, url)):
+            await asyncio.to_thread(shutil.copyfile, cached, fnm)
+            return True
+        digest = await self._fetch(
+            url,
+            fnm,
+            _LuaDecoder(self._security.fixed_key_decryptor()),
+        )
+        if digest is None:
+            return False
+        if cache is not None:
+            await asyncio.to_thread(cache.add, url, fnm, digest)
+        return True
+
     async def download_lua(
         self,
         path: str,
@@ -325,7 +689,73 @@ class MideaCloud:
         manufacturer_code: str = "0000",
     ) -> str | None:
         """Download lua integration."""
-        raise NotImplementedError
+        if response := await self._lua_request(
+            device_type,
+            sn,
+            model_number,
+            manufacturer_code,
+        ):
+            fnm = f"{path}/{response['fileName']}"
+            if await self._fetch_lua(response["url"], Path(fnm)):
+                return fnm
+        return None
+
+    async def download_lua_many(
+        self,
+        path: str,
+        devices: Iterable[tuple[int, str, str | None]],
+        cache: DownloadCache | None = None,
+        max_concurrency: int = DOWNLOAD_MAX_CONCURRENCY,
+    ) -> dict[str, str | None]:
+        """Download the lua integrations of (device_type, sn, model) tuples.
+
+        Return the file of every sn. A file shared by many devices is
+        downloaded once, a file known to cache is not downloaded at all. A
+        failed download is logged and its sn left without file.
+        """
+        limiter = Semaphore(max_concurrency)
+        files: dict[str, asyncio.Task[bool]] = {}
+
+        async def fetch(url: str, fnm: Path) -> bool:
+            async with limiter:
+                return await self._fetch_lua(url, fnm, cache)
+
+        async def download(
+            device_type: int,
+            sn: str,
+            model_number: str | None,
+        ) -> str | None:
+            async with limiter:
+                response = await self._lua_request(
+                    device_type,
+                    sn,
+                    model_number,
+                    "0000",
+                )
+            if not response:
+                return None
+            name = response["fileName"]
+            if name not in files:
+                files[name] = asyncio.create_task(
+                    fetch(response["url"], Path(path, name)),
+                )
+            if await files[name]:
+                return f"{path}/{name}"
+            return None
+
+        unique = {device[1]: device for device in devices}
+        results = await asyncio.gather(
+            *(download(*d) for d in unique.values()),
+            return_exceptions=True,
+        )
+        result: dict[str, str | None] = {}
+        for sn, file in zip(unique, results, strict=True):
+            if isinstance(file, BaseException):
+                _LOGGER.warning("Unable to download the lua of %s: %r", sn, file)
+                result[sn] = None
+            else:
+                result[sn] = file
+        return result
 
     async def download_plugin(
         self,
@@ -377,7 +807,7 @@ class MeijuCloud(MideaCloud):
             "language": "en_US",
         }
 
-    async def login(self) -> bool:
+    async def _login(self) -> bool:
         """Authenticate to Meiju Cloud."""
         if login_id := await self._get_login_id():
             self._login_id = login_id
@@ -412,7 +842,7 @@ class MeijuCloud(MideaCloud):
                 data=data,
             ):
                 self._access_token = response["mdata"]["accessToken"]
-                self._security.set_aes_keys(
+                self._set_aes_keys(
                     self._security.aes_decrypt_with_fixed_key(response["key"]),
                     b"0",
                 )
@@ -455,7 +885,7 @@ class MeijuCloud(MideaCloud):
                             "name": appliance.get("name"),
                             "type": int(appliance.get("type"), 16),
                             "sn": (
-                                self._security.aes_decrypt(appliance.get("sn"))
+                                self._decrypt_sn(appliance.get("sn"))
                                 if appliance.get("sn")
                                 else ""
                             ),
@@ -511,7 +941,7 @@ class MeijuCloud(MideaCloud):
             device_info = {
                 "name": response.get("name"),
                 "type": int(model_type, 16) if model_type else 0,
-                "sn": self._security.aes_decrypt(response.get("sn") or ""),
+                "sn": self._decrypt_sn(response.get("sn") or ""),
                 "sn8": response.get("sn8", "00000000"),
                 "model_number": model_number,
                 "manufacturer_code": response.get("enterpriseCode", "0000"),
@@ -548,15 +978,14 @@ class MeijuCloud(MideaCloud):
             return device_info
         return None
 
-    async def download_lua(
+    async def _lua_request(
         self,
-        path: str,
         device_type: int,
         sn: str,
-        model_number: str | None = None,  # noqa: ARG002
-        manufacturer_code: str = "0000",
-    ) -> str | None:
-        """Download lua integration."""
+        model_number: str | None,  # noqa: ARG002
+        manufacturer_code: str,
+    ) -> dict[str, Any] | None:
+        """Request the url and file name of a lua integration."""
         data = {
             "applianceSn": sn,
             "applianceType": hex(device_type),
@@ -564,24 +993,10 @@ class MeijuCloud(MideaCloud):
             "version": "0",
             "iotAppId": self._app_id,
         }
-        fnm = None
-        if response := await self._api_request(
+        return await self._api_request(
             endpoint="/v1/appliance/protocol/lua/luaGet",
             data=data,
-        ):
-            res = await self._session.get(response["url"])
-            if res.status == HTTPStatus.OK:
-                lua = await res.text()
-                if lua:
-                    stream = (
-                        'local bit = require "bit"\n'
-                        + self._security.aes_decrypt_with_fixed_key(lua)
-                    )
-                    stream = stream.replace("\r\n", "\n")
-                    fnm = f"{path}/{response['fileName']}"
-                    async with aiofiles.open(fnm, "w") as fp:
-                        await fp.write(stream)
-        return str(fnm) if fnm else None
+        )
 
     async def download_plugin(
         self,
@@ -604,7 +1019,7 @@ class MeijuCloud(MideaCloud):
                 ],
             },
         )
-        fnm = None
+        fnm: str | None = None
         if response := await self._api_request(
             endpoint="/v1/plugin/update/getplugin",
             data=data,
@@ -612,16 +1027,11 @@ class MeijuCloud(MideaCloud):
             # get file name from url
             _LOGGER.debug("response: %s, type: %s", response, type(response))
             file_name = response["list"][0]["url"].split("/")[-1]
-            # download plugin from url
-            res = await self._session.get(response["list"][0]["url"])
-            if res.status == HTTPStatus.OK:
-                # get the file content in binary mode
-                plugin = await res.read()
-                if plugin:
-                    fnm = f"{path}/{file_name}"
-                    async with aiofiles.open(fnm, "wb") as fp:
-                        await fp.write(plugin)
-        return str(fnm) if fnm else None
+            # stream the plugin from url to disk
+            fnm = f"{path}/{file_name}"
+            if await self._fetch(response["list"][0]["url"], Path(fnm)) is None:
+                fnm = None
+        return fnm
 
 
 class SmartHomeCloud(MideaCloud):
@@ -674,15 +1084,20 @@ class SmartHomeCloud(MideaCloud):
         endpoint: str,
         data: dict[str, Any],
         header: dict[str, Any] | None = None,
+        relogin: bool = True,
     ) -> dict[str, Any] | None:
         header = header or {}
         header.update(
             {"x-recipe-app": self._app_id, "authorization": f"Basic {self._auth_base}"},
         )
 
-        return await super()._api_request(endpoint, data, header)
+        return await super()._api_request(endpoint, data, header, relogin)
 
     async def _re_route(self) -> None:
+        # the regional url of an account is resolved once per transport
+        if api_url := self._transport.routes.get(self._session_key):
+            self._api_url = api_url
+            return
         data = self._make_general_data()
         data.update({"userType": "0", "userName": f"{self._account}"})
         if (
@@ -692,8 +1107,9 @@ class SmartHomeCloud(MideaCloud):
             )
         ) and (api_url := response.get("masUrl")):
             self._api_url = api_url
+            self._transport.routes[self._session_key] = api_url
 
-    async def login(self) -> bool:
+    async def _login(self) -> bool:
         """Authenticate to MSmart Cloud."""
         await self._re_route()
         if login_id := await self._get_login_id():
@@ -730,7 +1146,7 @@ class SmartHomeCloud(MideaCloud):
             ):
                 self._uid = response["uid"]
                 self._access_token = response["mdata"]["accessToken"]
-                self._security.set_aes_keys(
+                self._set_aes_keys(
                     response["accessToken"],
                     response["randomData"],
                 )
@@ -757,7 +1173,7 @@ class SmartHomeCloud(MideaCloud):
                 device_info = {
                     "name": appliance.get("name"),
                     "type": int(appliance.get("type"), 16),
-                    "sn": self._security.aes_decrypt(appliance.get("sn") or ""),
+                    "sn": self._decrypt_sn(appliance.get("sn") or ""),
                     "sn8": "",
                     "model_number": model_number,
                     "manufacturer_code": appliance.get("enterpriseCode", "0000"),
@@ -775,15 +1191,14 @@ class SmartHomeCloud(MideaCloud):
             return appliances
         return None
 
-    async def download_lua(
+    async def _lua_request(
         self,
-        path: str,
         device_type: int,
         sn: str,
-        model_number: str | None = None,
-        manufacturer_code: str = "0000",
-    ) -> str | None:
-        """Download lua integration."""
+        model_number: str | None,
+        manufacturer_code: str,
+    ) -> dict[str, Any] | None:
+        """Request the url and file name of a lua integration."""
         data = self._make_general_data()
         data.update(
             {
@@ -798,24 +1213,10 @@ class SmartHomeCloud(MideaCloud):
         )
         if model_number is not None:
             data["modelNumber"] = model_number
-        fnm = None
-        if response := await self._api_request(
+        return await self._api_request(
             endpoint="/v2/luaEncryption/luaGet",
             data=data,
-        ):
-            res = await self._session.get(response["url"])
-            if res.status == HTTPStatus.OK:
-                lua = await res.text()
-                if lua:
-                    stream = (
-                        'local bit = require "bit"\n'
-                        + self._security.aes_decrypt_with_fixed_key(lua)
-                    )
-                    stream = stream.replace("\r\n", "\n")
-                    fnm = f"{path}/{response['fileName']}"
-                    async with aiofiles.open(fnm, "w") as fp:
-                        await fp.write(stream)
-        return str(fnm) if fnm else None
+        )
 
     async def download_plugin(
         self,
@@ -837,7 +1238,7 @@ class SmartHomeCloud(MideaCloud):
                 ],
             },
         )
-        fnm = None
+        fnm: str | None = None
         if response := await self._api_request(
             endpoint="/v1/plugin/update/overseas/get",
             data=data,
@@ -845,16 +1246,11 @@ class SmartHomeCloud(MideaCloud):
             # get file name from url
             _LOGGER.debug("response: %s, type: %s", response, type(response))
             file_name = response["result"][0]["url"].split("/")[-1]
-            # download plugin from url
-            res = await self._session.get(response["result"][0]["url"])
-            if res.status == HTTPStatus.OK:
-                # get the file content in binary mode
-                plugin = await res.read()
-                if plugin:
-                    fnm = f"{path}/{file_name}"
-                    async with aiofiles.open(fnm, "wb") as fp:
-                        await fp.write(plugin)
-        return str(fnm) if fnm else None
+            # stream the plugin from url to disk
+            fnm = f"{path}/{file_name}"
+            if await self._fetch(response["result"][0]["url"], Path(fnm)) is None:
+                fnm = None
+        return fnm
 
 
 class MideaAirCloud(MideaCloud):
@@ -894,52 +1290,71 @@ class MideaAirCloud(MideaCloud):
             data.update({"sessionId": self._session_id})
         return data
 
+    def _refresh_session_data(self, data: dict[str, Any]) -> dict[str, Any]:
+        """Update the session fields of a request data after a new login."""
+        # signed again with the new session
+        data.pop("sign", None)
+        if "sessionId" in data:
+            data["sessionId"] = self._session_id
+        return super()._refresh_session_data(data)
+
+    def _export_session(self) -> dict[str, Any]:
+        """Return the login session to store."""
+        return {**super()._export_session(), "session_id": self._session_id}
+
+    def _import_session(self, session: dict[str, Any]) -> None:
+        """Restore a stored login session."""
+        super()._import_session(session)
+        self._session_id = session["session_id"]
+
+    def _reset_session(self) -> None:
+        """Forget the login session."""
+        super()._reset_session()
+        self._session_id = None
+
     async def _api_request(
         self,
         endpoint: str,
         data: dict[str, Any],
         header: dict[str, Any] | None = None,
+        relogin: bool = True,
     ) -> dict[str, Any] | None:
         header = header or {}
+        access_token = self._access_token
         url = self._api_url + endpoint
 
         sign = self._security.sign(url, data, "")
         data.update({"sign": sign})
         if self._uid is not None:
             header.update({"uid": self._uid})
-        if self._access_token is not None:
-            header.update({"accessToken": self._access_token})
-        response: dict = {"errorCode": -1}
-        for _ in range(3):
-            try:
-                async with self._api_lock:
-                    r = await self._session.request(
-                        "POST",
-                        url,
-                        headers=header,
-                        data=data,
-                        timeout=ClientTimeout(10),
-                    )
-                    raw = await r.read()
-                    _LOGGER.debug(
-                        "Midea cloud API url: %s, data: %s, response: %s",
-                        url,
-                        data,
-                        raw,
-                    )
-                    response = json.loads(raw)
-                    break
-            except (TimeoutError, ClientConnectionError, json.JSONDecodeError) as e:
-                _LOGGER.warning(
-                    "Midea cloud API error, url: %s, error: %s",
-                    url,
-                    repr(e),
-                )
-        if int(response["errorCode"]) == 0 and "result" in response:
+        if access_token is not None:
+            header.update({"accessToken": access_token})
+        response = await self._transport.post(url, endpoint, header, data)
+        _LOGGER.debug(
+            "Midea cloud API url: %s, data: %s, response: %s",
+            url,
+            data,
+            response,
+        )
+        response = response or {"errorCode": -1}
+        code = int(response["errorCode"])
+        if code == 0 and "result" in response:
             return cast("dict[str, Any]", response["result"])
+        if (
+            relogin
+            and code in SESSION_EXPIRED_CODES
+            and access_token is not None
+            and await self._relogin(access_token)
+        ):
+            return await self._api_request(
+                endpoint,
+                self._refresh_session_data(data),
+                header,
+                relogin=False,
+            )
         return None
 
-    async def login(self) -> bool:
+    async def _login(self) -> bool:
         """Authenticate to Midea Air Cloud."""
         if login_id := await self._get_login_id():
             self._login_id = login_id
@@ -0,0 +1,53 @@
+"""Midea local persistent cloud login sessions.
+
+A cloud login costs two or three API round trips and every new MideaCloud
+starts without a session. The session (access token, uid, login id and AES
+keys) stays valid until the API rejects it, so it is kept in a JSON file that
+any process using the same account can pick up.
+"""
+
+from pathlib import Path
+from typing import Any
+
+from .json_store import JsonFile
+
+# layout version of the stored sessions
+SESSION_STORE_VERSION = 1
+
+
+class CloudSessionStore:
+    """JSON file backed store of cloud sessions, shared by many processes.
+
+    The file is read again on every lookup, so a session refreshed by another
+    process is picked up instead of logging in once more.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        """Initialize cloud session store."""
+        self._file = JsonFile(
+            path,
+            SESSION_STORE_VERSION,
+            "cloud session store",
+            private=True,
+        )
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        return self._file.read(lambda data: dict(data["sessions"])) or {}
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        """Return the session of key, None if missing."""
+        return self._load().get(key)
+
+    def set(self, key: str, session: dict[str, Any]) -> None:
+        """Store the session of key."""
+        with self._file.locked():
+            sessions = self._load()
+            sessions[key] = session
+            self._file.write({"sessions": sessions})
+
+    def discard(self, key: str) -> None:
+        """Forget the session of key."""
+        with self._file.locked():
+            sessions = self._load()
+            if sessions.pop(key, None) is not None:
+                self._file.write({"sessions": sessions})
@@ -0,0 +1,253 @@
+"""Midea local cloud HTTP transport.
+
+Every cloud API request and download goes through a CloudTransport, which can
+be shared by the MideaCloud instances of many accounts: requests to a cloud
+host are paced by a token bucket, failed attempts are retried with jittered
+exponential backoff and latency and errors are accounted per endpoint.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import random
+import time
+from collections.abc import AsyncIterator, Mapping
+from dataclasses import dataclass
+from http import HTTPStatus
+from typing import Any, cast
+from urllib.parse import urlsplit
+
+from aiohttp import (
+    ClientConnectionError,
+    ClientResponse,
+    ClientSession,
+    ClientTimeout,
+    TCPConnector,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# seconds before a request attempt is abandoned
+API_TIMEOUT = 10
+API_RETRIES = 3
+# upper bound of the first retry delay, doubled every retry, the delay itself
+# is drawn at random below it so throttled clients do not retry in lockstep
+API_RETRY_BACKOFF = 0.2
+# default requests per second and burst allowed to every cloud host
+DEFAULT_RATE = 10.0
+DEFAULT_BURST = 20
+# pooled connections kept alive per cloud host by create_session()
+POOL_LIMIT_PER_HOST = 8
+KEEPALIVE_TIMEOUT = 60
+
+
+def create_session(
+    limit_per_host: int = POOL_LIMIT_PER_HOST,
+    keepalive_timeout: float = KEEPALIVE_TIMEOUT,
+) -> ClientSession:
+    """Create a session pooling keep-alive connections per cloud host."""
+    return ClientSession(
+        connector=TCPConnector(
+            limit_per_host=limit_per_host,
+            keepalive_timeout=keepalive_timeout,
+        ),
+    )
+
+
+class TokenBucket:
+    """Allow rate acquisitions per second, burst of them at once."""
+
+    def __init__(self, rate: float, burst: float) -> None:
+        """Initialize token bucket."""
+        self._rate = rate
+        self._burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self._burst,
+            self._tokens + (now - self._updated) * self._rate,
+        )
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Wait for a token."""
+        # waiters are served in order, one sleeping at a time
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+                self._refill()
+            self._tokens -= 1
+
+    def pause(self, delay: float) -> None:
+        """Hand out no token for delay seconds, e.g. after being throttled."""
+        self._refill()
+        self._tokens = min(self._tokens, 0) - delay * self._rate
+
+
+@dataclass
+class EndpointStats:
+    """Request accounting of an API endpoint."""
+
+    requests: int = 0
+    # requests whose every attempt failed
+    errors: int = 0
+    retries: int = 0
+    latency_total: float = 0.0
+    latency_max: float = 0.0
+
+    @property
+    def latency_mean(self) -> float:
+        """Return the mean latency of the attempts."""
+        attempts = self.requests + self.retries
+        return self.latency_total / attempts if attempts else 0.0
+
+
+class CloudTransport:
+    """HTTP layer of the cloud APIs, shared by many MideaCloud instances."""
+
+    def __init__(
+        self,
+        session: ClientSession,
+        rate: float = DEFAULT_RATE,
+        burst: float = DEFAULT_BURST,
+        host_rates: Mapping[str, float] | None = None,
+    ) -> None:
+        """Initialize cloud transport.
+
+        host_rates overrides the requests per second of some cloud hosts.
+        """
+        self.session = session
+        self._rate = rate
+        self._burst = burst
+        self._host_rates = dict(host_rates or {})
+        self._buckets: dict[str, TokenBucket] = {}
+        self.stats: dict[str, EndpointStats] = {}
+        # regional API url of the accounts, resolved once
+        self.routes: dict[str, str] = {}
+
+    async def _retry_delay(self, stats: EndpointStats, attempt: int) -> None:
+        if attempt:
+            stats.retries += 1
+            await asyncio.sleep(
+                random.uniform(0, API_RETRY_BACKOFF * 2 ** (attempt - 1)),  # noqa: S311
+            )
+
+    def _bucket(self, url: str) -> TokenBucket:
+        host = urlsplit(url).netloc
+        if (bucket := self._buckets.get(host)) is None:
+            rate = self._host_rates.get(host, self._rate)
+            bucket = self._buckets[host] = TokenBucket(rate, self._burst)
+        return bucket
+
+    async def post(
+        self,
+        url: str,
+        endpoint: str,
+        headers: dict[str, Any],
+        data: str | dict[str, Any],
+    ) -> dict[str, Any] | None:
+        """Post data, return the decoded response, None if every attempt failed."""
+        stats = self.stats.setdefault(endpoint, EndpointStats())
+        stats.requests += 1
+        bucket = self._bucket(url)
+        for attempt in range(API_RETRIES):
+            await self._retry_delay(stats, attempt)
+            await bucket.acquire()
+            start = time.monotonic()
+            try:
+                r = await self.session.request(
+                    "POST",
+                    url,
+                    headers=headers,
+                    data=data,
+                    timeout=ClientTimeout(API_TIMEOUT),
+                )
+                if r.status == HTTPStatus.TOO_MANY_REQUESTS:
+                    retry_after = r.headers.get("Retry-After", "")
+                    bucket.pause(float(retry_after) if retry_after.isdigit() else 1)
+                    _LOGGER.warning("Midea cloud API throttled, url: %s", url)
+                    # hand the connection back to the pool before retrying
+                    r.release()
+                    continue
+                return cast("dict[str, Any]", json.loads(await r.read()))
+            except (TimeoutError, ClientConnectionError, ValueError) as e:
+                _LOGGER.warning(
+                    "Midea cloud API error, url: %s, error: %s",
+                    url,
+                    repr(e),
+                )
+            finally:
+                latency = time.monotonic() - start
+                stats.latency_total += latency
+                stats.latency_max = max(stats.latency_max, latency)
+        stats.errors += 1
+        return None
+
+    @contextlib.asynccontextmanager
+    async def get(
+        self,
+        url: str,
+        endpoint: str,
+    ) -> AsyncIterator[ClientResponse | None]:
+        """Get url, yield the response to stream, None if it failed.
+
+        Only the request is retried, not the streaming of its body. The
+        response is released on exit, read to its end or not.
+        """
+        stats = self.stats.setdefault(endpoint, EndpointStats())
+        stats.requests += 1
+        bucket = self._bucket(url)
+        response = None
+        for attempt in range(API_RETRIES):
+            await self._retry_delay(stats, attempt)
+            await bucket.acquire()
+            start = time.monotonic()
+            try:
+                r = await self.session.get(
+                    url,
+                    timeout=ClientTimeout(
+                        sock_connect=API_TIMEOUT,
+                        sock_read=API_TIMEOUT,
+                    ),
+                )
+            except (TimeoutError, ClientConnectionError) as e:
+                _LOGGER.warning(
+                    "Midea cloud download error, url: %s, error: %s",
+                    url,
+                    repr(e),
+                )
+                continue
+            finally:
+                latency = time.monotonic() - start
+                stats.latency_total += latency
+                stats.latency_max = max(stats.latency_max, latency)
+            if r.status == HTTPStatus.TOO_MANY_REQUESTS:
+                retry_after = r.headers.get("Retry-After", "")
+                bucket.pause(float(retry_after) if retry_after.isdigit() else 1)
+                _LOGGER.warning("Midea cloud download throttled, url: %s", url)
+                r.release()
+                continue
+            if r.status == HTTPStatus.OK:
+                response = r
+            else:
+                _LOGGER.warning(
+                    "Midea cloud download failed, url: %s, status: %s",
+                    url,
+                    r.status,
+                )
+                r.release()
+            break
+        if response is None:
+            stats.errors += 1
+            yield None
+            return
+        try:
+            yield response
+        finally:
+            response.release()
@@ -260,8 +260,8 @@ crc8_854_table: list[int] = [
 ]
 
 
-def calculate(data: bytearray) -> int:
-    """Calculate CRC8 value of a bytearray."""
+def calculate(data: bytes | bytearray | memoryview) -> int:
+    """Calculate CRC8 value of a bytes-like object."""
     crc_value: int = 0
     for m in data:
         crc_value = crc8_854_table[crc_value ^ m]
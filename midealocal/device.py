@@ -1,18 +1,29 @@
 """Midea local device."""
 
+import contextlib
+import copy
 import logging
 import socket
 import threading
 import time
-from collections.abc import Callable, Mapping, Sequence
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
 from enum import IntEnum, StrEnum
-from typing import Any, ClassVar, NotRequired, TypedDict, Unpack
+from typing import TYPE_CHECKING, Any, ClassVar, NotRequired, TypedDict, Unpack
 
 from typing_extensions import deprecated
 
+from .capabilities import CapabilityRecord, CapabilityStore
 from .const import DeviceType, ProtocolVersion
-from .exceptions import SocketException
+from .exceptions import (
+    CannotAuthenticate,
+    DataSignDoesntMatch,
+    DataUnexpectedLength,
+    SocketException,
+)
+from .key_cache import KeyCache
 from .message import (
+    HexDump,
     MessageApplianceResponse,
     MessageQueryAppliance,
     MessageQuestCustom,
@@ -25,6 +36,10 @@ from .security import (
     MSGTYPE_HANDSHAKE_REQUEST,
     LocalSecurity,
 )
+from .stream import StreamBuffer
+
+if TYPE_CHECKING:
+    import asyncio
 
 MIN_AUTH_RESPONSE = 20
 MIN_MSG_LENGTH = 56
@@ -40,6 +55,9 @@ QUERY_TIMEOUT = (
 # the whole connection, even when it was just a slow/not-yet-ready device rather
 # than a genuinely unsupported protocol. Give it one more try before giving up on it.
 QUERY_PROBE_RETRIES = 2
+# upper bound of cached query payloads per device, the least recently sent
+# query is evicted first
+QUERY_CACHE_SIZE = 32
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -50,6 +68,13 @@ SKIP_ATTRIBUTE = object()
 _NO_DEFAULT = object()
 
 
+def _snapshot(value: Any) -> Any:  # noqa: ANN401
+    """Copy value if it can be changed in place."""
+    if isinstance(value, list | dict | set):
+        return copy.deepcopy(value)
+    return value
+
+
 def list_translator(
     values: Sequence[str],
     *,
@@ -202,12 +227,23 @@ class MideaDevice(threading.Thread):
         threading.Thread.__init__(self)
         self._attributes = attributes or {}
         self._socket: socket.socket | None = None
+        # Set by AsyncMideaDevice while the device is driven from an event loop;
+        # outgoing frames are then written to it instead of the socket.
+        self._transport: asyncio.WriteTransport | None = None
+        # frames written to the transport, AsyncMideaDevice.apply() checks a
+        # set command went out
+        self._frames_written = 0
         self._ip_address = kwargs["ip_address"]
         self._port = kwargs["port"]
         self._security = LocalSecurity()
         self._token = bytes.fromhex(kwargs["token"])
         self._key = bytes.fromhex(kwargs["key"])
-        self._buffer = b""
+        self._buffer = StreamBuffer()
+        # (serialized, encrypted) query payloads, least recently sent first,
+        # only valid for the protocol/subtype in state; the encryption of a
+        # request with a rolling tail stops before the blocks holding it
+        self._query_cache: OrderedDict[tuple, tuple[bytes, bytes]] = OrderedDict()
+        self._query_cache_state: tuple[int, int] | None = None
         self._device_name = kwargs["name"]
         self._device_id = kwargs["device_id"]
         self._device_type = device_type
@@ -216,10 +252,32 @@ class MideaDevice(threading.Thread):
         self._subtype = kwargs["subtype"]
         self._message_protocol_version: int = 0
         self._updates: list[Callable[[dict[str, Any]], None]] = []
+        # subscribe() callbacks and the attributes they are restricted to
+        self._subscribers: list[
+            tuple[Callable[[dict[str, Any]], None], frozenset[str] | None]
+        ] = []
+        # last value published of every status key, changes are against it
+        self._published: dict[str, Any] = {}
+        # (attribute, field name) pairs carried by each message layout, see
+        # _attribute_plan(), and the number of attributes they were compiled for
+        self._attribute_plans: dict[
+            tuple[type, tuple[str, ...]],
+            tuple[tuple[Any, str], ...],
+        ] = {}
+        self._planned_attributes = 0
         self._unsupported_protocol: list[str] = []
         self._is_run: bool = False
         self._available = False
         self._appliance_query = True
+        self._pipelined_refresh = False
+        # (message type, body type) of the responses received while a
+        # pipelined probe is running, None otherwise
+        self._responses: list[tuple[int, int]] | None = None
+        self._capability_store: CapabilityStore | None = None
+        self._revalidate_capabilities = False
+        self._key_cache: KeyCache | None = None
+        # messages held back by coalesce(), None outside of it
+        self._coalesced: list[MessageRequest] | None = None
         self._refresh_interval = 30
         self._heartbeat_interval = SOCKET_TIMEOUT
         self._default_refresh_interval = 30
@@ -319,18 +377,23 @@ class MideaDevice(threading.Thread):
     @staticmethod
     def fetch_v2_message(msg: bytes) -> tuple[list, bytes]:
         """Fetch V2 message."""
+        buffer = StreamBuffer(len(msg))
+        buffer.feed(msg)
+        result = MideaDevice.fetch_v2_frames(buffer)
+        return result, bytes(buffer)
+
+    @staticmethod
+    def fetch_v2_frames(buffer: StreamBuffer) -> list[bytes]:
+        """Fetch the complete V2 messages, the incomplete tail stays in buffer."""
         result = []
-        while len(msg) > 0:
-            factual_msg_len = len(msg)
-            if factual_msg_len < MIN_V2_FACTUAL_MSG_LENGTH:
+        while len(buffer) >= MIN_V2_FACTUAL_MSG_LENGTH:
+            view = buffer.view()
+            alleged_msg_len = view[4] + (view[5] << 8)
+            if len(view) < alleged_msg_len:
                 break
-            alleged_msg_len = msg[4] + (msg[5] << 8)
-            if factual_msg_len >= alleged_msg_len:
-                result.append(msg[:alleged_msg_len])
-                msg = msg[alleged_msg_len:]
-            else:
-                break
-        return result, msg
+            result.append(bytes(view[:alleged_msg_len]))
+            buffer.consume(alleged_msg_len)
+        return result
 
     def connect(self, check_protocol: bool = False) -> bool:
         """Connect to device."""
@@ -351,7 +414,11 @@ class MideaDevice(threading.Thread):
             # 1. midea_ac_lan add device verify token with connect and auth
             # 2. init connection, check_protocol
             if check_protocol:
-                self.refresh_status(check_protocol=check_protocol)
+                if self._restore_capabilities():
+                    self.refresh_status()
+                else:
+                    self.refresh_status(check_protocol=check_protocol)
+                    self._store_capabilities()
             connected = True
         except TimeoutError:
             _LOGGER.debug("[%s] Connection timed out", self._device_id)
@@ -381,7 +448,7 @@ class MideaDevice(threading.Thread):
 
     def authenticate(self) -> None:
         """Authenticate to device. V3 only."""
-        request = self._security.encode_8370(self._token, MSGTYPE_HANDSHAKE_REQUEST)
+        request = self._auth_request()
         if not self._socket:
             _LOGGER.debug(
                 "[%s] authenticate failure, device socket is none",
@@ -392,24 +459,42 @@ class MideaDevice(threading.Thread):
         _LOGGER.debug("[%s] Authentication handshaking", self._device_id)
         self._socket.send(request)
         response = self._socket.recv(512)
+        self._auth_complete(response)
+
+    def _auth_request(self) -> bytes:
+        """Build the V3 handshake request."""
+        return self._security.encode_8370(self._token, MSGTYPE_HANDSHAKE_REQUEST)
+
+    def _auth_complete(self, response: bytes) -> None:
+        """Derive the session key from the V3 handshake response."""
         _LOGGER.debug(
             "[%s] Received auth response with %d bytes: %s",
             self._device_id,
             len(response),
-            response.hex(),
+            HexDump(response),
         )
         if len(response) < MIN_AUTH_RESPONSE:
             _LOGGER.debug(
                 "[%s] Received auth response len %d error, bytes: %s",
                 self._device_id,
                 len(response),
-                response.hex(),
+                HexDump(response),
             )
+            self._invalidate_key()
             raise AuthException
         response = response[8:72]
-        self._security.tcp_key(response, self._key)
+        try:
+            self._security.tcp_key(response, self._key)
+        except (CannotAuthenticate, DataSignDoesntMatch, DataUnexpectedLength) as e:
+            self._invalidate_key()
+            raise AuthException from e
         _LOGGER.debug("[%s] Authentication success", self._device_id)
 
+    def _invalidate_key(self) -> None:
+        """Drop the rejected token from the key cache."""
+        if self._key_cache is not None:
+            self._key_cache.invalidate(self._device_id, self._token.hex())
+
     def send_message(self, data: bytes, query: bool = False) -> None:
         """Send message."""
         if self._device_protocol_version == ProtocolVersion.V3:
@@ -419,11 +504,22 @@ class MideaDevice(threading.Thread):
 
     def send_message_v2(self, data: bytes, query: bool = False) -> None:
         """Send message V2."""
+        if self._transport is not None:
+            if self._transport.is_closing():
+                _LOGGER.debug(
+                    "[%s] send_message_v2 failure, device transport is closing",
+                    self._device_id,
+                )
+                raise SocketException
+            # the event loop owns the timeouts, writes never block
+            self._transport.write(data)
+            self._frames_written += 1
+            return
         if not self._socket:
             _LOGGER.debug(
                 "[%s] send_message_v2 failure, device socket is none, data: %s",
                 self._device_id,
-                data.hex(),
+                HexDump(data),
             )
             # raise exception to main loop
             raise SocketException
@@ -474,11 +570,61 @@ class MideaDevice(threading.Thread):
         data = self._security.encode_8370(data, msg_type)
         self.send_message_v2(data, query=query)
 
+    def _query_cache_key(self, cmd: MessageRequest) -> tuple | None:
+        """Get the cache key of a query, None if it can't be cached."""
+        if not cmd.CACHEABLE:
+            return None
+        state = (self._message_protocol_version, self._subtype)
+        if state != self._query_cache_state:
+            self._query_cache.clear()
+            self._query_cache_state = state
+        key = (
+            cmd.__class__,
+            *sorted(
+                (name, bytes(value) if isinstance(value, bytearray) else value)
+                for name, value in vars(cmd).items()
+                if name not in cmd.ROLLING_ATTRIBUTES
+            ),
+        )
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def _encrypt_command(self, cmd: MessageRequest, query: bool) -> bytes:
+        """Serialize and encrypt a command, reusing the bytes of equal queries."""
+        key = self._query_cache_key(cmd) if query else None
+        if key is not None and (cached := self._query_cache.get(key)):
+            self._query_cache.move_to_end(key)
+            serialized, encrypted = cached
+            if not cmd.ROLLING_TAIL:
+                return encrypted
+            # ECB: the blocks before the rolling tail encrypt the same
+            stream = bytearray(serialized)
+            cmd.roll(stream)
+            return encrypted + self._security.aes_encrypt(stream[len(encrypted) :])
+        stream = cmd.serialize()
+        encrypted = self._security.aes_encrypt(stream)
+        if key is not None:
+            if cmd.ROLLING_TAIL:
+                stable = (len(stream) - cmd.ROLLING_TAIL) // 16 * 16
+                self._query_cache[key] = (bytes(stream), encrypted[:stable])
+            else:
+                self._query_cache[key] = (b"", encrypted)
+            if len(self._query_cache) > QUERY_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
+        return encrypted
+
     def build_send(self, cmd: MessageRequest, query: bool = False) -> None:
         """Serialize and send."""
-        data = cmd.serialize()
+        if self._coalesced is not None and not query:
+            if not any(held is cmd for held in self._coalesced):
+                self._coalesced.append(cmd)
+            return
+        data = self._encrypt_command(cmd, query)
         _LOGGER.debug("[%s] Sending: %s, query is %s", self._device_id, cmd, query)
-        msg = PacketBuilder(self._device_id, data).finalize()
+        msg = PacketBuilder(self._device_id, data, encrypted=True).finalize()
         self.send_message(msg, query=query)
 
     def _wait_for_query_response(self) -> None:
@@ -500,12 +646,84 @@ class MideaDevice(threading.Thread):
             if result != MessageResult.PADDING:
                 raise ResponseException
 
-    def refresh_status(self, check_protocol: bool = False) -> None:
-        """Refresh device status."""
+    def _query_commands(self) -> tuple[list, list]:
+        """Return (all, real) refresh commands; all may lead with an appliance query."""
         real_cmds: list = self.build_query()
         cmds = real_cmds
         if self._appliance_query:
             cmds = [MessageQueryAppliance(self.device_type), *real_cmds]
+        return cmds, real_cmds
+
+    def _match_responses(self, pending: list) -> None:
+        """Drop the queries answered by the responses received so far.
+
+        A response answers the oldest pending query of the same message type
+        with the same body type, or else the oldest one of that message type
+        (some queries are answered with another body type).
+        """
+        for message_type, body_type in self._responses or []:
+            candidates = [cmd for cmd in pending if cmd.message_type == message_type]
+            if candidates:
+                pending.remove(
+                    next(
+                        (cmd for cmd in candidates if cmd.body_type == body_type),
+                        candidates[0],
+                    ),
+                )
+        if self._responses:
+            self._responses.clear()
+
+    def _pipelined_probe(self, cmds: list) -> list:
+        """Send the supported queries back to back and collect the responses.
+
+        Returns the queries left without a response, they go through the
+        one by one probe (with its retry) before being marked unsupported.
+        """
+        pending = [
+            cmd
+            for cmd in cmds
+            if cmd.__class__.__name__ not in self._unsupported_protocol
+        ]
+        if not pending or not self._socket:
+            return cmds
+        sent = list(pending)
+        for cmd in sent:
+            self.build_send(cmd, query=True)
+        self._responses = []
+        deadline = time.monotonic() + QUERY_TIMEOUT
+        try:
+            while pending and (remaining := deadline - time.monotonic()) > 0:
+                self._socket.settimeout(remaining)
+                msg = self._socket.recv(512)
+                if len(msg) == 0:
+                    raise ConnectionResetError("Connection closed by peer.")
+                if self.parse_message(msg) == MessageResult.ERROR:
+                    break
+                self._match_responses(pending)
+        except TimeoutError:
+            pass
+        finally:
+            self._responses = None
+            if self._socket:
+                self._socket.settimeout(SOCKET_TIMEOUT)
+        _LOGGER.debug(
+            "[%s] pipelined probe, %s of %s queries answered",
+            self._device_id,
+            len(sent) - len(pending),
+            len(sent),
+        )
+        return [cmd for cmd in cmds if cmd not in sent or cmd in pending]
+
+    def refresh_status(self, check_protocol: bool = False) -> None:
+        """Refresh device status.
+
+        With ``check_protocol`` and pipelined refresh enabled, the queries are
+        first sent back to back and matched to their responses, only the
+        unanswered ones are then probed one at a time.
+        """
+        cmds, real_cmds = self._query_commands()
+        if check_protocol and self._pipelined_refresh:
+            cmds = self._pipelined_probe(cmds)
         error_count = 0
         _LOGGER.debug(
             "[%s] refresh_status with cmds: %s, check_protocol %s, \
@@ -594,7 +812,7 @@ class MideaDevice(threading.Thread):
             _LOGGER.debug(
                 "[%s] Ignoring short message: %s",
                 self._device_id,
-                msg.hex(),
+                HexDump(msg),
             )
             return False
         if msg[MESSAGE_TYPE_INDEX] == MessageType.query_appliance:
@@ -615,10 +833,15 @@ class MideaDevice(threading.Thread):
 
     def parse_message(self, msg: bytes) -> MessageResult:
         """Parse message."""
+        self._buffer.feed(msg)
+        return self._parse_buffer()
+
+    def _parse_buffer(self) -> MessageResult:
+        """Parse the complete messages pending in the receive buffer."""
         if self._device_protocol_version == ProtocolVersion.V3:
-            messages, self._buffer = self._security.decode_8370(self._buffer + msg)
+            messages = self._security.decode_8370_frames(self._buffer)
         else:
-            messages, self._buffer = self.fetch_v2_message(self._buffer + msg)
+            messages = self.fetch_v2_frames(self._buffer)
         if len(messages) == 0:
             return MessageResult.PADDING
         for message in messages:
@@ -632,6 +855,15 @@ class MideaDevice(threading.Thread):
                 cryptographic = bytes(message[40:-16])
                 if payload_len % 16 == 0:
                     decrypted: bytearray = self._security.aes_decrypt(cryptographic)
+                    if self._responses is not None and len(decrypted) > (
+                        MESSAGE_TYPE_INDEX + 1
+                    ):
+                        self._responses.append(
+                            (
+                                decrypted[MESSAGE_TYPE_INDEX],
+                                decrypted[MESSAGE_TYPE_INDEX + 1],
+                            ),
+                        )
                     try:
                         cont = True
                         if self._appliance_query:
@@ -642,7 +874,7 @@ class MideaDevice(threading.Thread):
                                 model %s, subtype %s, \
                                 device protocol %s, message procol %s",
                                 self._device_id,
-                                decrypted.hex(),
+                                HexDump(decrypted),
                                 self._device_name,
                                 self._model,
                                 self._subtype,
@@ -677,11 +909,10 @@ class MideaDevice(threading.Thread):
                 else:
                     _LOGGER.warning(
                         "[%s] Illegal payload, "
-                        "original message = %s, buffer = %s, "
+                        "buffer = %s, "
                         "8370 decoded = %s, payload type = %s, "
                         "alleged payload length = %s, factual payload length = %s, ",
                         self._device_id,
-                        msg.hex(),
                         self._buffer.hex(),
                         message.hex(),
                         payload_type,
@@ -691,11 +922,10 @@ class MideaDevice(threading.Thread):
             else:
                 _LOGGER.warning(
                     "[%s] Illegal message, "
-                    "original message = %s, buffer = %s, "
+                    "buffer = %s, "
                     "8370 decoded = %s, payload type = %s, "
                     "alleged payload length = %s, message length = %s, ",
                     self._device_id,
-                    msg.hex(),
                     self._buffer.hex(),
                     message.hex(),
                     payload_type,
@@ -728,7 +958,7 @@ class MideaDevice(threading.Thread):
                 self._device_id,
                 repr(e),
                 cmd_type,
-                cmd_body.hex(),
+                HexDump(cmd_body),
             )
 
     def send_heartbeat(self) -> None:
@@ -745,18 +975,62 @@ class MideaDevice(threading.Thread):
         if update in self._updates:
             self._updates.remove(update)
 
+    def subscribe(
+        self,
+        update: Callable[[dict[str, Any]], None],
+        attributes: Iterable[str] | None = None,
+    ) -> Callable[[], None]:
+        """Register update for the changed status keys only, return unsubscribe.
+
+        update receives the keys whose value differs from the last published
+        one, restricted to attributes if given, and is not called without any.
+        """
+        subscriber = (update, None if attributes is None else frozenset(attributes))
+        self._subscribers.append(subscriber)
+
+        def unsubscribe() -> None:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+        return unsubscribe
+
+    def _notify(
+        self,
+        update: Callable[[dict[str, Any]], None],
+        status: dict[str, Any],
+    ) -> None:
+        try:
+            update(status)
+        except Exception:
+            _LOGGER.exception(
+                "[%s] Error in update callback %s",
+                self._device_id,
+                update,
+            )
+
     def update_all(self, status: dict[str, Any]) -> None:
         """Update all."""
         _LOGGER.debug("[%s] Status update: %s", self._device_id, status)
         for update in self._updates:
-            try:
-                update(status)
-            except Exception:
-                _LOGGER.exception(
-                    "[%s] Error in update callback %s",
-                    self._device_id,
-                    update,
-                )
+            self._notify(update, status)
+        published = self._published
+        changes = {
+            key: value
+            for key, value in status.items()
+            if key not in published or published[key] != value
+        }
+        if not changes:
+            return
+        # values like the C3 zone lists are changed in place afterwards, keep
+        # what was published and hand out copies of it
+        published.update((key, _snapshot(value)) for key, value in changes.items())
+        for update, attributes in self._subscribers:
+            if selected := {
+                key: _snapshot(published[key])
+                for key in changes
+                if attributes is None or key in attributes
+            }:
+                self._notify(update, selected)
 
     def update_attributes_from_message(
         self,
@@ -777,19 +1051,49 @@ class MideaDevice(threading.Thread):
         """
         new_status: dict[str, Any] = {}
         translators = translators or {}
-        for status in self._attributes:
-            if hasattr(message, str(status)):
-                value = getattr(message, str(status))
-                if status in translators:
-                    value = translators[status](value)
-                elif default_transform is not None:
-                    value = default_transform(value)
-                if value is SKIP_ATTRIBUTE:
-                    continue
-                self._attributes[status] = value
-                new_status[str(status)] = value
+        attributes = self._attributes
+        for status, name in self._attribute_plan(message):
+            value = getattr(message, name)
+            translator = translators.get(status, default_transform)
+            if translator is not None:
+                value = translator(value)
+            if value is SKIP_ATTRIBUTE:
+                continue
+            attributes[status] = value
+            new_status[name] = value
         return new_status
 
+    def _attribute_plan(self, message: object) -> tuple[tuple[Any, str], ...]:
+        """Return the (attribute, field name) pairs of self._attributes in message.
+
+        Responses of a message class setting the same fields carry the same
+        attributes, the plan is compiled once for each such layout instead of
+        probing every attribute on every response.
+        """
+        fields = getattr(message, "__dict__", None)
+        if fields is None:
+            return self._compile_attribute_plan(message)
+        # attributes are only ever added, but by _restore_attributes() which
+        # drops the plans, so a new attribute shows in the count
+        if len(self._attributes) != self._planned_attributes:
+            self._attribute_plans.clear()
+            self._planned_attributes = len(self._attributes)
+        key = (type(message), tuple(fields))
+        plan = self._attribute_plans.get(key)
+        if plan is None:
+            plan = self._attribute_plans[key] = self._compile_attribute_plan(message)
+        return plan
+
+    def _compile_attribute_plan(
+        self,
+        message: object,
+    ) -> tuple[tuple[Any, str], ...]:
+        return tuple(
+            (status, str(status))
+            for status in self._attributes
+            if hasattr(message, str(status))
+        )
+
     def set_available(self, available: bool = True) -> None:
         """Set available value."""
         _LOGGER.debug(
@@ -831,7 +1135,10 @@ class MideaDevice(threading.Thread):
     def close_socket(self) -> None:
         """Close socket."""
         self._unsupported_protocol = []
-        self._buffer = b""
+        self._buffer.clear()
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
         if self._socket:
             try:
                 self._socket.shutdown(socket.SHUT_RDWR)
@@ -866,6 +1173,74 @@ class MideaDevice(threading.Thread):
         """Set refresh interval."""
         self._refresh_interval = refresh_interval
 
+    def set_pipelined_refresh(self, pipelined: bool) -> None:
+        """Set whether the protocol probe sends all queries back to back."""
+        self._pipelined_refresh = pipelined
+
+    def set_capability_store(self, store: CapabilityStore | None) -> None:
+        """Set the store keeping the protocol probe outcome across restarts."""
+        self._capability_store = store
+
+    def set_key_cache(self, cache: KeyCache | None) -> None:
+        """Set the cache whose token is dropped when authentication fails."""
+        self._key_cache = cache
+
+    @property
+    def _capability_key(self) -> str:
+        return CapabilityStore.key(
+            self._device_id,
+            self._model,
+            self._subtype,
+            self._device_protocol_version,
+        )
+
+    def _export_capabilities(self) -> dict[str, Any]:
+        """Return the device type specific capabilities to store."""
+        return {}
+
+    def _import_capabilities(self, extra: dict[str, Any]) -> None:
+        """Restore the device type specific capabilities."""
+
+    def _restore_capabilities(self) -> bool:
+        """Apply the stored probe outcome, return whether the probe is skipped."""
+        if self._capability_store is None:
+            return False
+        record = self._capability_store.get(self._capability_key)
+        if record is None:
+            return False
+        self._message_protocol_version = record.message_protocol_version
+        self._appliance_query = False
+        self._unsupported_protocol = list(record.unsupported_protocol)
+        self._import_capabilities(record.extra)
+        self._revalidate_capabilities = self._capability_store.is_stale(record)
+        _LOGGER.debug(
+            "[%s] Restored capabilities, msg protocol %s, unsupported %s",
+            self._device_id,
+            self._message_protocol_version,
+            self._unsupported_protocol,
+        )
+        return True
+
+    def _store_capabilities(self) -> None:
+        """Store the outcome of a successful protocol probe."""
+        if self._capability_store is None:
+            return
+        self._capability_store.set(
+            self._capability_key,
+            CapabilityRecord(
+                self._message_protocol_version,
+                list(self._unsupported_protocol),
+                self._export_capabilities(),
+            ),
+        )
+
+    def _revalidate(self) -> None:
+        """Probe again the protocols of a stale stored record."""
+        self._revalidate_capabilities = False
+        self._unsupported_protocol = []
+        self.refresh_status(check_protocol=True)
+        self._store_capabilities()
+
     def _check_refresh(self, now: float) -> None:
         if 0 < self._refresh_interval <= now - self._previous_refresh:
             self.refresh_status()
@@ -944,17 +1319,19 @@ class MideaDevice(threading.Thread):
                         _LOGGER.debug("[%s] Socket is none", self._device_id)
                         raise SocketException  # noqa: TRY301
                     now = time.time()
+                    # probe in the background a stale stored capability record
+                    if self._revalidate_capabilities:
+                        self._revalidate()
                     # refresh_status only send supported query msg
                     self._check_refresh(now)
                     self._check_heartbeat(now)
                     # set SOCKET_TIMEOUT before recv socket msg
                     self._socket.settimeout(SOCKET_TIMEOUT)
                     # refresh status after set/query
-                    msg = self._socket.recv(512)
-                    if len(msg) == 0:
+                    if self._buffer.recv_into(self._socket) == 0:
                         raise ConnectionResetError("Connection closed by peer")  # noqa: TRY301
                     # parse msg and update latest status
-                    result = self.parse_message(msg)
+                    result = self._parse_buffer()
                     if result == MessageResult.SUCCESS:
                         timeout_counter = 0
                     if result == MessageResult.ERROR:
@@ -998,6 +1375,58 @@ class MideaDevice(threading.Thread):
         """Set attribute."""
         raise NotImplementedError
 
+    def set_attributes(self, attributes: Mapping[str, bool | float | str]) -> None:
+        """Set many attributes, in one set message per message family."""
+        with self.coalesce():
+            for attr, value in attributes.items():
+                self.set_attribute(attr, value)
+
+    @contextlib.contextmanager
+    def coalesce(self) -> Iterator[None]:
+        """Hold the messages sent in the block and send them when it exits.
+
+        Set message builders reuse the held message of their family, see
+        _pending_set(), so changes made in the block go out in one frame.
+        Nothing is sent if the block raises, and the attributes it changed
+        are restored and published again.
+        """
+        if self._coalesced is not None:
+            yield
+            return
+        self._coalesced = []
+        attributes = copy.deepcopy(self._attributes)
+        try:
+            yield
+            held = self._coalesced
+        except BaseException:
+            self._restore_attributes(attributes)
+            raise
+        finally:
+            self._coalesced = None
+        for message in held:
+            self.build_send(message)
+
+    def _restore_attributes(self, attributes: dict[Any, Any]) -> None:
+        """Undo the optimistic attribute changes of a failed coalesce()."""
+        restored = {
+            str(key): value
+            for key, value in attributes.items()
+            if self._attributes.get(key) != value
+        }
+        self._attributes.clear()
+        self._attributes.update(attributes)
+        # the same number of attributes may be other keys
+        self._attribute_plans.clear()
+        if restored:
+            self.update_all(restored)
+
+    def _pending_set[M: MessageRequest](self, message_type: type[M]) -> M | None:
+        """Return the held message of message_type inside coalesce(), if any."""
+        for message in reversed(self._coalesced or []):
+            if type(message) is message_type:
+                return message
+        return None
+
     def get_attribute(self, attr: str) -> bool | int | str | list[int] | None:
         """Get attribute."""
         return self._attributes.get(attr)
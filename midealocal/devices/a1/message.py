@@ -11,6 +11,7 @@ from midealocal.message import (
     MessageResponse,
     MessageType,
     NewProtocolMessageBody,
+    roll_message_id,
 )
 
 MAX_MSG_SERIAL_NUM = 100
@@ -27,6 +28,10 @@ class NewProtocolTags(IntEnum):
 class MessageA1Base(MessageRequest):
     """Message A1 Base."""
 
+    # every request embeds the next message id, then the body crc and the
+    # frame checksum covering it
+    ROLLING_ATTRIBUTES = ("_message_id",)
+    ROLLING_TAIL = 3
     _message_serial = 0
 
     def __init__(
@@ -58,6 +63,10 @@ class MessageA1Base(MessageRequest):
         body.append(calculate(body))
         return body
 
+    def roll(self, stream: bytearray) -> None:
+        """Write the message id into the serialization of an equal request."""
+        roll_message_id(stream, self._message_id)
+
 
 class MessageQuery(MessageA1Base):
     """Message A1 query."""
@@ -246,7 +255,7 @@ class A1NewProtocolMessageBody(NewProtocolMessageBody):
     def __init__(self, body: bytearray, bt: int) -> None:
         """Initialize A1 new protocol message body."""
         super().__init__(body, bt)
-        params = self.parse()
+        params = self.index((NewProtocolTags.light,))
         if NewProtocolTags.light in params:
             self.light = params[NewProtocolTags.light][0] > 0
 
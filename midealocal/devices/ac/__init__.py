@@ -596,6 +596,31 @@ class MideaACDevice(MideaDevice):
         """Return the decoded B5 capability flags reported by the device."""
         return self._capabilities
 
+    def _export_capabilities(self) -> dict[str, Any]:
+        """Return the B5 capabilities to store."""
+        return {
+            "capabilities": dict(self._capabilities),
+            "temperature_limits": (
+                None
+                if self._temperature_limits is None
+                else {
+                    str(mode): list(limits)
+                    for mode, limits in self._temperature_limits.items()
+                }
+            ),
+        }
+
+    def _import_capabilities(self, extra: dict[str, Any]) -> None:
+        """Restore the stored B5 capabilities."""
+        self._capabilities.update(extra.get("capabilities") or {})
+        limits = extra.get("temperature_limits")
+        if limits:
+            self._temperature_limits = {
+                int(mode): (minimum, maximum)
+                for mode, (minimum, maximum) in limits.items()
+            }
+            self._refresh_temperature_limits()
+
     def _b5_temperature_limits(self) -> tuple[float, float] | None:
         """Return the B5 setpoint limits for the current mode, if any.
 
@@ -633,6 +658,8 @@ class MideaACDevice(MideaDevice):
 
     def make_message_set(self) -> MessageGeneralSet:
         """Midea AC device make message set."""
+        if (message := self._pending_set(MessageGeneralSet)) is not None:
+            return message
         message = MessageGeneralSet(self._message_protocol_version)
         message.power = self._attributes[DeviceAttributes.power]
         message.prompt_tone = self._attributes[DeviceAttributes.prompt_tone]
@@ -663,7 +690,9 @@ class MideaACDevice(MideaDevice):
         value: bool | float | str,
     ) -> MessageNewProtocolSet:
         """Midea AC device make newprotocol message set."""
-        message = MessageNewProtocolSet(self._message_protocol_version)
+        message = self._pending_set(MessageNewProtocolSet)
+        if message is None:
+            message = MessageNewProtocolSet(self._message_protocol_version)
 
         # wind_lr_angle
         if attr == DeviceAttributes.wind_lr_angle:
@@ -736,6 +765,8 @@ class MideaACDevice(MideaDevice):
 
     def make_subprotocol_message_set(self) -> MessageSubProtocolSet:
         """Midea AC device make subprotocol message set."""
+        if (message := self._pending_set(MessageSubProtocolSet)) is not None:
+            return message
         message = MessageSubProtocolSet(self._message_protocol_version)
         message.power = self._attributes[DeviceAttributes.power]
         message.prompt_tone = self._attributes[DeviceAttributes.prompt_tone]
@@ -949,6 +980,11 @@ class MideaACDevice(MideaDevice):
                     {DeviceAttributes.self_clean.value: optimistic_self_clean},
                 )
 
+    def _restore_attributes(self, attributes: dict[Any, Any]) -> None:
+        """Undo the optimistic changes, self-clean is no longer awaited."""
+        self._pending_self_clean = None
+        super()._restore_attributes(attributes)
+
     def set_target_temperature(
         self,
         target_temperature: float,
@@ -8,12 +8,14 @@ from types import MappingProxyType
 from midealocal.const import MAX_BYTE_VALUE, DeviceType
 from midealocal.crc8 import calculate
 from midealocal.message import (
+    HexDump,
     ListTypes,
     MessageBody,
     MessageRequest,
     MessageResponse,
     MessageType,
     NewProtocolMessageBody,
+    roll_message_id,
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -212,6 +214,10 @@ class NewProtocolTags(IntEnum):
 class MessageACBase(MessageRequest):
     """AC message base."""
 
+    # every request embeds the next message id, then the body crc and the
+    # frame checksum covering it
+    ROLLING_ATTRIBUTES = ("_message_id",)
+    ROLLING_TAIL = 3
     _message_serial = 0
 
     def __init__(
@@ -243,6 +249,10 @@ class MessageACBase(MessageRequest):
         body.append(calculate(body))
         return body
 
+    def roll(self, stream: bytearray) -> None:
+        """Write the message id into the serialization of an equal request."""
+        roll_message_id(stream, self._message_id)
+
 
 class MessageA0Query(MessageACBase):
     """AC message query(queryType == "a0_query")."""
@@ -340,6 +350,8 @@ class MessageCapabilitiesAdditionalQuery(MessageCapabilitiesQuery):
 class MessageGroupDataQuery(MessageACBase):
     """AC message group data query(queryType == "group_data_<group>")."""
 
+    # the message id is left out of the body, nothing to write again
+    ROLLING_TAIL = 0
     _group = 0
 
     def __init__(self, protocol_version: int) -> None:
@@ -504,6 +516,9 @@ class MessageNewProtocolSelfCleanQuery(MessageNewProtocolQuery):
 class MessageSubProtocol(MessageACBase):
     """AC message sub protocol."""
 
+    # the message id is left out of the body, nothing to write again
+    ROLLING_TAIL = 0
+
     def __init__(
         self,
         protocol_version: int,
@@ -1072,7 +1087,7 @@ class XBXMessageBody(NewProtocolMessageBody):
         """Initialize AC BX message body."""
         super().__init__(body, bt)
 
-        params = self.parse()
+        params = self.index()
         if NewProtocolTags.indirect_wind in params:
             self.indirect_wind = (
                 params[NewProtocolTags.indirect_wind][0] == INDIRECT_WIND_VALUE
@@ -1122,7 +1137,7 @@ class XBXMessageBody(NewProtocolMessageBody):
         ):
             self.has_new_protocol_temperature = True
 
-    def _parse_new_protocol_temperatures(self, data: bytearray) -> bool:
+    def _parse_new_protocol_temperatures(self, data: memoryview) -> bool:
         """Decode setpoint and indoor temperature for model 22013279.
 
         Its standard C0 temperature fields are stale; temperatures are reported
@@ -1186,7 +1201,7 @@ class XB5MessageBody(NewProtocolMessageBody):
         """Initialize AC BX message body."""
         super().__init__(body, bt)
 
-        params = self.parse()
+        params = self.index()
         # parse b5 protocol, github issue https://github.com/wuwentao/midea_ac_lan/issues/673
         if NewProtocolTags.b5_mode in params:
             self.b5_mode = params[NewProtocolTags.b5_mode][0]
@@ -1222,7 +1237,7 @@ class XB5MessageBody(NewProtocolMessageBody):
             self.b5_humidity = params[NewProtocolTags.b5_humidity][0]
         self._parse_capabilities(params)
 
-    def _parse_capabilities(self, params: dict[int, bytearray]) -> None:
+    def _parse_capabilities(self, params: dict[int, memoryview]) -> None:
         """Decode B5 capability values into feature flags.
 
         The raw byte of each capability is not a simple 0/1 flag; each one has
@@ -1604,7 +1619,7 @@ class MessageACResponse(MessageResponse):
                 "Skipping notify1 A1 body too short to parse (%d < %d bytes): %s",
                 len(super().body),
                 A1_MIN_BODY_LENGTH,
-                super().body.hex(),
+                HexDump(super().body),
             )
         # parse MessageCapabilitiesQuery/MessageCapabilitiesAdditionalQuery response
         # dataType 0x03 and messageBytes[0] 0xB5
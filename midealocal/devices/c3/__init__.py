@@ -253,6 +253,8 @@ class MideaC3Device(MideaDevice):
 
     def make_message_set(self) -> MessageSet:
         """Midea C3 device make message set."""
+        if (message := self._pending_set(MessageSet)) is not None:
+            return message
         message = MessageSet(self._message_protocol_version)
         message.zone1_power = self._attributes[DeviceAttributes.zone1_power]
         message.zone2_power = self._attributes[DeviceAttributes.zone2_power]
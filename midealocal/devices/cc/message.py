@@ -166,6 +166,8 @@ class MessageFEControl(MessageRequest):
     by the msmart-ng project (https://github.com/mill1000/midea-ac-py, MIT).
     """
 
+    # every request embeds the next rolling message id
+    CACHEABLE = False
     _message_id = 0
 
     def __init__(
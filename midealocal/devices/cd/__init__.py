@@ -376,6 +376,85 @@ class MideaCDDevice(MideaDevice):
             },
         )
 
+    def _vacation_temperature(self) -> float:
+        vac_temp = self._attributes.get(DeviceAttributes.vacation_temperature)
+        return (
+            float(vac_temp)
+            if isinstance(vac_temp, int | float) and vac_temp > 0
+            else 0.0
+        )
+
+    def make_message_set(self, attr: str) -> MessageSet:
+        """Midea CD device make message set from the current state."""
+        message = MessageSet(self._message_protocol_version)
+        message.fields = dict(self._fields) if self._fields else {}
+        # align temperature encoding with lua protocol selection
+        message.use_old_protocol = self._lua_protocol == LuaProtocol.old
+
+        # Get safe current values
+        current_power = self._attributes.get(DeviceAttributes.power, False)
+        current_temp = self._attributes.get(
+            DeviceAttributes.target_temperature,
+        )
+        current_mode = self._attributes.get(DeviceAttributes.mode)
+
+        # Initialize message with current device state
+        message.power = current_power
+
+        # Fahrenheit mode flag (bodyBytes[8] bit 0x80)
+        message.fahrenheit = bool(
+            self._attributes.get(DeviceAttributes.fahrenheit, False),
+        )
+
+        # full[21] vacationTsValue — not max temperature.
+        # full[23] tsMax — must be the device max (issue #468); 0 clamps SP.
+        if attr in (
+            DeviceAttributes.target_temperature,
+            DeviceAttributes.mode,
+            DeviceAttributes.power,
+        ):
+            # Plain control: leave vacationTs at 0 (Lua default).
+            message.vacation_temperature = 0.0
+        else:
+            message.vacation_temperature = self._vacation_temperature()
+        mx = self._attributes.get(DeviceAttributes.max_temperature)
+        try:
+            message.ts_max = int(mx) if isinstance(mx, int | float) and mx > 0 else 0
+        except (TypeError, ValueError):
+            message.ts_max = 0
+
+        # Ensure temperature is valid (not None/0)
+        if isinstance(current_temp, int | float) and current_temp > 0:
+            message.target_temperature = float(current_temp)
+        else:
+            # Fallback to min_temperature or safe default
+            min_temp = self._attributes.get(
+                DeviceAttributes.min_temperature,
+                35.0,
+            )
+            if isinstance(min_temp, int | float) and min_temp > 0:
+                message.target_temperature = float(min_temp)
+            else:
+                message.target_temperature = 40.0
+
+        # Handle mode - safely get current mode, default to 0x00 if None.
+        # Note: when vacation is active the stored mode is "Vacation" (0x05)
+        # which is NOT a valid modeValue for the device.  We handle that
+        # explicitly in the vacation branches below.
+        if current_mode is None or current_mode == "none":
+            message.mode = 0x00
+        elif current_mode == "vacation":
+            # Do not send 0x05 as modeValue; the device does not support it.
+            # Fall back to 0x00 (no explicit operating mode).
+            message.mode = 0x00
+        else:
+            mode_key = MideaCDDevice.get_dict_key_by_value(
+                "_modes",
+                str(current_mode),
+            )
+            message.mode = mode_key if mode_key is not None else 0x00
+        return message
+
     def set_attribute(self, attr: str, value: bool | float | str) -> None:
         """Midea CD device set attribute."""
         # Maintenance reminder is read-only until the weekly write payload is safe.
@@ -407,80 +486,14 @@ class MideaCDDevice(MideaDevice):
             DeviceAttributes.vacation_mode,
             DeviceAttributes.vacation_days,
         ]:
-            message = MessageSet(self._message_protocol_version)
-            message.fields = dict(self._fields) if self._fields else {}
-            # align temperature encoding with lua protocol selection
-            message.use_old_protocol = self._lua_protocol == LuaProtocol.old
-
-            # Get safe current values
-            current_power = self._attributes.get(DeviceAttributes.power, False)
-            current_temp = self._attributes.get(
-                DeviceAttributes.target_temperature,
-            )
-            current_mode = self._attributes.get(DeviceAttributes.mode)
-
-            # Initialize message with current device state
-            message.power = current_power
-
-            # Fahrenheit mode flag (bodyBytes[8] bit 0x80)
-            message.fahrenheit = bool(
-                self._attributes.get(DeviceAttributes.fahrenheit, False),
-            )
-
-            # full[21] vacationTsValue — not max temperature.
-            # full[23] tsMax — must be the device max (issue #468); 0 clamps SP.
-            if attr in (
-                DeviceAttributes.target_temperature,
-                DeviceAttributes.mode,
-                DeviceAttributes.power,
+            message = self._pending_set(MessageSet)
+            if message is None:
+                message = self.make_message_set(attr)
+            elif attr in (
+                DeviceAttributes.vacation_mode,
+                DeviceAttributes.vacation_days,
             ):
-                # Plain control: leave vacationTs at 0 (Lua default).
-                message.vacation_temperature = 0.0
-            else:
-                vac_temp = self._attributes.get(DeviceAttributes.vacation_temperature)
-                message.vacation_temperature = (
-                    float(vac_temp)
-                    if isinstance(vac_temp, int | float) and vac_temp > 0
-                    else 0.0
-                )
-            mx = self._attributes.get(DeviceAttributes.max_temperature)
-            try:
-                message.ts_max = (
-                    int(mx) if isinstance(mx, int | float) and mx > 0 else 0
-                )
-            except (TypeError, ValueError):
-                message.ts_max = 0
-
-            # Ensure temperature is valid (not None/0)
-            if isinstance(current_temp, int | float) and current_temp > 0:
-                message.target_temperature = float(current_temp)
-            else:
-                # Fallback to min_temperature or safe default
-                min_temp = self._attributes.get(
-                    DeviceAttributes.min_temperature,
-                    35.0,
-                )
-                if isinstance(min_temp, int | float) and min_temp > 0:
-                    message.target_temperature = float(min_temp)
-                else:
-                    message.target_temperature = 40.0
-
-            # Handle mode - safely get current mode, default to 0x00 if None.
-            # Note: when vacation is active the stored mode is "Vacation" (0x05)
-            # which is NOT a valid modeValue for the device.  We handle that
-            # explicitly in the vacation branches below.
-            if current_mode is None or current_mode == "none":
-                message.mode = 0x00
-            elif current_mode == "vacation":
-                # Do not send 0x05 as modeValue; the device does not support it.
-                # Fall back to 0x00 (no explicit operating mode).
-                message.mode = 0x00
-            else:
-                mode_key = MideaCDDevice.get_dict_key_by_value(
-                    "_modes",
-                    str(current_mode),
-                )
-                message.mode = mode_key if mode_key is not None else 0x00
+                message.vacation_temperature = self._vacation_temperature()
 
             # Update based on attribute being set
             if attr == DeviceAttributes.mode:
@@ -414,9 +414,13 @@ class MideaEDDevice(MideaDevice):
                 DeviceAttributes.salt_setting,
                 DeviceAttributes.leak_water_protection_value,
             ]:
-                message = MessageNewSet(self._message_protocol_version)
+                message = self._pending_set(MessageNewSet) or MessageNewSet(
+                    self._message_protocol_version,
+                )
         else:
-            message = MessageOldSet(self._message_protocol_version)
+            message = self._pending_set(MessageOldSet) or MessageOldSet(
+                self._message_protocol_version,
+            )
         if message is not None:
             self._attributes[attr] = value
             setattr(message, str(attr), value)
@@ -8,6 +8,7 @@ from midealocal.message import (
     MessageRequest,
     MessageResponse,
     MessageType,
+    roll_message_id,
 )
 
 ANION_GET_BYTE = 19
@@ -31,6 +32,10 @@ TVOC_BYTE = 15
 class MessageFCBase(MessageRequest):
     """FC message base."""
 
+    # every request embeds the next message id, then the body crc and the
+    # frame checksum covering it
+    ROLLING_ATTRIBUTES = ("_message_id",)
+    ROLLING_TAIL = 3
     _message_serial = 0
 
     def __init__(
@@ -62,6 +67,10 @@ class MessageFCBase(MessageRequest):
         body.append(calculate(body))
         return body
 
+    def roll(self, stream: bytearray) -> None:
+        """Write the message id into the serialization of an equal request."""
+        roll_message_id(stream, self._message_id)
+
 
 class MessageQuery(MessageFCBase):
     """FC message query."""
@@ -8,6 +8,7 @@ from midealocal.message import (
     MessageRequest,
     MessageResponse,
     MessageType,
+    roll_message_id,
 )
 
 DISINFECT_A0_BODY_LENGTH = 29
@@ -19,6 +20,10 @@ MAX_MSG_SERIAL_NUM = 254
 class MessageFDBase(MessageRequest):
     """FD message base."""
 
+    # every request embeds the next message id, then the body crc and the
+    # frame checksum covering it
+    ROLLING_ATTRIBUTES = ("_message_id",)
+    ROLLING_TAIL = 3
     _message_serial = 0
 
     def __init__(
@@ -50,6 +55,10 @@ class MessageFDBase(MessageRequest):
         body.append(calculate(body))
         return body
 
+    def roll(self, stream: bytearray) -> None:
+        """Write the message id into the serialization of an equal request."""
+        roll_message_id(stream, self._message_id)
+
 
 class MessageQuery(MessageFDBase):
     """FD message query."""
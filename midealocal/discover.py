@@ -1,8 +1,11 @@
 """Midea local discover."""
 
+import asyncio
+import itertools
 import logging
 import re
 import socket
+from collections.abc import AsyncIterator, Callable, Coroutine, Iterable
 from ipaddress import IPv4Network
 from typing import Any
 
@@ -158,6 +161,18 @@ MAX_NETWORK_PREFIX_LENGHT = 32
 SERIAL_TYPE1_LENGTH = 32
 SERIAL_TYPE2_LENGTH = 22
 DISCOVERY_MIN_REPLY_LENGTH = 41
+# ports the discovery broadcast is sent to
+DISCOVERY_PORTS = (6445, 20086)
+# seconds the broadcast replies are collected for
+DISCOVERY_TIMEOUT = 5
+# seconds a protocol 1 device gets to answer the device info request
+DEVICE_INFO_TIMEOUT = 8
+# default bound of concurrent protocol 1 device info requests
+DISCOVERY_MAX_INFO_REQUESTS = 8
+# default hosts probed per second by a sweep
+SWEEP_RATE = 500
+# default hosts probed back to back by a sweep before pacing
+SWEEP_WINDOW = 32
 
 
 def _extract_mac(reply: bytes | bytearray, ssid_len: int, sn: str) -> str | None:
@@ -193,10 +208,27 @@ def _parse_discover_response(
     sock: socket.socket,
     found_devices: dict[int, dict[str, Any]],
 ) -> tuple[int, dict[str, Any] | None]:
-    security = LocalSecurity()
     data, addr = sock.recvfrom(512)
     ip = addr[0]
     _LOGGER.debug("Received response from %s: %s", addr, data.hex())
+    device_id, device = _parse_discover_data(data, ip, found_devices)
+    if device is not None and device["protocol"] == 1:
+        device_id = get_id_from_response(get_device_info(ip, device["port"]))
+        device["device_id"] = device_id
+    return device_id, device
+
+
+def _parse_discover_data(
+    data: bytes,
+    ip: str,
+    found_devices: dict[int, dict[str, Any]],
+) -> tuple[int, dict[str, Any] | None]:
+    """Decode a broadcast reply.
+
+    Protocol 1 replies do not carry the device ID, it is returned as 0 and
+    has to be fetched with get_device_info().
+    """
+    security = LocalSecurity()
     if len(data) >= DISCOVERY_MIN_RESPONSE_LENGTH and (
         data[:2].hex() == "5a5a" or data[8:10].hex() == "5a5a"
     ):
@@ -250,8 +282,7 @@ def _parse_discover_response(
             m["apc_sn"],
             str(hex(int(m["apc_type"])))[2:],
         )
-        response = get_device_info(ip, int(port))
-        device_id = get_id_from_response(response)
+        device_id = 0
         if len(sn) == SERIAL_TYPE1_LENGTH:
             model = sn[9:17]
         elif len(sn) == SERIAL_TYPE2_LENGTH:
@@ -287,11 +318,11 @@ def discover(
     _LOGGER.debug("All addresses for broadcast: %s", addrs)
     with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
         sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-        sock.settimeout(5)
+        sock.settimeout(DISCOVERY_TIMEOUT)
         for addr in addrs:
             try:
-                sock.sendto(BROADCAST_MSG, (addr, 6445))
-                sock.sendto(BROADCAST_MSG, (addr, 20086))
+                for port in DISCOVERY_PORTS:
+                    sock.sendto(BROADCAST_MSG, (addr, port))
             except OSError as e:
                 _LOGGER.warning("Can't access network %s: %s", addrs, repr(e))
         while True:
@@ -311,6 +342,253 @@ def discover(
     return found_devices
 
 
+class _Discovery(asyncio.DatagramProtocol):
+    """Decode the replies to the discovery probes, yield them in order.
+
+    The probes are sent by a task and the device IDs of protocol 1 replies
+    are looked up by tasks, each of them puts None in the queue once over.
+    Replies are received until ``listen_time`` after the last probe, the
+    lookups already started are awaited past it.
+    """
+
+    def __init__(self, listen_time: float, max_info_requests: int) -> None:
+        self.found_devices: dict[int, dict[str, Any]] = {}
+        self.tasks: set[asyncio.Task[None]] = set()
+        # decoded devices, None once a task is over
+        self._queue: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue()
+        self._pending_tasks = 0
+        self._listen_time = listen_time
+        self._deadline: float | None = None
+        self._looked_up: set[str] = set()
+        self._limiter = asyncio.Semaphore(max_info_requests)
+        self._transport: asyncio.DatagramTransport | None = None
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self._transport = transport  # type: ignore[assignment]
+
+    def datagram_received(self, data: bytes, addr: tuple[str | Any, int]) -> None:
+        ip = addr[0]
+        _LOGGER.debug("Received response from %s: %s", addr, data.hex())
+        try:
+            _, device = _parse_discover_data(data, ip, self.found_devices)
+        except Exception:
+            _LOGGER.exception("Unable to parse the response from %s", ip)
+            return
+        if device is None:
+            return
+        if device["protocol"] != 1:
+            self._queue.put_nowait(device)
+        # protocol 1 devices answer on both discovery ports
+        elif ip not in self._looked_up:
+            self._looked_up.add(ip)
+            self._start(self._lookup(device))
+
+    def error_received(self, exc: Exception) -> None:
+        _LOGGER.debug("Socket error: %s", exc)
+
+    def _start(self, coro: Coroutine[Any, Any, None]) -> None:
+        self._pending_tasks += 1
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self._finished)
+
+    def _finished(self, task: asyncio.Task[None]) -> None:
+        """Forget a finished task, logging its failure."""
+        self.tasks.discard(task)
+        if not task.cancelled() and (exc := task.exception()) is not None:
+            _LOGGER.error("Discovery task %s failed", task.get_name(), exc_info=exc)
+
+    def send(self, probes: Coroutine[Any, Any, None]) -> None:
+        """Send the probes in the background."""
+        self._start(self._send(probes))
+
+    async def _send(self, probes: Coroutine[Any, Any, None]) -> None:
+        try:
+            await probes
+        finally:
+            self._deadline = asyncio.get_running_loop().time() + self._listen_time
+            self._queue.put_nowait(None)
+
+    async def _lookup(self, device: dict[str, Any]) -> None:
+        try:
+            async with self._limiter:
+                response = await async_get_device_info(
+                    device["ip_address"],
+                    device["port"],
+                )
+            device["device_id"] = get_id_from_response(response)
+            self._queue.put_nowait(device)
+        except ElementMissing:
+            _LOGGER.debug("No device ID from %s", device["ip_address"])
+        finally:
+            self._queue.put_nowait(None)
+
+    async def next_device(self) -> dict[str, Any] | None:
+        """Return the next decoded device, None once the discovery is over."""
+        while True:
+            if (
+                self._deadline is None
+                or asyncio.get_running_loop().time() < self._deadline
+            ):
+                try:
+                    async with asyncio.timeout_at(self._deadline):
+                        device = await self._queue.get()
+                except TimeoutError:
+                    if self._transport is not None:
+                        self._transport.close()
+                    continue
+            elif self._pending_tasks or not self._queue.empty():
+                device = await self._queue.get()
+            else:
+                return None
+            if device is not None:
+                return device
+            self._pending_tasks -= 1
+
+
+async def _iter_replies(
+    probes: Callable[[asyncio.DatagramTransport], Coroutine[Any, Any, None]],
+    discover_type: list | None,
+    expected: Iterable[int] | None,
+    listen_time: float,
+    max_info_requests: int,
+) -> AsyncIterator[dict[str, Any]]:
+    """Send the probes and yield every new device as soon as it is decoded."""
+    if discover_type is None:
+        discover_type = []
+    missing = None if expected is None else set(expected)
+    discovery = _Discovery(listen_time, max_info_requests)
+    transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+        lambda: discovery,
+        # replies come back from the devices of every probed network
+        local_addr=("0.0.0.0", 0),  # noqa: S104
+        allow_broadcast=True,
+    )
+    try:
+        discovery.send(probes(transport))
+        while (device := await discovery.next_device()) is not None:
+            device_id = device["device_id"]
+            if device_id in discovery.found_devices:
+                continue
+            if len(discover_type) != 0 and device.get("type") not in discover_type:
+                _LOGGER.debug("Found a unsupported device: %s", device)
+                continue
+            discovery.found_devices[device_id] = device
+            _LOGGER.debug("Found a supported device: %s", device)
+            yield device
+            if missing is not None:
+                missing.discard(device_id)
+                if not missing:
+                    return
+    finally:
+        transport.close()
+        for task in discovery.tasks:
+            task.cancel()
+
+
+async def iter_discover(
+    discover_type: list | None = None,
+    ip_address: str | None = None,
+    expected: Iterable[int] | None = None,
+    listen_time: float = DISCOVERY_TIMEOUT,
+    max_info_requests: int = DISCOVERY_MAX_INFO_REQUESTS,
+) -> AsyncIterator[dict[str, Any]]:
+    """Discover devices, yielding each one as soon as it is decoded.
+
+    The device info requests of protocol 1 replies run concurrently, at most
+    ``max_info_requests`` at a time. Stops early once every device ID of
+    ``expected`` is found.
+    """
+    addrs = enum_all_broadcast() if ip_address is None else [ip_address]
+    _LOGGER.debug("All addresses for broadcast: %s", addrs)
+
+    async def broadcast(transport: asyncio.DatagramTransport) -> None:
+        for addr in addrs:
+            try:
+                for port in DISCOVERY_PORTS:
+                    transport.sendto(BROADCAST_MSG, (addr, port))
+            except OSError as e:
+                _LOGGER.warning("Can't access network %s: %s", addrs, repr(e))
+
+    async for device in _iter_replies(
+        broadcast,
+        discover_type,
+        expected,
+        listen_time,
+        max_info_requests,
+    ):
+        yield device
+
+
+async def iter_sweep(
+    networks: Iterable[str],
+    discover_type: list | None = None,
+    expected: Iterable[int] | None = None,
+    rate: float = SWEEP_RATE,
+    window: int = SWEEP_WINDOW,
+    listen_time: float = DISCOVERY_TIMEOUT,
+    max_info_requests: int = DISCOVERY_MAX_INFO_REQUESTS,
+) -> AsyncIterator[dict[str, Any]]:
+    """Discover devices by probing every host of networks, e.g. "10.0.4.0/22".
+
+    For networks where broadcast is filtered. The probes go out ``window``
+    hosts at a time, at most ``rate`` hosts per second, replies are yielded
+    as they come like iter_discover() does.
+    """
+    hosts = (
+        str(host)
+        for network in networks
+        for host in IPv4Network(network, strict=False).hosts()
+    )
+
+    async def sweep(transport: asyncio.DatagramTransport) -> None:
+        loop = asyncio.get_running_loop()
+        start, sent = loop.time(), 0
+        while burst := list(itertools.islice(hosts, window)):
+            for host in burst:
+                try:
+                    for port in DISCOVERY_PORTS:
+                        transport.sendto(BROADCAST_MSG, (host, port))
+                except OSError as e:
+                    _LOGGER.debug("Can't probe %s: %s", host, repr(e))
+            sent += len(burst)
+            await asyncio.sleep(max(0, start + sent / rate - loop.time()))
+        _LOGGER.debug("Swept %s hosts in %.2fs", sent, loop.time() - start)
+
+    async for device in _iter_replies(
+        sweep,
+        discover_type,
+        expected,
+        listen_time,
+        max_info_requests,
+    ):
+        yield device
+
+
+async def async_discover(
+    discover_type: list | None = None,
+    ip_address: str | None = None,
+    expected: Iterable[int] | None = None,
+    callback: Callable[[dict[str, Any]], None] | None = None,
+    networks: Iterable[str] | None = None,
+) -> dict[int, dict[str, Any]]:
+    """Discover devices, calling callback as soon as each one is found.
+
+    With networks, every host of them is probed instead of broadcasting.
+    """
+    devices = (
+        iter_discover(discover_type, ip_address, expected)
+        if networks is None
+        else iter_sweep(networks, discover_type, expected)
+    )
+    found_devices: dict[int, dict[str, Any]] = {}
+    async for device in devices:
+        found_devices[device["device_id"]] = device
+        if callback is not None:
+            callback(device)
+    return found_devices
+
+
 def get_id_from_response(response: bytearray) -> int:
     """Get ID from response."""
     if response[64:-16][:6].hex() == "3c3f786d6c20":
@@ -364,6 +642,36 @@ def get_device_info(device_ip: str, device_port: int) -> bytearray:
     return response
 
 
+async def async_get_device_info(device_ip: str, device_port: int) -> bytearray:
+    """Get device info without blocking the event loop."""
+    response = bytearray(0)
+    try:
+        async with asyncio.timeout(DEVICE_INFO_TIMEOUT):
+            reader, writer = await asyncio.open_connection(device_ip, device_port)
+            try:
+                _LOGGER.debug(
+                    "Sending to %s:%s %s",
+                    device_ip,
+                    device_port,
+                    DEVICE_INFO_MSG.hex(),
+                )
+                writer.write(DEVICE_INFO_MSG)
+                await writer.drain()
+                response = bytearray(await reader.read(512))
+            finally:
+                writer.close()
+    except TimeoutError:
+        _LOGGER.warning(
+            "Connect the device %s:%s timed out for %ss.",
+            device_ip,
+            device_port,
+            DEVICE_INFO_TIMEOUT,
+        )
+    except OSError:
+        _LOGGER.warning("Can't connect to Device %s:%s", device_ip, device_port)
+    return response
+
+
 def enum_all_broadcast() -> list:
     """Enum all broadcast addresses."""
     nets = []
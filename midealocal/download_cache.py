@@ -0,0 +1,75 @@
+"""Midea local content addressed cache of downloaded Lua and plugin files.
+
+A bulk download of Lua files mostly ends on files already fetched for other
+serial numbers or in earlier runs. Every file is kept once, named after its
+sha256 digest, and an index maps the download url to that digest so a known
+url is served from disk instead of the cloud.
+"""
+
+import logging
+import os
+import shutil
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from .json_store import JsonFile
+
+_LOGGER = logging.getLogger(__name__)
+
+# layout version of the index
+CACHE_VERSION = 1
+INDEX_FILE = "index.json"
+
+
+class DownloadCache:
+    """Directory of files named after their digest, indexed by download url."""
+
+    def __init__(self, path: str | Path) -> None:
+        """Initialize download cache."""
+        self._path = Path(path)
+        self._file = JsonFile(
+            self._path / INDEX_FILE,
+            CACHE_VERSION,
+            "download cache index",
+        )
+        self._index: dict[str, str] | None = None
+
+    @staticmethod
+    def key(url: str) -> str:
+        """Return the index key of a download url, without its signed query."""
+        parts = urlsplit(url)
+        return f"{parts.netloc}{parts.path}"
+
+    def _load(self) -> dict[str, str]:
+        if self._index is None:
+            self._index = self._file.read(lambda data: dict(data["files"])) or {}
+        return self._index
+
+    def get(self, url: str) -> Path | None:
+        """Return the cached file of url, None if unknown."""
+        with self._file.lock:
+            digest = self._load().get(self.key(url))
+        if digest is None:
+            return None
+        file = self._path / digest
+        return file if file.is_file() else None
+
+    def add(self, url: str, file: Path, digest: str) -> None:
+        """Keep a copy of the file downloaded from url."""
+        blob = self._path / digest
+        try:
+            self._path.mkdir(parents=True, exist_ok=True)
+            if not blob.is_file():
+                # named after its content, a concurrent copy writes the same
+                tmp = blob.with_name(f"{digest}.{os.getpid()}.tmp")
+                shutil.copyfile(file, tmp)
+                tmp.replace(blob)
+        except OSError as e:
+            _LOGGER.warning("Unable to cache %s: %s", file, e)
+            return
+        with self._file.locked():
+            # the urls indexed by other processes are kept
+            self._index = None
+            index = self._load()
+            index[self.key(url)] = digest
+            self._file.write({"files": index})
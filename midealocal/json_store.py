@@ -0,0 +1,109 @@
+"""Midea local JSON files shared by threads and processes.
+
+The capability store, the key cache, the cloud session store and the download
+cache index each keep a versioned JSON document. ``JsonFile`` reads it, a
+missing, corrupt or outdated file reading as nothing, and writes it aside
+then renames it, so a reader never sees a truncated file. Updates hold a
+thread lock and, except on Windows, an flock on a ``.lock`` file next to it,
+so processes sharing the file do not drop each other's changes.
+"""
+
+import contextlib
+import json
+import logging
+import os
+import sys
+import threading
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+_LOGGER = logging.getLogger(__name__)
+
+# errors of a corrupt file or of a document not matching its version
+_INVALID_ERRORS = (OSError, ValueError, TypeError, KeyError, AttributeError)
+
+
+class JsonFile:
+    """Versioned JSON document, older versions are ignored."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        version: int,
+        description: str,
+        private: bool = False,
+        indent: int | None = None,
+    ) -> None:
+        """Initialize JSON file.
+
+        description names the file in the logs, private files are only
+        readable by their owner.
+        """
+        self.path = Path(path)
+        self._version = version
+        self._description = description
+        self._mode = 0o600 if private else 0o666
+        self._indent = indent
+        self._lock_path = self.path.with_name(f"{self.path.name}.lock")
+        # serializes the threads of this process, see locked()
+        self.lock = threading.Lock()
+
+    def read[T](self, parse: Callable[[dict[str, Any]], T]) -> T | None:
+        """Return the parsed document, None if missing, invalid or outdated."""
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if data.get("version") == self._version:
+                return parse(data)
+        except FileNotFoundError:
+            pass
+        except _INVALID_ERRORS as e:
+            _LOGGER.warning("Ignoring %s %s: %s", self._description, self.path, e)
+        return None
+
+    def write(self, document: dict[str, Any]) -> None:
+        """Replace the document, a failure is logged."""
+        data = {"version": self._version, **document}
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, self._mode)
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump(data, file, indent=self._indent)
+            tmp.replace(self.path)
+        except OSError as e:
+            _LOGGER.warning(
+                "Unable to save %s %s: %s",
+                self._description,
+                self.path,
+                e,
+            )
+            with contextlib.suppress(OSError):
+                tmp.unlink(missing_ok=True)
+
+    @contextlib.contextmanager
+    def locked(self) -> Iterator[None]:
+        """Hold the file for a read, change and write against other writers."""
+        with self.lock:
+            if sys.platform == "win32":
+                # no flock, only the threads of this process are serialized
+                yield
+                return
+            import fcntl  # noqa: PLC0415
+
+            try:
+                fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+            except OSError as e:
+                _LOGGER.warning(
+                    "Unable to lock %s %s: %s",
+                    self._description,
+                    self.path,
+                    e,
+                )
+                yield
+                return
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                # closing releases the lock
+                os.close(fd)
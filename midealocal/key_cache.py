@@ -0,0 +1,146 @@
+"""Midea local persistent cache of cloud tokens and keys.
+
+Bringing up a V3 device without a stored token means a cloud login, then a
+getToken request per UDP ID method. The tokens only change when the appliance
+is reset or rebound, so they are kept in a file, encrypted with AES-GCM under
+a key derived from a caller supplied secret, and reused until they expire or
+the device rejects them.
+"""
+
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Any
+
+from Crypto.Cipher import AES
+from Crypto.Random import get_random_bytes
+
+from .json_store import JsonFile
+
+# layout version of the encrypted file
+CACHE_VERSION = 1
+# entries older than this are fetched from the cloud again
+DEFAULT_KEY_TTL = 30 * 24 * 3600
+# PBKDF2-HMAC-SHA256 rounds deriving the file key from the secret
+KDF_ITERATIONS = 200_000
+KDF_SALT_LENGTH = 16
+
+
+class KeyCache:
+    """Encrypted file backed cache of tokens and keys, by appliance and method.
+
+    Updates read the file again first, so processes sharing it keep each
+    other's keys.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        secret: str,
+        ttl: float = DEFAULT_KEY_TTL,
+    ) -> None:
+        """Initialize key cache."""
+        self._file = JsonFile(path, CACHE_VERSION, "key cache", private=True)
+        self._secret = secret.encode()
+        self._ttl = ttl
+        self._salt = b""
+        self._cipher_key = b""
+        # appliance id -> method -> {"token", "key", "updated_at"}
+        self._entries: dict[str, dict[str, dict[str, Any]]] | None = None
+
+    def _derive(self, salt: bytes) -> bytes:
+        if salt != self._salt:
+            self._salt = salt
+            self._cipher_key = hashlib.pbkdf2_hmac(
+                "sha256",
+                self._secret,
+                salt,
+                KDF_ITERATIONS,
+            )
+        return self._cipher_key
+
+    def _parse(self, data: dict[str, Any]) -> dict[str, dict[str, dict[str, Any]]]:
+        cipher = AES.new(
+            self._derive(bytes.fromhex(data["salt"])),
+            AES.MODE_GCM,
+            nonce=bytes.fromhex(data["nonce"]),
+        )
+        # a wrong secret fails the verification, the cache then starts over
+        plain = cipher.decrypt_and_verify(
+            bytes.fromhex(data["data"]),
+            bytes.fromhex(data["tag"]),
+        )
+        return dict(json.loads(plain))
+
+    def _load(self) -> dict[str, dict[str, dict[str, Any]]]:
+        if self._entries is None:
+            self._entries = self._file.read(self._parse) or {}
+        return self._entries
+
+    def _save(self, entries: dict[str, dict[str, dict[str, Any]]]) -> None:
+        if not self._salt:
+            self._derive(get_random_bytes(KDF_SALT_LENGTH))
+        cipher = AES.new(self._cipher_key, AES.MODE_GCM)
+        encrypted, tag = cipher.encrypt_and_digest(json.dumps(entries).encode())
+        self._file.write(
+            {
+                "salt": self._salt.hex(),
+                "nonce": cipher.nonce.hex(),
+                "tag": tag.hex(),
+                "data": encrypted.hex(),
+            },
+        )
+
+    def get(self, appliance_id: int) -> dict[int, dict[str, Any]]:
+        """Return the unexpired keys of an appliance, by UDP ID method."""
+        with self._file.lock:
+            methods = self._load().get(str(appliance_id), {})
+        now = time.time()
+        return {
+            int(method): {"token": entry["token"], "key": entry["key"]}
+            for method, entry in methods.items()
+            if now - entry["updated_at"] < self._ttl
+        }
+
+    def set(self, appliance_id: int, keys: dict[int, dict[str, Any]]) -> None:
+        """Store the keys of an appliance, replacing its previous entries."""
+        now = time.time()
+        with self._file.locked():
+            # the entries may have been changed by another process
+            self._entries = None
+            entries = self._load()
+            entries[str(appliance_id)] = {
+                str(method): {
+                    "token": key["token"],
+                    "key": key["key"],
+                    "updated_at": now,
+                }
+                for method, key in keys.items()
+            }
+            self._save(entries)
+
+    def invalidate(self, appliance_id: int, token: str | None = None) -> None:
+        """Forget the keys of an appliance, only those of token if given."""
+        with self._file.locked():
+            self._entries = None
+            entries = self._load()
+            methods = entries.get(str(appliance_id))
+            if not methods:
+                return
+            if token is None:
+                del entries[str(appliance_id)]
+            else:
+                token = token.lower()
+                stale = [
+                    method
+                    for method, entry in methods.items()
+                    if entry["token"].lower() == token
+                ]
+                if not stale:
+                    return
+                for method in stale:
+                    del methods[method]
+                if not methods:
+                    del entries[str(appliance_id)]
+            self._save(entries)
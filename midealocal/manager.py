@@ -0,0 +1,312 @@
+"""Midea local multi-device scheduler."""
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+import logging
+import random
+from collections.abc import Iterable
+from dataclasses import dataclass
+from enum import StrEnum
+
+from .async_device import AsyncMideaDevice
+from .const import DeviceType
+from .device import MideaDevice, NoSupportedProtocol
+from .exceptions import SocketException
+
+_LOGGER = logging.getLogger(__name__)
+
+# default cap of polls awaiting a response across the whole fleet
+DEFAULT_MAX_IN_FLIGHT = 4
+# default jitter, as a fraction of the interval, added to every reschedule
+DEFAULT_JITTER = 0.1
+# default cap of apply_many() commands awaiting an answer at once
+DEFAULT_MAX_COMMANDS = 128
+# golden ratio conjugate, spreads the initial phases without knowing the fleet size
+_PHASE_STEP = 0.618033988749895
+
+
+class Job(StrEnum):
+    """Scheduled job kind."""
+
+    REFRESH = "refresh"
+    HEARTBEAT = "heartbeat"
+
+
+@dataclass
+class CommandResult:
+    """Outcome of an apply_many() command."""
+
+    device_id: int
+    attr: str
+    value: bool | float | str
+    acknowledged: bool = False
+    error: Exception | None = None
+
+
+class DeviceManager:
+    """Own many devices and schedule their refreshes and heartbeats.
+
+    Instead of every device checking its own ``_refresh_interval`` and
+    ``_heartbeat_interval`` timers, due jobs are kept in a single priority
+    queue on the event loop. Initial phases are spread over the interval,
+    every reschedule gets some jitter and at most ``max_in_flight`` polls
+    (and connection probes) are awaiting a response at any time, so the
+    bursts of devices started together do not line up.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        jitter: float = DEFAULT_JITTER,
+    ) -> None:
+        """Initialize device manager."""
+        self._limiter = asyncio.Semaphore(max_in_flight)
+        self._jitter = jitter
+        self._devices: dict[int, AsyncMideaDevice] = {}
+        self._queue: list[tuple[float, int, Job, int]] = []
+        self._seq = itertools.count()
+        self._phase = itertools.count()
+        self._refresh_intervals: dict[int, int] = {}
+        self._type_refresh_intervals: dict[DeviceType, int] = {}
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._polls: set[asyncio.Task[None]] = set()
+
+    @property
+    def devices(self) -> list[AsyncMideaDevice]:
+        """Managed devices."""
+        return list(self._devices.values())
+
+    def get(self, device_id: int) -> AsyncMideaDevice | None:
+        """Get a managed device."""
+        return self._devices.get(device_id)
+
+    def add(self, device: MideaDevice) -> AsyncMideaDevice:
+        """Add a device, it is opened right away if the manager is running."""
+        if device.device_id in self._devices:
+            return self._devices[device.device_id]
+        managed = AsyncMideaDevice(device, scheduled=True, limiter=self._limiter)
+        self._devices[device.device_id] = managed
+        self._schedule_device(managed, asyncio.get_running_loop().time())
+        if self._task is not None:
+            managed.open()
+        return managed
+
+    async def remove(self, device_id: int) -> None:
+        """Close and forget a device."""
+        managed = self._devices.pop(device_id, None)
+        if managed is None:
+            return
+        self._unschedule(device_id)
+        await managed.close()
+
+    async def apply_many(
+        self,
+        commands: Iterable[tuple[MideaDevice | int, str, bool | float | str]],
+        max_in_flight: int = DEFAULT_MAX_COMMANDS,
+    ) -> list[CommandResult]:
+        """Apply (device or device id, attribute, value) commands to the fleet.
+
+        The commands of different devices are sent concurrently, at most
+        max_in_flight of them awaiting an answer, the ones of a device are
+        applied in the given order. Return the results in the same order.
+        """
+        results: list[CommandResult] = []
+        per_device: dict[int, list[CommandResult]] = {}
+        for device, attr, value in commands:
+            device_id = device if isinstance(device, int) else device.device_id
+            if device_id not in self._devices:
+                raise ValueError(f"Device {device_id} is not managed")
+            result = CommandResult(device_id, attr, value)
+            results.append(result)
+            per_device.setdefault(device_id, []).append(result)
+        limiter = asyncio.Semaphore(max_in_flight)
+
+        async def apply(managed: AsyncMideaDevice, queue: list[CommandResult]) -> None:
+            for result in queue:
+                try:
+                    async with limiter:
+                        result.acknowledged = await managed.apply(
+                            result.attr,
+                            result.value,
+                        )
+                except Exception as e:  # noqa: BLE001
+                    _LOGGER.debug(
+                        "[%s] Unable to set %s: %r",
+                        managed.device_id,
+                        result.attr,
+                        e,
+                    )
+                    result.error = e
+
+        await asyncio.gather(
+            *(
+                apply(self._devices[device_id], queue)
+                for device_id, queue in per_device.items()
+            ),
+        )
+        return results
+
+    def refresh_interval(self, device: MideaDevice) -> int:
+        """Get the effective refresh interval of a device.
+
+        A per-device override wins over a per-type override, which wins over
+        the interval set on the device itself.
+        """
+        if device.device_id in self._refresh_intervals:
+            return self._refresh_intervals[device.device_id]
+        return self._type_refresh_intervals.get(
+            device.device_type,
+            device._refresh_interval,  # noqa: SLF001
+        )
+
+    def set_refresh_interval(
+        self,
+        refresh_interval: int,
+        device_id: int | None = None,
+        device_type: DeviceType | None = None,
+    ) -> None:
+        """Set refresh interval of one device, of a device type or of all."""
+        if device_id is not None:
+            self._refresh_intervals[device_id] = refresh_interval
+        elif device_type is not None:
+            self._type_refresh_intervals[device_type] = refresh_interval
+        else:
+            self._refresh_intervals.clear()
+            self._type_refresh_intervals.clear()
+            for managed in self._devices.values():
+                managed.device.set_refresh_interval(refresh_interval)
+        # reschedule the affected refreshes with the new interval
+        now = asyncio.get_running_loop().time()
+        affected = {
+            managed.device_id
+            for managed in self._devices.values()
+            if (device_id is None or managed.device_id == device_id)
+            and (device_type is None or managed.device.device_type == device_type)
+        }
+        self._queue = [
+            entry
+            for entry in self._queue
+            if entry[2] != Job.REFRESH or entry[3] not in affected
+        ]
+        heapq.heapify(self._queue)
+        for managed_id in affected:
+            managed = self._devices[managed_id]
+            interval = self.refresh_interval(managed.device)
+            if interval > 0:
+                self._push(now + self._spread(interval), Job.REFRESH, managed_id)
+        self._wakeup.set()
+
+    def start(self) -> None:
+        """Open every device and start the scheduler on the running loop."""
+        if self._task is not None:
+            return
+        for managed in self._devices.values():
+            managed.open()
+        self._task = asyncio.get_running_loop().create_task(
+            self._run(),
+            name="midea-manager",
+        )
+
+    async def stop(self) -> None:
+        """Stop the scheduler and close every device."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        for poll in list(self._polls):
+            poll.cancel()
+        await asyncio.gather(*self._polls, return_exceptions=True)
+        await asyncio.gather(*(managed.close() for managed in self._devices.values()))
+
+    def _spread(self, interval: float) -> float:
+        """Get the initial delay of the next device within interval."""
+        return (next(self._phase) * _PHASE_STEP) % 1 * interval
+
+    def _next_due(self, now: float, interval: float) -> float:
+        """Get the jittered due time of a job repeating every interval."""
+        jitter = interval * self._jitter
+        return now + interval + random.uniform(-jitter, jitter)  # noqa: S311
+
+    def _push(self, due: float, job: Job, device_id: int) -> None:
+        heapq.heappush(self._queue, (due, next(self._seq), job, device_id))
+
+    def _schedule_device(self, managed: AsyncMideaDevice, now: float) -> None:
+        """Queue the first refresh and heartbeat of a device."""
+        device = managed.device
+        phase = self._spread(1.0)
+        interval = self.refresh_interval(device)
+        if interval > 0:
+            self._push(now + phase * interval, Job.REFRESH, managed.device_id)
+        heartbeat = device._heartbeat_interval  # noqa: SLF001
+        self._push(now + phase * heartbeat, Job.HEARTBEAT, managed.device_id)
+        self._wakeup.set()
+
+    def _unschedule(self, device_id: int) -> None:
+        self._queue = [entry for entry in self._queue if entry[3] != device_id]
+        heapq.heapify(self._queue)
+
+    async def _run(self) -> None:
+        """Pop due jobs and dispatch them until stopped."""
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            now = loop.time()
+            if not self._queue or self._queue[0][0] > now:
+                timeout = self._queue[0][0] - now if self._queue else None
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                continue
+            _, _, job, device_id = heapq.heappop(self._queue)
+            managed = self._devices.get(device_id)
+            if managed is None:
+                continue
+            if job == Job.REFRESH:
+                interval = self.refresh_interval(managed.device)
+                if interval <= 0:
+                    continue
+                self._push(self._next_due(now, interval), job, device_id)
+                self._dispatch_refresh(managed)
+            else:
+                heartbeat = managed.device._heartbeat_interval  # noqa: SLF001
+                self._push(self._next_due(now, heartbeat), job, device_id)
+                self._heartbeat(managed)
+
+    def _dispatch_refresh(self, managed: AsyncMideaDevice) -> None:
+        """Start a poll unless the device is offline or still polling."""
+        if not managed.connected:
+            return
+        name = f"midea-poll-{managed.device_id}"
+        if any(poll.get_name() == name for poll in self._polls):
+            _LOGGER.debug("[%s] Previous refresh still pending", managed.device_id)
+            return
+        poll = asyncio.get_running_loop().create_task(self._poll(managed), name=name)
+        self._polls.add(poll)
+        poll.add_done_callback(self._polls.discard)
+
+    async def _poll(self, managed: AsyncMideaDevice) -> None:
+        try:
+            await managed.poll()
+        except NoSupportedProtocol:
+            _LOGGER.debug("[%s] No Supported protocol", managed.device_id)
+        except (SocketException, OSError):
+            _LOGGER.debug("[%s] Socket error", managed.device_id)
+            managed.device.close_socket()
+        except Exception as e:
+            _LOGGER.exception(
+                "[%s] Unexpected error during refresh",
+                managed.device_id,
+                exc_info=e,
+            )
+
+    def _heartbeat(self, managed: AsyncMideaDevice) -> None:
+        if not managed.connected:
+            return
+        try:
+            managed.device.send_heartbeat()
+        except (SocketException, OSError):
+            _LOGGER.debug("[%s] Socket error", managed.device_id)
+            managed.device.close_socket()
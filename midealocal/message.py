@@ -2,13 +2,15 @@
 
 import logging
 import warnings
-from collections.abc import Callable
+from collections.abc import Callable, Container
 from enum import IntEnum
-from typing import Any, SupportsIndex, cast
+from typing import Any, SupportsIndex
 
 from typing_extensions import deprecated
 
+from midealocal.checksum import sum8
 from midealocal.const import DeviceType
+from midealocal.crc8 import calculate
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -335,6 +337,28 @@ class MessageType(IntEnum):
         return "Unknown"
 
 
+class HexDump:
+    """Bytes formatted as hex only when a log record is emitted.
+
+    Passed as a logging argument instead of ``data.hex()``, which runs even
+    when the level is disabled.
+    """
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data: bytes | bytearray) -> None:
+        """Initialize hex dump."""
+        self._data = data
+
+    def __str__(self) -> str:
+        """Hex of the bytes."""
+        return self._data.hex()
+
+
+# instance attributes already shown by MessageBase.__str__ as header and body
+_FORMATTED_AS_PROPERTY = frozenset({"_header", "_body"})
+
+
 class MessageBase:
     """Message base."""
 
@@ -348,9 +372,9 @@ class MessageBase:
         self._message_protocol_version: int = 0
 
     @staticmethod
-    def checksum(data: bytes | bytearray) -> SupportsIndex:
+    def checksum(data: bytes | bytearray | memoryview) -> SupportsIndex:
         """Message checksum."""
-        return cast("SupportsIndex", (~sum(data) + 1) & 0xFF)
+        return sum8(data)
 
     @property
     def header(self) -> bytearray:
@@ -419,9 +443,11 @@ class MessageBase:
 
     def __str__(self) -> str:
         """Parse to string."""
-        # get attributes and value
+        # get attributes and value, header and body are serialized once below
         attributes = {
-            key: self._format_attribute(value) for key, value in self.__dict__.items()
+            key: value.hex() if isinstance(value, bytes | bytearray) else value
+            for key, value in self.__dict__.items()
+            if key not in _FORMATTED_AS_PROPERTY
         }
 
         # update some attributes
@@ -443,6 +469,16 @@ class MessageBase:
 class MessageRequest(MessageBase):
     """Message request."""
 
+    # whether equal requests always serialize to the same bytes, but for their
+    # rolling attributes, so a device may reuse the encrypted payload of a
+    # query (see MideaDevice.build_send)
+    CACHEABLE = True
+    # attributes changing from one request to the next, left out of the cache
+    # key and written into the reused bytes by roll()
+    ROLLING_ATTRIBUTES: tuple[str, ...] = ()
+    # trailing serialized bytes depending on them, encrypted again every time
+    ROLLING_TAIL = 0
+
     def __init__(
         self,
         device_type: DeviceType,
@@ -499,10 +535,24 @@ class MessageRequest(MessageBase):
 
     def serialize(self) -> bytearray:
         """Serialize message."""
-        stream = self.header + self.body
-        stream.append(MessageBase.checksum(stream[1:]))
+        header = self.header
+        body = self.body
+        stream = header + body
+        # sum the parts in place, the sync byte is not covered
+        stream.append(sum8(memoryview(header)[1:], body))
         return stream
 
+    def roll(self, stream: bytearray) -> None:
+        """Write the rolling attributes into the serialization of an equal request."""
+        raise NotImplementedError
+
+
+def roll_message_id(stream: bytearray, message_id: int) -> None:
+    """Rewrite the message id, body crc and checksum ending a serialized request."""
+    stream[-3] = message_id
+    stream[-2] = calculate(stream[MessageBase.HEADER_LENGTH : -2])
+    stream[-1] = sum8(memoryview(stream)[1:-1])
+
 
 class MessageQuestCustom(MessageRequest):
     """Message quest custom."""
@@ -858,6 +908,10 @@ class NewProtocolPackLength(IntEnum):
     FIVE = 5
 
 
+# body type and param count ahead of the new protocol params
+NEW_PROTOCOL_HEADER_LENGTH = 2
+
+
 class NewProtocolMessageBody(MessageBody):
     """New protocol message body."""
 
@@ -881,55 +935,75 @@ class NewProtocolMessageBody(MessageBody):
             "set new-protocol, len %s, param %s,value %s, result %s",
             pack_len,
             hex(param),
-            value.hex(),
-            stream.hex(),
+            HexDump(value),
+            HexDump(stream),
         )
         return stream
 
-    def parse(self) -> dict[int, bytearray]:
-        """Parse new protocol body."""
-        result = {}
-        try:
-            pos = 2  # # 跳过协议头(b1)和参数数量
-            param_count = self.data[1]  # 参数数量
-            for _ in range(param_count):
-                if pos + 2 > len(self.data):  # 防止越界
-                    break
-                param = self.data[pos] + (self.data[pos + 1] << 8)
-                pos += 2
-                if self._pack_len == NewProtocolPackLength.FIVE:
-                    if pos >= len(self.data):  # 防止越界
-                        break
-                    pos += 1  # 跳过固定字节0x00
-                if pos >= len(self.data):  # 防止越界
-                    break
-                length = self.data[pos]  # 读取param length
-                pos += 1
-                # length and value exist
-                if length > 0:
-                    if pos + length > len(self.data):  # 防止越界
-                        break
-                    value = self.data[pos : pos + length]
-                    result[param] = bytearray(value)
-                    pos += length
-                # length is 0 and no value
-                else:
-                    pass  # 不添加任何键值对
-        except IndexError:
+    def index(self, tags: Container[int] | None = None) -> dict[int, memoryview]:
+        """Index the params of the body in a single pass.
+
+        Values are read-only views into the body, not copies, and only the
+        params in tags are kept when given. A body too short to hold the
+        param count, or a param running past its end, stops the walk with
+        what was read so far.
+        """
+        data = self.data
+        end = len(data)
+        result: dict[int, memoryview] = {}
+        if end < NEW_PROTOCOL_HEADER_LENGTH:
             # Some device used non-standard new-protocol(美的乐享三代中央空调?)
-            _LOGGER.debug("Non-standard new-protocol %s", self.data.hex())
-        # format result key to hex for debug log
-        hex_result = {hex(k): v for k, v in result.items()}
-        _LOGGER.debug(
-            "new-protocol %s, len %s, param_count %s, parsed result %s, len %s",
-            self.data.hex(),
-            self._pack_len,
-            param_count,
-            hex_result,
-            len(result),
-        )
+            _LOGGER.debug("Non-standard new-protocol %s", HexDump(data))
+            return result
+        view = memoryview(data).toreadonly()
+        # param id (2 bytes), fixed 0x00 with five bytes packing, length
+        prefix = 4 if self._pack_len == NewProtocolPackLength.FIVE else 3
+        pos = NEW_PROTOCOL_HEADER_LENGTH
+        for _ in range(data[1]):
+            start = pos + prefix
+            if start > end:
+                break
+            length = data[start - 1]
+            pos = start + length
+            if pos > end:
+                break
+            # params without value are skipped
+            if not length:
+                continue
+            param = data[start - prefix] | (data[start - prefix + 1] << 8)
+            if tags is None or param in tags:
+                result[param] = view[start:pos]
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug(
+                "new-protocol %s, len %s, param_count %s, parsed result %s",
+                HexDump(data),
+                self._pack_len,
+                data[1],
+                {hex(k): v.hex() for k, v in result.items()},
+            )
         return result
 
+    def parse(self) -> dict[int, bytearray]:
+        """Parse new protocol body into copies of the param values."""
+        return {param: bytearray(value) for param, value in self.index().items()}
+
+
+# names every response class can't set through its instance dict
+_DESCRIPTORS: dict[type, frozenset[str]] = {}
+
+
+def _descriptors(cls: type) -> frozenset[str]:
+    """Return the names that can't be set through the instance dict of cls."""
+    names = _DESCRIPTORS.get(cls)
+    if names is None:
+        names = _DESCRIPTORS[cls] = frozenset(
+            name
+            for klass in cls.__mro__
+            for name, value in vars(klass).items()
+            if hasattr(value, "__set__")
+        ) | {"data"}
+    return names
+
 
 class MessageResponse(MessageBase):
     """Message response."""
@@ -962,11 +1036,23 @@ class MessageResponse(MessageBase):
         self._body = body
 
     def set_attr(self) -> None:
-        """Message response set attribute."""
-        for key in vars(self._body):
-            if key != "data":
-                value = getattr(self._body, key, None)
-                setattr(self, key, value)
+        """Message response set attribute.
+
+        The response takes over the attribute dict of the body, which keeps
+        its data only, instead of holding a copy of every body attribute.
+        """
+        body = self._body
+        fields = vars(body)
+        if not _descriptors(type(self)).isdisjoint(fields):
+            for key in fields:
+                if key != "data":
+                    setattr(self, key, fields[key])
+            return
+        # body attributes win over the response ones, as if set on it
+        for key, value in vars(self).items():
+            fields.setdefault(key, value)
+        self.__dict__ = fields
+        body.__dict__ = {"_data": fields["_data"], "parser_list": body.parser_list}
 
 
 class MessageApplianceResponse(MessageResponse):
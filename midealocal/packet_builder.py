@@ -2,14 +2,24 @@
 
 from datetime import UTC, datetime
 
+from .checksum import sum8
 from .security import LocalSecurity
 
 
 class PacketBuilder:
     """Packet builder."""
 
-    def __init__(self, device_id: int, command: bytes | bytearray) -> None:
-        """Initialize packet builder."""
+    def __init__(
+        self,
+        device_id: int,
+        command: bytes | bytearray,
+        encrypted: bool = False,
+    ) -> None:
+        """Initialize packet builder.
+
+        With ``encrypted`` the command is already AES encrypted (e.g. a cached
+        query) and only the time, length and checksum are computed.
+        """
         self.command: bytes | bytearray
         self.security = LocalSecurity()
         # aa20ac00000000000003418100ff03ff000200000000000000000000000006f274
@@ -69,12 +79,15 @@ class PacketBuilder:
         self.packet[12:20] = self.packet_time()
         self.packet[20:28] = device_id.to_bytes(8, "little")
         self.command = command
+        self.encrypted = encrypted
 
     def finalize(self, msg_type: int = 1) -> bytes:
         """Finalize packet builder."""
         if msg_type != 1:
             self.packet[3] = 0x10
             self.packet[6] = 0x7B
+        elif self.encrypted:
+            self.packet.extend(self.command)
         else:
             self.packet.extend(self.security.aes_encrypt(self.command))
         # PacketLenght
@@ -90,7 +103,7 @@ class PacketBuilder:
     @staticmethod
     def checksum(data: bytes) -> int:
         """Packet builder checksum."""
-        return (~sum(data) + 1) & 0xFF
+        return sum8(data)
 
     @staticmethod
     def packet_time() -> bytearray:
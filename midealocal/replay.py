@@ -0,0 +1,352 @@
+"""Midea local offline replay of captured device traffic.
+
+The bytes a device sent over TCP, read from a pcap file or a JSON lines
+file, are fed through the real receive pipeline of a MideaDevice
+(parse_message, decode_8370_frames or fetch_v2_frames, aes_decrypt,
+process_message and update_all) to measure its throughput without the
+appliance. Every stage is timed per call, which adds a little overhead to
+the figures, and a second pass traces the memory allocated while decoding.
+"""
+
+import json
+import struct
+import time
+import tracemalloc
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from .const import ProtocolVersion
+from .device import MideaDevice
+
+# default TCP port of the devices, the source port of their segments
+DEVICE_PORT = 6444
+# stages timed by replay(), in pipeline order
+STAGES = (
+    "parse_message",
+    "decode_8370_frames",
+    "fetch_v2_frames",
+    "aes_decrypt",
+    "process_message",
+    "update_all",
+)
+
+# pcap magic numbers, with microsecond and nanosecond timestamps
+_PCAP_MAGICS = (0xA1B2C3D4, 0xA1B23C4D)
+_PCAPNG_MAGIC = b"\x0a\x0d\x0d\x0a"
+_PCAP_HEADER_LENGTH = 24
+_RECORD_HEADER_LENGTH = 16
+# link layer header lengths and the offset of their ethertype
+_LINK_LAYERS = {
+    0: None,  # BSD loopback, 4 bytes address family
+    1: (14, 12),  # Ethernet
+    101: (0, None),  # raw IP
+    113: (16, 14),  # Linux cooked capture
+    276: (20, 0),  # Linux cooked capture v2
+}
+_ETHERTYPE_IPV4 = 0x0800
+_ETHERTYPE_IPV6 = 0x86DD
+_ETHERTYPE_VLAN = 0x8100
+_IPV4 = 4
+_IPV6 = 6
+_TCP = 6
+_TCP_SYN = 0x02
+_SEQ_MASK = 0xFFFFFFFF
+_SEQ_HALF = 0x80000000
+
+
+def read_jsonl(path: str | Path) -> list[list[bytes]]:
+    """Read the device streams of a JSON lines capture.
+
+    Every line is an object with the hex ``data`` received on a connection,
+    optionally its ``stream`` (0 by default) and its ``direction``: lines
+    with direction "out", sent to the device, are skipped.
+    """
+    streams: dict[int, list[bytes]] = {}
+    with Path(path).open(encoding="utf-8") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get("direction", "in") == "out":
+                continue
+            chunks = streams.setdefault(int(record.get("stream", 0)), [])
+            chunks.append(bytes.fromhex(record["data"]))
+    return list(streams.values())
+
+
+def _ip_payload(packet: bytes, ethertype: int | None) -> tuple[bytes, bytes] | None:
+    """Return the TCP segment and source address of an IP packet."""
+    version = packet[0] >> 4 if packet else 0
+    if version == _IPV4 and ethertype in (None, _ETHERTYPE_IPV4):
+        if packet[9] != _TCP:
+            return None
+        header = (packet[0] & 0x0F) * 4
+        total = int.from_bytes(packet[2:4], "big")
+        return packet[header:total], packet[12:20]
+    if version == _IPV6 and ethertype in (None, _ETHERTYPE_IPV6):
+        # extension headers are not followed
+        if packet[6] != _TCP:
+            return None
+        total = 40 + int.from_bytes(packet[4:6], "big")
+        return packet[40:total], packet[8:40]
+    return None
+
+
+def read_pcap(path: str | Path, port: int = DEVICE_PORT) -> list[list[bytes]]:
+    """Read the device streams of a pcap capture.
+
+    The payloads of the TCP segments sent from port are gathered per
+    connection, retransmitted bytes are dropped. Only the classic pcap
+    format is read, over Ethernet, Linux cooked or raw IPv4/IPv6.
+    """
+    data = Path(path).read_bytes()
+    if len(data) < _PCAP_HEADER_LENGTH:
+        msg = f"{path} is not a pcap capture"
+        raise ValueError(msg)
+    if data[:4] == _PCAPNG_MAGIC:
+        msg = "pcapng captures are not supported, save the capture as pcap"
+        raise ValueError(msg)
+    for order in "<>":
+        magic, _, _, _, _, _, link_type = struct.unpack_from(f"{order}IHHiIII", data)
+        if magic in _PCAP_MAGICS:
+            break
+    else:
+        msg = f"{path} is not a pcap capture"
+        raise ValueError(msg)
+    if link_type not in _LINK_LAYERS:
+        msg = f"Unsupported pcap link type {link_type}"
+        raise ValueError(msg)
+    layer = _LINK_LAYERS[link_type]
+    streams: list[list[bytes]] = []
+    # connection to its stream index and next expected sequence number
+    connections: dict[tuple[bytes, int, int], list[int]] = {}
+    pos = _PCAP_HEADER_LENGTH
+    while pos + _RECORD_HEADER_LENGTH <= len(data):
+        length = struct.unpack_from(f"{order}I", data, pos + 8)[0]
+        pos += _RECORD_HEADER_LENGTH
+        frame = data[pos : pos + length]
+        pos += length
+        if layer is None:
+            packet, ethertype = frame[4:], None
+        else:
+            offset, type_at = layer
+            ethertype = None
+            if type_at is not None:
+                ethertype = int.from_bytes(frame[type_at : type_at + 2], "big")
+                if ethertype == _ETHERTYPE_VLAN:
+                    ethertype = int.from_bytes(frame[offset + 2 : offset + 4], "big")
+                    offset += 4
+            packet = frame[offset:]
+        found = _ip_payload(packet, ethertype)
+        if found is None:
+            continue
+        segment, address = found
+        source, destination = struct.unpack_from(">HH", segment)
+        if source != port:
+            continue
+        seq = int.from_bytes(segment[4:8], "big")
+        payload = segment[(segment[12] >> 4) * 4 :]
+        key = (address, source, destination)
+        if segment[13] & _TCP_SYN:
+            # a new connection, the SYN takes a sequence number
+            connections[key] = [len(streams), (seq + 1) & _SEQ_MASK]
+            streams.append([])
+            continue
+        if key not in connections:
+            # the capture started in the middle of the connection
+            connections[key] = [len(streams), seq]
+            streams.append([])
+        index, expected = connections[key]
+        end = (seq + len(payload)) & _SEQ_MASK
+        # bytes of the segment already received, unless it follows a gap
+        seen = (expected - seq) & _SEQ_MASK
+        if seen < _SEQ_HALF:
+            if seen >= len(payload):
+                continue
+            payload = payload[seen:]
+        connections[key][1] = end
+        streams[index].append(payload)
+    return [chunks for chunks in streams if chunks]
+
+
+def read_capture(path: str | Path, port: int = DEVICE_PORT) -> list[list[bytes]]:
+    """Read the device streams of a pcap or JSON lines capture."""
+    if Path(path).suffix in (".jsonl", ".json"):
+        return read_jsonl(path)
+    return read_pcap(path, port)
+
+
+@dataclass
+class StageStats:
+    """Latencies of the calls to a pipeline stage, in nanoseconds."""
+
+    name: str
+    samples: list[int] = field(default_factory=list)
+
+    def percentile(self, fraction: float) -> float:
+        """Nearest rank percentile, in microseconds."""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] / 1000
+
+    @property
+    def p50(self) -> float:
+        """Median latency in microseconds."""
+        return self.percentile(0.5)
+
+    @property
+    def p99(self) -> float:
+        """99th percentile latency in microseconds."""
+        return self.percentile(0.99)
+
+
+@dataclass
+class ReplayReport:
+    """Outcome of replay()."""
+
+    chunks: int = 0
+    frames: int = 0
+    seconds: float = 0.0
+    stages: dict[str, StageStats] = field(default_factory=dict)
+    # mean of the peak memory allocated while parsing a chunk, per frame
+    allocated_per_frame: float = 0.0
+    # memory still held by the device after the allocation pass
+    retained: int = 0
+
+    @property
+    def frames_per_second(self) -> float:
+        """Decoded frames per second of parse_message()."""
+        return self.frames / self.seconds if self.seconds else 0.0
+
+    def lines(self) -> list[str]:
+        """Format the report."""
+        lines = [
+            (
+                f"{self.frames} frames in {self.chunks} chunks, "
+                f"{self.frames_per_second:.0f} frames/s"
+            ),
+            (
+                f"allocated {self.allocated_per_frame:.0f} B per frame, "
+                f"retained {self.retained} B"
+            ),
+        ]
+        lines.extend(
+            f"{stats.name:<20} {len(stats.samples):>8} calls  "
+            f"p50 {stats.p50:8.2f} us  p99 {stats.p99:8.2f} us"
+            for stats in self.stages.values()
+            if stats.samples
+        )
+        return lines
+
+
+def _timed(call: Callable[..., Any], samples: list[int]) -> Callable[..., Any]:
+    """Wrap call to record its latency."""
+
+    def timed(*args: object, **kwargs: object) -> Any:  # noqa: ANN401
+        start = time.perf_counter_ns()
+        try:
+            return call(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter_ns() - start)
+
+    return timed
+
+
+def _replay_streams(device: MideaDevice, streams: Iterable[list[bytes]]) -> int:
+    """Feed the streams to the device, return the number of chunks."""
+    chunks = 0
+    for stream in streams:
+        device.close_socket()
+        data = iter(stream)
+        if device._device_protocol_version == ProtocolVersion.V3:  # noqa: SLF001
+            # the handshake response opens every V3 connection
+            response = next(data, None)
+            if response is None:
+                continue
+            device._auth_complete(response)  # noqa: SLF001
+        for chunk in data:
+            device.parse_message(chunk)
+            chunks += 1
+    return chunks
+
+
+def replay(
+    device: MideaDevice,
+    streams: list[list[bytes]],
+    repeat: int = 1,
+    trace_allocations: bool = True,
+) -> ReplayReport:
+    """Replay captured device streams through device and report the cost.
+
+    Each stream is a connection: the buffer is reset ahead of it and, for
+    V3 devices, its first chunk is the handshake response the session key
+    is derived from, so the token and key of the device must be the ones of
+    the capture. The streams are replayed repeat times, then once more with
+    allocations traced unless trace_allocations is False.
+    """
+    report = ReplayReport(stages={name: StageStats(name) for name in STAGES})
+    security = device._security  # noqa: SLF001
+    owners: dict[str, Any] = {
+        "parse_message": device,
+        "decode_8370_frames": security,
+        "fetch_v2_frames": device,
+        "aes_decrypt": security,
+        "process_message": device,
+        "update_all": device,
+    }
+    device._is_run = True  # noqa: SLF001
+    for name, owner in owners.items():
+        setattr(owner, name, _timed(getattr(owner, name), report.stages[name].samples))
+    try:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            report.chunks += _replay_streams(device, streams)
+        report.seconds = time.perf_counter() - start
+        report.frames = len(report.stages["process_message"].samples)
+        if trace_allocations:
+            for name, owner in owners.items():
+                delattr(owner, name)
+            report.allocated_per_frame, report.retained = _trace(device, streams)
+    finally:
+        for name, owner in owners.items():
+            vars(owner).pop(name, None)
+        device._is_run = False  # noqa: SLF001
+    return report
+
+
+def _trace(device: MideaDevice, streams: list[list[bytes]]) -> tuple[float, int]:
+    """Return the allocated bytes per frame and the retained bytes."""
+    frames = 0
+    allocated = 0
+    process_message = device.process_message
+
+    def counted(msg: bytes) -> dict[str, Any]:
+        nonlocal frames
+        frames += 1
+        return process_message(msg)
+
+    device.process_message = counted  # type: ignore[method-assign]
+    parse_message = device.parse_message
+
+    def traced(msg: bytes) -> Any:  # noqa: ANN401
+        nonlocal allocated
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        result = parse_message(msg)
+        allocated += tracemalloc.get_traced_memory()[1] - current
+        return result
+
+    device.parse_message = traced  # type: ignore[method-assign]
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        _replay_streams(device, streams)
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+        del device.process_message
+        del device.parse_message
+    return (allocated / frames if frames else 0.0), retained
@@ -1,9 +1,11 @@
 """Midea local security."""
 
 import hmac
+import threading
 from enum import IntEnum
+from functools import lru_cache
 from hashlib import md5, sha256
-from typing import Any, cast
+from typing import TYPE_CHECKING, Any, cast
 from urllib.parse import unquote_plus, urlencode, urlparse
 
 from Crypto.Cipher import AES
@@ -19,6 +21,10 @@ from .exceptions import (
     DataUnexpectedLength,
     MessageWrongFormat,
 )
+from .stream import StreamBuffer
+
+if TYPE_CHECKING:
+    from Crypto.Cipher._mode_ecb import EcbMode
 
 Buffer = bytes | bytearray | memoryview  # alias from Crypto.Cipher.AES
 
@@ -33,6 +39,95 @@ MSGTYPE_ENCRYPTED_REQUEST = 0x6
 TCP_KEY_RESPONSE_LENGTH = 64
 
 
+# distinct cloud/device keys whose expanded AES key schedule is kept around
+CIPHER_CACHE_SIZE = 64
+
+
+@lru_cache(maxsize=CIPHER_CACHE_SIZE)
+def _ecb_cipher(key: bytes) -> "EcbMode":
+    """Get the ECB cipher of key, its key schedule is expanded only once."""
+    return AES.new(key, AES.MODE_ECB)
+
+
+class CbcCipher:
+    """AES-CBC restarting from the same IV for every message.
+
+    ``AES.new`` expands the key on every call. Here the key is expanded once:
+    decryption only needs ECB, each plain block being the decrypted block
+    xor the previous cipher block (the IV for the first one). Encryption
+    goes through one long-lived CBC encryptor, xoring the first plain block
+    with the last cipher block it produced cancels the chaining so every
+    message starts from the IV again.
+    """
+
+    def __init__(self, key: bytes, iv: bytes) -> None:
+        """Initialize CBC cipher."""
+        self._iv = iv
+        self._ecb = AES.new(key, AES.MODE_ECB)
+        self._cbc = AES.new(key, AES.MODE_CBC, iv=iv)
+        self._last = iv
+        self._lock = threading.Lock()
+
+    def decrypt(self, data: Buffer) -> bytes:
+        """Decrypt a message, its length must be a multiple of the block size."""
+        if len(data) == 0:
+            return b""
+        return strxor(self._ecb.decrypt(data), self._iv + data[:-16])
+
+    def encrypt(self, data: bytes) -> bytes:
+        """Encrypt a message, its length must be a multiple of the block size."""
+        if len(data) == 0:
+            return b""
+        if len(data) % AES.block_size:
+            # checked up front, a partial encrypt would break the chaining
+            raise ValueError("Data must be padded to 16 byte boundary in CBC mode")
+        with self._lock:
+            first = strxor(strxor(data[:16], self._iv), self._last)
+            encrypted = self._cbc.encrypt(first + data[16:])
+            self._last = encrypted[-16:]
+        return encrypted
+
+
+@lru_cache(maxsize=CIPHER_CACHE_SIZE)
+def _cbc_cipher(key: bytes, iv: bytes) -> CbcCipher:
+    """Get the CBC cipher of key and iv."""
+    return CbcCipher(key, iv)
+
+
+class StreamDecryptor:
+    """Decrypt a hex encoded AES ciphertext received in chunks.
+
+    The last plain block is held back until finalize() removes its padding.
+    """
+
+    def __init__(self, key: bytes, iv: bytes | None = None) -> None:
+        """Initialize stream decryptor, ECB without iv, CBC otherwise."""
+        self._cipher = (
+            _ecb_cipher(key)
+            if iv is None or iv == b"0"
+            else AES.new(key, AES.MODE_CBC, iv=iv)
+        )
+        self._hex = ""
+        self._last = b""
+
+    def update(self, data: str) -> bytes:
+        """Decrypt the next chunk, return the plain bytes now complete."""
+        data = self._hex + "".join(data.split())
+        usable = len(data) - len(data) % (AES.block_size * 2)
+        self._hex = data[usable:]
+        if not usable:
+            return b""
+        plain = self._last + self._cipher.decrypt(bytes.fromhex(data[:usable]))
+        self._last = plain[-AES.block_size :]
+        return plain[: -AES.block_size]
+
+    def finalize(self) -> bytes:
+        """Return the unpadded last block."""
+        if self._hex:
+            raise ValueError("Ciphertext is not a multiple of the block size")
+        return unpad(self._last, AES.block_size) if self._last else b""
+
+
 class UdpIdMethod(IntEnum):
     """Udp Id format method."""
 
@@ -122,6 +217,12 @@ class CloudSecurity:
         """Decrypt AES with fixed key."""
         return self.aes_decrypt(data, self._fixed_key, self._fixed_iv)
 
+    def fixed_key_decryptor(self) -> StreamDecryptor:
+        """Get a stream decryptor of the fixed key."""
+        if self._fixed_key is None:
+            raise ValueError("Decrypt need a key")
+        return StreamDecryptor(self._fixed_key, self._fixed_iv)
+
     def aes_encrypt(
         self,
         data: str | bytes,
@@ -142,9 +243,9 @@ class CloudSecurity:
         if isinstance(data, str):
             data = bytes.fromhex(data)
         if aes_iv is None or aes_iv == b"0":  # ECB
-            return AES.new(aes_key, AES.MODE_ECB).encrypt(pad(data, 16))
+            return _ecb_cipher(aes_key).encrypt(pad(data, 16))
         # CBC
-        return AES.new(aes_key, AES.MODE_CBC, iv=aes_iv).encrypt(pad(data, 16))
+        return _cbc_cipher(aes_key, aes_iv).encrypt(pad(data, 16))
 
     def aes_decrypt(
         self,
@@ -167,11 +268,11 @@ class CloudSecurity:
             data = bytes.fromhex(data)
         if aes_iv is None or aes_iv == b"0":  # ECB
             return unpad(
-                AES.new(aes_key, AES.MODE_ECB).decrypt(data),
+                _ecb_cipher(aes_key).decrypt(data),
                 len(aes_key),
             ).decode()
         return unpad(
-            AES.new(aes_key, AES.MODE_CBC, iv=aes_iv).decrypt(data),
+            _cbc_cipher(aes_key, aes_iv).decrypt(data),
             len(aes_key),
         ).decode()
 
@@ -263,6 +364,7 @@ class LocalSecurity:
             ),
         )
         self._tcp_key: bytes
+        self._tcp_cipher: CbcCipher | None = None
         self._request_count = 0
         self._response_count = 0
 
@@ -271,24 +373,30 @@ class LocalSecurity:
         try:
             return cast(
                 "bytearray",
-                unpad(AES.new(self.aes_key, AES.MODE_ECB).decrypt(bytearray(raw)), 16),
+                unpad(_ecb_cipher(self.aes_key).decrypt(bytearray(raw)), 16),
             )
         except ValueError:
             return bytearray(0)
 
     def aes_encrypt(self, raw: bytes | bytearray) -> bytes:
         """Encrypt AES."""
-        return AES.new(self.aes_key, AES.MODE_ECB).encrypt(
+        return _ecb_cipher(self.aes_key).encrypt(
             bytearray(pad(bytes(raw), 16)),
         )
 
-    def aes_cbc_decrypt(self, raw: bytes, key: Buffer) -> bytes:
+    def _cbc_cipher(self, key: Buffer) -> CbcCipher:
+        """Get the CBC cipher of the session key or of another key."""
+        if self._tcp_cipher is not None and key is self._tcp_key:
+            return self._tcp_cipher
+        return _cbc_cipher(bytes(key), self.iv)
+
+    def aes_cbc_decrypt(self, raw: Buffer, key: Buffer) -> bytes:
         """Decrypt AES with CBC."""
-        return AES.new(key=key, mode=AES.MODE_CBC, iv=self.iv).decrypt(raw)
+        return self._cbc_cipher(key).decrypt(raw)
 
     def aes_cbc_encrypt(self, raw: bytes, key: Buffer) -> bytes:
         """Encrypt AES with CBC."""
-        return AES.new(key=key, mode=AES.MODE_CBC, iv=self.iv).encrypt(raw)
+        return self._cbc_cipher(key).encrypt(raw)
 
     def encode32_data(self, raw: bytes | bytearray) -> bytes:
         """Encode 32 data."""
@@ -306,6 +414,7 @@ class LocalSecurity:
         if sha256(plain).digest() != sign:
             raise DataSignDoesntMatch
         self._tcp_key = strxor(plain, bytes(key))
+        self._tcp_cipher = CbcCipher(self._tcp_key, self.iv)
         self._request_count = 0
         self._response_count = 0
         return self._tcp_key
@@ -333,34 +442,35 @@ class LocalSecurity:
 
     def decode_8370(self, data: bytes) -> tuple[list, bytes]:
         """Decode 8370 data."""
-        if len(data) < MIN_DECODE_8370_DATA_LENGTH:
-            return [], data
-        header = data[:6]
-        if header[0] != HEADER_8370_1ST_BYTE or header[1] != HEADER_8370_2ND_BYTE:
-            raise MessageWrongFormat("not an 8370 message")
-        size = int.from_bytes(header[2:4], "big") + 8
-        leftover = None
-        if len(data) > size:
-            leftover = data[size:]
-            data = data[:size]
-        elif len(data) < size:
-            return [], data
-        if header[4] != HEADER_8370_4TH_BYTE:
-            raise MessageWrongFormat("missing byte 4")
-        padding = header[5] >> 4
-        msgtype = header[5] & 0xF
-        data = data[6:]
-        if msgtype in (MSGTYPE_ENCRYPTED_RESPONSE, MSGTYPE_ENCRYPTED_REQUEST):
-            sign = data[-32:]
-            data = data[:-32]
-            data = self.aes_cbc_decrypt(raw=data, key=self._tcp_key)
-            if sha256(header + data).digest() != sign:
-                raise DataSignDoesntMatch
-            if padding:
-                data = data[:-padding]
-        self._response_count = int.from_bytes(data[:2], "big")
-        data = data[2:]
-        if leftover:
-            packets, incomplete = self.decode_8370(leftover)
-            return [data, *packets], incomplete
-        return [data], b""
+        buffer = StreamBuffer(len(data))
+        buffer.feed(data)
+        packets = self.decode_8370_frames(buffer)
+        return packets, bytes(buffer)
+
+    def decode_8370_frames(self, buffer: StreamBuffer) -> list[bytes]:
+        """Decode the complete 8370 frames, the incomplete tail stays in buffer."""
+        packets = []
+        while len(buffer) >= MIN_DECODE_8370_DATA_LENGTH:
+            view = buffer.view()
+            header = bytes(view[:6])
+            if header[0] != HEADER_8370_1ST_BYTE or header[1] != HEADER_8370_2ND_BYTE:
+                raise MessageWrongFormat("not an 8370 message")
+            size = int.from_bytes(header[2:4], "big") + 8
+            if len(view) < size:
+                break
+            if header[4] != HEADER_8370_4TH_BYTE:
+                raise MessageWrongFormat("missing byte 4")
+            padding = header[5] >> 4
+            msgtype = header[5] & 0xF
+            data: Buffer = view[6:size]
+            if msgtype in (MSGTYPE_ENCRYPTED_RESPONSE, MSGTYPE_ENCRYPTED_REQUEST):
+                sign = bytes(data[-32:])
+                data = self.aes_cbc_decrypt(raw=data[:-32], key=self._tcp_key)
+                if sha256(header + data).digest() != sign:
+                    raise DataSignDoesntMatch
+                if padding:
+                    data = data[:-padding]
+            self._response_count = int.from_bytes(data[:2], "big")
+            packets.append(bytes(data[2:]))
+            buffer.consume(size)
+        return packets
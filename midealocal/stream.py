@@ -0,0 +1,89 @@
+"""Midea local stream reassembly buffer."""
+
+import socket
+
+# initial capacity, a few receive chunks of 512 bytes
+DEFAULT_BUFFER_SIZE = 2048
+# minimum free space offered to a single receive
+MIN_RECV_SIZE = 512
+
+
+class StreamBuffer:
+    """Reassembly buffer for a byte stream.
+
+    Received bytes are written into one preallocated ``bytearray`` (directly
+    with ``recv_into`` or the ``asyncio.BufferedProtocol`` hooks), the pending
+    bytes are read through a ``memoryview`` and complete frames are dropped by
+    advancing a read offset. The consumed prefix is only compacted when more
+    room is needed, so frames are never copied more than once and memory
+    stays bounded by the largest pending data.
+
+    The storage is never resized in place, views handed out earlier stay
+    valid (but stale) after the buffer grows.
+    """
+
+    def __init__(self, size: int = DEFAULT_BUFFER_SIZE) -> None:
+        """Initialize stream buffer."""
+        self._data = bytearray(size)
+        self._start = 0
+        self._end = 0
+
+    def __len__(self) -> int:
+        """Get the number of pending bytes."""
+        return self._end - self._start
+
+    def __bytes__(self) -> bytes:
+        """Get a copy of the pending bytes."""
+        return bytes(self._data[self._start : self._end])
+
+    def hex(self) -> str:
+        """Get the pending bytes as hex."""
+        return self._data[self._start : self._end].hex()
+
+    def view(self) -> memoryview:
+        """Get a view of the pending bytes."""
+        return memoryview(self._data)[self._start : self._end]
+
+    def consume(self, size: int) -> None:
+        """Drop size bytes from the front of the pending bytes."""
+        self._start = min(self._start + size, self._end)
+        if self._start == self._end:
+            self._start = self._end = 0
+
+    def clear(self) -> None:
+        """Drop every pending byte."""
+        self._start = self._end = 0
+
+    def _reserve(self, size: int) -> memoryview:
+        """Make room for size more bytes and get a view of the free space."""
+        pending = self._end - self._start
+        if self._end + size > len(self._data):
+            if pending + size > len(self._data):
+                # grow into a new array instead of resizing under live views
+                data = bytearray(max(len(self._data) * 2, pending + size))
+            else:
+                data = self._data
+            data[:pending] = self._data[self._start : self._end]
+            self._data = data
+            self._start, self._end = 0, pending
+        return memoryview(self._data)[self._end :]
+
+    def feed(self, data: bytes) -> None:
+        """Append received bytes."""
+        size = len(data)
+        self._reserve(size)[:size] = data
+        self._end += size
+
+    def recv_into(self, sock: socket.socket, size: int = MIN_RECV_SIZE) -> int:
+        """Receive at most size bytes from sock straight into the buffer."""
+        received = sock.recv_into(self._reserve(size), size)
+        self._end += received
+        return received
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        """Get free space to receive into, see ``asyncio.BufferedProtocol``."""
+        return self._reserve(max(sizehint, MIN_RECV_SIZE))
+
+    def buffer_updated(self, nbytes: int) -> None:
+        """Commit nbytes written to the space from ``get_buffer``."""
+        self._end += nbytes
@@ -0,0 +1,281 @@
+"""Midea local asyncio device transport test."""
+
+import asyncio
+import threading
+from typing import Any
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+import pytest
+
+from midealocal.async_device import AsyncMideaDevice
+from midealocal.cloud import DEFAULT_KEYS
+from midealocal.const import DeviceType, ProtocolVersion
+from midealocal.device import MessageResult, MideaDevice, NoSupportedProtocol
+from midealocal.message import MessageQuestCustom, MessageType
+from midealocal.packet_builder import PacketBuilder
+
+STATUS_FRAME = PacketBuilder(1, bytearray([0xAA] + [0x01] * 31)).finalize()
+# response to the custom query: same message type and body type
+QUERY_FRAME = PacketBuilder(
+    1,
+    MessageQuestCustom(
+        DeviceType.AC,
+        0,
+        MessageType.query,
+        bytearray([0x41]),
+    ).serialize(),
+).finalize()
+
+
+class _QueryDevice(MideaDevice):
+    """MideaDevice with a single custom status query."""
+
+    def build_query(self) -> list:
+        return [
+            MessageQuestCustom(
+                self.device_type,
+                0,
+                MessageType.query,
+                bytearray([0x41]),
+            ),
+        ]
+
+    def process_message(self, msg: bytes) -> dict[str, Any]:  # noqa: ARG002
+        return {"power": True}
+
+
+class AsyncMideaDeviceTest(IsolatedAsyncioTestCase):
+    """Asyncio device transport test case."""
+
+    async def asyncSetUp(self) -> None:
+        """Start a fake appliance answering every frame with a status frame."""
+        self.received: list[bytes] = []
+        self.reply = True
+        self.frame = STATUS_FRAME
+        self.request_received = asyncio.Event()
+
+        async def handle(
+            reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter,
+        ) -> None:
+            while data := await reader.read(512):
+                self.received.append(data)
+                self.request_received.set()
+                if self.reply:
+                    writer.write(self.frame)
+                    await writer.drain()
+            writer.close()
+
+        self.server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        device = _QueryDevice(
+            name="Test Device",
+            device_id=1,
+            device_type=DeviceType.AC,
+            ip_address="127.0.0.1",
+            port=port,
+            token=DEFAULT_KEYS[99]["token"],
+            key=DEFAULT_KEYS[99]["key"],
+            device_protocol=ProtocolVersion.V2,
+            model="test_model",
+            subtype=1,
+            attributes={},
+        )
+        device._appliance_query = False
+        self.device = AsyncMideaDevice(device)
+
+    async def asyncTearDown(self) -> None:
+        """Stop the device and the fake appliance."""
+        await self.device.close()
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def test_connect_with_protocol_check(self) -> None:
+        """Test connect probes the query and publishes status updates."""
+        updates: list[dict[str, Any]] = []
+        self.device.register_update(updates.append)
+        self.device.device._is_run = True
+        assert await self.device.connect(check_protocol=True) is True
+        assert self.device.connected
+        assert self.device.available
+        assert {"power": True} in updates
+        assert {"available": True} in updates
+        assert self.device.device._unsupported_protocol == []
+
+    async def test_unanswered_query_is_unsupported(self) -> None:
+        """Test a query without response is retried and then blacklisted."""
+        self.reply = False
+        with patch("midealocal.async_device.QUERY_TIMEOUT", 0.05):
+            assert await self.device.connect() is True
+            with pytest.raises(NoSupportedProtocol):
+                await self.device.refresh_status(check_protocol=True)
+        assert self.device.device._unsupported_protocol == ["MessageQuestCustom"]
+        # initial send plus one retry
+        await asyncio.sleep(0.05)
+        assert len(self.received) == 2
+
+    async def test_pipelined_probe(self) -> None:
+        """Test a pipelined probe does not query again the answered queries."""
+        self.frame = QUERY_FRAME
+        self.device.device.set_pipelined_refresh(True)
+        assert await self.device.connect() is True
+        await self.device.refresh_status(check_protocol=True)
+        assert self.device.device._unsupported_protocol == []
+        assert self.device.device._responses is None
+        await asyncio.sleep(0.05)
+        assert len(self.received) == 1
+
+    async def test_pipelined_probe_falls_back(self) -> None:
+        """Test an unanswered pipelined query is probed again one by one."""
+        self.reply = False
+        self.device.device.set_pipelined_refresh(True)
+        with patch("midealocal.async_device.QUERY_TIMEOUT", 0.05):
+            assert await self.device.connect() is True
+            with pytest.raises(NoSupportedProtocol):
+                await self.device.refresh_status(check_protocol=True)
+        assert self.device.device._unsupported_protocol == ["MessageQuestCustom"]
+        # pipelined send, then the one by one probe and its retry
+        await asyncio.sleep(0.05)
+        assert len(self.received) == 3
+
+    async def test_connect_refused(self) -> None:
+        """Test connect failure leaves the device unavailable."""
+        self.server.close()
+        await self.server.wait_closed()
+        assert await self.device.connect(check_protocol=True) is False
+        assert not self.device.connected
+        assert not self.device.available
+
+    async def test_open_and_close(self) -> None:
+        """Test the service task connects, refreshes and stops on close."""
+        updated = asyncio.Event()
+        self.device.register_update(lambda _: updated.set())
+        self.device.open()
+        await asyncio.wait_for(updated.wait(), 1)
+        assert self.device.connected
+        await self.device.close()
+        assert not self.device.connected
+        assert self.device.device._is_run is False
+
+    async def test_set_attribute_writes_to_transport(self) -> None:
+        """Test set_attribute is forwarded without blocking on a socket."""
+        with patch.object(self.device.device, "set_attribute") as set_attr:
+            self.device.set_attribute("power", True)
+        set_attr.assert_called_once_with("power", True)
+
+    async def test_apply_waits_for_response(self) -> None:
+        """Test apply sends the set frame and reports the device answer."""
+        self.frame = QUERY_FRAME
+        device = self.device.device
+        query = device.build_query()[0]
+        with patch.object(
+            device,
+            "set_attribute",
+            side_effect=lambda *_: device.build_send(query),
+        ):
+            assert await self.device.apply("power", True) is False
+            assert await self.device.connect() is True
+            assert await self.device.apply("power", True) is True
+            self.reply = False
+            with patch("midealocal.async_device.QUERY_TIMEOUT", 0.05):
+                assert await self.device.apply("power", False) is False
+        assert self.device._query_waiter is None
+        assert len(self.received) == 2
+
+    async def test_apply_without_frame_returns_at_once(self) -> None:
+        """Test apply does not take a status frame for the answer of nothing."""
+        assert await self.device.connect() is True
+        # an unsolicited status frame arriving while apply() would wait
+        asyncio.get_running_loop().call_soon(
+            self.device.data_received,
+            QUERY_FRAME,
+        )
+        with patch.object(self.device.device, "set_attribute"):
+            async with asyncio.timeout(1):
+                assert await self.device.apply("power", True) is False
+        assert self.device._query_waiter is None
+        assert self.received == []
+
+    async def test_changes_are_merged_for_slow_consumers(self) -> None:
+        """Test changes published between reads are merged into one batch."""
+        device = self.device.device
+        with self.device.changes(attributes=["power", "mode"]) as changes:
+            device.update_all({"power": True, "mode": 1, "other": 1})
+            device.update_all({"mode": 2})
+            device.update_all({"mode": 2, "other": 2})
+            assert await anext(changes) == {"power": True, "mode": 2}
+            waiting = asyncio.ensure_future(anext(changes))
+            await asyncio.sleep(0)
+            assert not waiting.done()
+            device.update_all({"power": False})
+            assert await waiting == {"power": False}
+            device.update_all({"mode": 3})
+        assert [batch async for batch in changes] == [{"mode": 3}]
+        assert device._subscribers == []
+
+    async def test_authenticate(self) -> None:
+        """Test V3 handshake response is routed to the session key derivation."""
+        self.device.device._device_protocol_version = ProtocolVersion.V3
+        self.reply = False
+        threads: set[int] = set()
+        with patch.object(
+            self.device.device,
+            "_auth_complete",
+            side_effect=lambda _: threads.add(threading.get_ident()),
+        ) as auth_complete:
+            connect = asyncio.create_task(self.device.connect())
+            await self.request_received.wait()
+            self.device.data_received(b"\x83\x70handshake")
+            assert await connect is True
+        auth_complete.assert_called_once_with(b"\x83\x70handshake")
+        # it may update the key cache, not from the event loop thread
+        assert threads
+        assert threading.get_ident() not in threads
+
+    async def test_parse_error_aborts_pending_query(self) -> None:
+        """Test a parse failure wakes up the pending query waiter."""
+        waiter = asyncio.get_running_loop().create_future()
+        self.device._query_waiter = waiter
+        with patch.object(
+            self.device.device,
+            "_parse_buffer",
+            side_effect=ValueError("bad frame"),
+        ):
+            self.device.data_received(b"\x00")
+        with pytest.raises(ValueError, match="bad frame"):
+            await waiter
+
+    async def test_malformed_frame_closes_connection(self) -> None:
+        """Test a frame failing to decode is dropped with its connection."""
+        updates: list[dict[str, Any]] = []
+        self.device.register_update(updates.append)
+        self.device.device._is_run = True
+        assert await self.device.connect() is True
+        self.device.device._device_protocol_version = ProtocolVersion.V3
+        self.device.data_received(bytes(22))
+        assert len(self.device.device._buffer) == 0
+        assert not self.device.connected
+        self.device.device._device_protocol_version = ProtocolVersion.V2
+        assert await self.device.connect() is True
+        self.device.data_received(STATUS_FRAME)
+        assert updates == [{"power": True}]
+
+    async def test_error_message_closes_connection(self) -> None:
+        """Test an 'ERROR' frame outside a query closes the connection."""
+        assert await self.device.connect() is True
+        with (
+            patch.object(
+                self.device.device,
+                "_parse_buffer",
+                return_value=MessageResult.ERROR,
+            ),
+            patch.object(
+                self.device.device,
+                "close_socket",
+                wraps=self.device.device.close_socket,
+            ) as close_socket,
+        ):
+            self.device.data_received(b"ERROR")
+        close_socket.assert_called_once()
+        assert not self.device.connected
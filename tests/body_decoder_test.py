@@ -0,0 +1,51 @@
+"""Midea local table driven body decoder test."""
+
+from enum import IntEnum
+
+import pytest
+
+from midealocal.body_decoder import Field, TableMessageBody, compile_decoder
+
+
+class _Mode(IntEnum):
+    AUTO = 0
+    COOL = 2
+
+
+class _Body(TableMessageBody):
+    FIELDS = (
+        Field("power", 1, mask=0x01, boolean=True),
+        Field("mode", 1, mask=0xE0, shift=5, enum=_Mode, default=_Mode.AUTO),
+        Field("temperature", 2, scale=0.5),
+        Field("little", 3, length=2),
+        Field("big", 3, length=2, first_upper=True),
+        Field("label", 5, transform=hex, default=None),
+    )
+
+
+def test_decode_fields() -> None:
+    """Test masks, shifts, conversions and byte orders."""
+    body = _Body(bytearray([0x01, 0x41, 0x31, 0x34, 0x12, 0x0F]))
+    assert body.power is True
+    assert body.mode is _Mode.COOL
+    assert body.temperature == 24.5
+    assert body.little == 0x1234
+    assert body.big == 0x3412
+    assert body.label == "0xf"
+    assert body.record == (True, _Mode.COOL, 24.5, 0x1234, 0x3412, "0xf")
+    assert body.record._fields[0] == "power"
+    # unknown enum values fall back to the default
+    assert _Body(bytearray([0x01, 0xE0, 0, 0, 0, 0])).mode is _Mode.AUTO
+
+
+def test_short_body() -> None:
+    """Test optional fields take their default, required ones raise."""
+    assert _Body(bytearray([0x01, 0, 0, 0, 0])).label is None
+    with pytest.raises(IndexError):
+        _Body(bytearray([0x01, 0, 0, 0]))
+
+
+def test_decoder_is_cached() -> None:
+    """Test a table is compiled once."""
+    assert compile_decoder(_Body.FIELDS, "_Body") is _Body.decode
+    assert _Body.decode(bytes([0x01, 0x01, 0, 0, 0, 0])).power is True
@@ -0,0 +1,116 @@
+"""Midea local persistent protocol capability store test."""
+
+import json
+import time
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from midealocal.capabilities import CapabilityRecord, CapabilityStore
+from midealocal.cloud import DEFAULT_KEYS
+from midealocal.const import DeviceType, ProtocolVersion
+from midealocal.device import MideaDevice
+
+KEY = CapabilityStore.key(1, "test_model", 1, ProtocolVersion.V3)
+
+
+def _device() -> MideaDevice:
+    return MideaDevice(
+        name="Test Device",
+        device_id=1,
+        device_type=DeviceType.AC,
+        ip_address="192.168.1.100",
+        port=6444,
+        token=DEFAULT_KEYS[99]["token"],
+        key=DEFAULT_KEYS[99]["key"],
+        device_protocol=ProtocolVersion.V3,
+        model="test_model",
+        subtype=1,
+        attributes={},
+    )
+
+
+def test_store_round_trip(tmp_path: Path) -> None:
+    """Test records survive a new store instance on the same file."""
+    path = tmp_path / "capabilities.json"
+    CapabilityStore(path).set(
+        KEY,
+        CapabilityRecord(3, ["MessagePowerQuery"], {"capabilities": {"eco": True}}),
+    )
+    assert not list(tmp_path.glob("*.tmp"))
+    record = CapabilityStore(path).get(KEY)
+    assert record is not None
+    assert record.message_protocol_version == 3
+    assert record.unsupported_protocol == ["MessagePowerQuery"]
+    assert record.extra == {"capabilities": {"eco": True}}
+    assert CapabilityStore(path).get("2/model/1/3") is None
+
+
+def test_store_expiry_and_revalidation(tmp_path: Path) -> None:
+    """Test expired records are ignored and old ones flagged for revalidation."""
+    store = CapabilityStore(tmp_path / "store.json", max_age=100, revalidate_age=10)
+    now = time.time()
+    store.set(KEY, CapabilityRecord(3, [], updated_at=now - 50))
+    record = store.get(KEY)
+    assert record is not None
+    assert store.is_stale(record)
+    store.set(KEY, CapabilityRecord(3, [], updated_at=now))
+    record = store.get(KEY)
+    assert record is not None
+    assert not store.is_stale(record)
+    store.set(KEY, CapabilityRecord(3, [], updated_at=now - 100))
+    assert store.get(KEY) is None
+    store.discard(KEY)
+    assert json.loads((tmp_path / "store.json").read_text())["devices"] == {}
+
+
+def test_connect_stores_and_restores_probe(tmp_path: Path) -> None:
+    """Test a warm start skips the probe and reuses its stored outcome."""
+    store = CapabilityStore(tmp_path / "store.json")
+    device = _device()
+    device.set_capability_store(store)
+
+    def probe(check_protocol: bool = False) -> None:
+        assert check_protocol
+        device._message_protocol_version = 3
+        device._unsupported_protocol.append("MessagePowerQuery")
+
+    with (
+        patch("socket.socket", return_value=MagicMock()),
+        patch.object(device, "authenticate"),
+        patch.object(device, "refresh_status", side_effect=probe),
+    ):
+        assert device.connect(check_protocol=True) is True
+    assert store.get(KEY) is not None
+
+    device = _device()
+    device.set_capability_store(store)
+    with (
+        patch("socket.socket", return_value=MagicMock()),
+        patch.object(device, "authenticate"),
+        patch.object(device, "refresh_status") as refresh_status,
+    ):
+        assert device.connect(check_protocol=True) is True
+    refresh_status.assert_called_once_with()
+    assert device._message_protocol_version == 3
+    assert device._unsupported_protocol == ["MessagePowerQuery"]
+    assert device._appliance_query is False
+    assert device._revalidate_capabilities is False
+
+
+def test_revalidate_probes_again(tmp_path: Path) -> None:
+    """Test a stale record is probed again and rewritten."""
+    store = CapabilityStore(tmp_path / "store.json", revalidate_age=10)
+    store.set(KEY, CapabilityRecord(3, ["MessagePowerQuery"], updated_at=0))
+    store._max_age = float("inf")
+    device = _device()
+    device.set_capability_store(store)
+    assert device._restore_capabilities() is True
+    assert device._revalidate_capabilities is True
+    with patch.object(device, "refresh_status") as refresh_status:
+        device._revalidate()
+    refresh_status.assert_called_once_with(check_protocol=True)
+    assert device._revalidate_capabilities is False
+    record = store.get(KEY)
+    assert record is not None
+    assert record.unsupported_protocol == []
+    assert not store.is_stale(record)
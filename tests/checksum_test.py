@@ -0,0 +1,42 @@
+"""Midea local frame checksums test."""
+
+import os
+
+import pytest
+
+from midealocal.checksum import LANES_MIN_FRAMES, crc8_many, sum8, sum8_many
+from midealocal.crc8 import calculate
+from midealocal.message import MessageBase
+from midealocal.packet_builder import PacketBuilder
+
+
+@pytest.mark.parametrize("count", [0, 1, LANES_MIN_FRAMES, 100])
+def test_crc8_many_matches_calculate(count: int) -> None:
+    """Test the batch CRC8 matches the byte by byte one, lanes included."""
+    frames = [os.urandom(34) for _ in range(count)]
+    frames += [os.urandom(size) for size in range(count % 7)]
+    assert crc8_many(frames) == [calculate(frame) for frame in frames]
+
+
+def test_crc8_many_buffers() -> None:
+    """Test the batch CRC8 of bytearrays and memoryview slices."""
+    data = bytearray([0x00, 0x5A, 0x82, 0x01, 0x11, 0xFF, 0x20, 0x00])
+    frames = [memoryview(data)[1:7]] * LANES_MIN_FRAMES + [data[1:7], b""]
+    assert crc8_many(iter(frames)) == [101] * (LANES_MIN_FRAMES + 1) + [0]
+    assert calculate(memoryview(data)[1:7]) == 101
+
+
+def test_sum8() -> None:
+    """Test sum8 of the concatenation of several parts."""
+    assert sum8(bytes([0x01, 0x02, 0x03])) == 0xFA
+    assert sum8(b"") == 0x00
+    assert sum8() == 0x00
+    assert sum8(bytes([0x01]), memoryview(bytes([0x02, 0x03]))) == 0xFA
+    assert sum8(bytes([0xFF] * 300)) == PacketBuilder.checksum(bytes([0xFF] * 300))
+    assert MessageBase.checksum(bytes([0x01, 0x02, 0x03])) == 0xFA
+
+
+def test_sum8_many() -> None:
+    """Test the batch sum8 checksums every frame."""
+    frames = [bytes([0x01, 0x02, 0x03]), b"", bytearray(range(20))]
+    assert sum8_many(frames) == [sum8(frame) for frame in frames]
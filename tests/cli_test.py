@@ -5,10 +5,13 @@ import logging
 import runpy
 import subprocess
 import sys
+import threading
 import warnings
 from argparse import Namespace
+from collections.abc import AsyncIterator
 from pathlib import Path
 from tempfile import TemporaryDirectory
+from typing import Any
 from unittest import IsolatedAsyncioTestCase
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -109,6 +112,72 @@ class TestMideaCLI(IsolatedAsyncioTestCase):
             mock_default_keys.assert_called_once()
             mock_cloud_keys.assert_not_called()
 
+    async def test_get_keys_many(self) -> None:
+        """Test the keys of many devices are fetched after a single login."""
+        mock_cloud = AsyncMock()
+        mock_cloud.get_default_keys.return_value = {99: {"key": "k99", "token": "t99"}}
+        mock_cloud.login.side_effect = [True, False]
+
+        async def get_cloud_keys_many(
+            device_ids: list[int],
+        ) -> AsyncIterator[tuple[int, dict[int, dict[str, Any]]]]:
+            for device_id in reversed(device_ids):
+                yield device_id, {1: {"key": f"k{device_id}", "token": "t"}}
+
+        mock_cloud.get_cloud_keys_many = get_cloud_keys_many
+        with patch("midealocal.cli.get_midea_cloud", return_value=mock_cloud):
+            keys = await self.cli._get_keys_many([1, 2])
+            assert keys[1][1] == {"key": "k1", "token": "t"}
+            assert keys[2][1]["key"] == "k2"
+            assert keys[2][99]["key"] == "k99"
+            # login failure: default keys only
+            keys = await self.cli._get_keys_many([1])
+            assert keys == {1: {99: {"key": "k99", "token": "t99"}}}
+            assert await self.cli._get_keys_many([]) == {}
+        assert mock_cloud.login.await_count == 2
+
+    async def test_get_keys_many_cached(self) -> None:
+        """Test cached keys skip the cloud and fetched keys are cached."""
+        self.namespace.key_cache = "keys.json"
+        cache = MagicMock()
+        threads: set[int] = set()
+
+        def cache_get(device_id: int) -> dict[int, dict[str, str]]:
+            threads.add(threading.get_ident())
+            return {1: {"key": "c1", "token": "t"}} if device_id == 1 else {}
+
+        cache.get.side_effect = cache_get
+        cache.set.side_effect = lambda *_: threads.add(threading.get_ident())
+        mock_cloud = AsyncMock()
+        mock_cloud.get_default_keys.return_value = {99: {"key": "k99", "token": "t99"}}
+        requested: list[int] = []
+
+        async def get_cloud_keys_many(
+            device_ids: list[int],
+        ) -> AsyncIterator[tuple[int, dict[int, dict[str, Any]]]]:
+            requested.extend(device_ids)
+            for device_id in device_ids:
+                yield device_id, {1: {"key": f"k{device_id}", "token": "t"}}
+
+        mock_cloud.get_cloud_keys_many = get_cloud_keys_many
+        with (
+            patch("midealocal.cli.KeyCache", return_value=cache) as key_cache,
+            patch("midealocal.cli.get_midea_cloud", return_value=mock_cloud),
+        ):
+            keys = await self.cli._get_keys_many([1, 2])
+            assert keys[1][1]["key"] == "c1"
+            assert keys[2][1]["key"] == "k2"
+            assert requested == [2]
+            cache.set.assert_called_once_with(2, {1: {"key": "k2", "token": "t"}})
+            # the cache is not used from the event loop thread
+            assert threads
+            assert threading.get_ident() not in threads
+            # everything cached: no cloud login
+            mock_cloud.login.reset_mock()
+            keys = await self.cli._get_keys_many([1])
+            mock_cloud.login.assert_not_awaited()
+        key_cache.assert_called_once_with("keys.json", "pass")
+
     def test_extract_mac(self) -> None:
         """Test _extract_mac."""
         expected_mac = "1234567890ab"
@@ -161,9 +230,14 @@ class TestMideaCLI(IsolatedAsyncioTestCase):
             ) as refresh_status_mock,
         ):
             mock_discover.return_value = {1: mock_device}
-            mock_cloud_instance.get_cloud_keys.return_value = {
-                0: {"token": "token", "key": "key"},
-            }
+
+            async def get_cloud_keys_many(
+                device_ids: list[int],
+            ) -> AsyncIterator[tuple[int, dict[int, dict[str, Any]]]]:
+                for device_id in device_ids:
+                    yield device_id, {0: {"token": "token", "key": "key"}}
+
+            mock_cloud_instance.get_cloud_keys_many = get_cloud_keys_many
             mock_cloud_instance.get_default_keys.return_value = {
                 99: {"token": "token", "key": "key"},
             }
@@ -237,6 +311,44 @@ class TestMideaCLI(IsolatedAsyncioTestCase):
                 self.namespace.message,
             )
 
+    def test_replay(self) -> None:
+        """Test replay."""
+        self.namespace.capture = "capture.pcap"
+        self.namespace.device_type = 0xAC
+        self.namespace.protocol = 3
+        self.namespace.device_id = 1
+        self.namespace.token = "aa"
+        self.namespace.key = "bb"
+        self.namespace.port = 6444
+        self.namespace.repeat = 5
+        self.namespace.allocations = False
+        mock_device = MagicMock()
+        with (
+            patch(
+                "midealocal.cli.read_capture",
+                return_value=[[b"\x00"]],
+            ) as mock_read,
+            patch(
+                "midealocal.cli.device_selector",
+                return_value=mock_device,
+            ) as mock_device_selector,
+            patch("midealocal.cli.replay") as mock_replay,
+        ):
+            mock_replay.return_value.lines.return_value = ["1 frames"]
+            self.cli.replay()
+        mock_read.assert_called_once_with("capture.pcap", 6444)
+        assert mock_device_selector.call_args.kwargs["device_type"] == 0xAC
+        assert (
+            mock_device_selector.call_args.kwargs["device_protocol"]
+            == ProtocolVersion.V3
+        )
+        mock_replay.assert_called_once_with(
+            mock_device,
+            [[b"\x00"]],
+            repeat=5,
+            trace_allocations=False,
+        )
+
     def test_save(self) -> None:
         """Test save."""
         mock_path_instance = MagicMock()
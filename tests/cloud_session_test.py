@@ -0,0 +1,26 @@
+"""Midea local persistent cloud session store test."""
+
+from pathlib import Path
+
+from midealocal.cloud_session import CloudSessionStore
+
+SESSION = {"access_token": "token", "uid": "uid", "login_id": "login"}
+
+
+def test_store_shared_between_instances(tmp_path: Path) -> None:
+    """Test a session set by one store is seen by another on the same file."""
+    path = tmp_path / "sessions.json"
+    first = CloudSessionStore(path)
+    second = CloudSessionStore(path)
+    assert second.get("1010/account") is None
+    first.set("1010/account", SESSION)
+    assert second.get("1010/account") == SESSION
+    second.set("1010/account", {**SESSION, "access_token": "new"})
+    session = first.get("1010/account")
+    assert session is not None
+    assert session["access_token"] == "new"
+    assert path.stat().st_mode & 0o077 == 0
+    # no temporary file is left behind
+    assert sorted(tmp_path.iterdir()) == [path, tmp_path / "sessions.json.lock"]
+    first.discard("1010/account")
+    assert second.get("1010/account") is None
@@ -1,5 +1,10 @@
 """Test cloud."""
 
+import asyncio
+import json
+import logging
+import threading
+from collections.abc import AsyncIterator
 from pathlib import Path
 from tempfile import TemporaryDirectory
 from typing import ClassVar
@@ -11,6 +16,8 @@ from aiohttp import ClientConnectionError
 
 from midealocal.cloud import (
     DEFAULT_KEYS,
+    LUA_HEADER,
+    SUPPORTED_CLOUDS,
     MeijuCloud,
     MideaAirCloud,
     MideaCloud,
@@ -20,9 +27,23 @@ from midealocal.cloud import (
     get_midea_cloud,
     get_preset_account_cloud,
 )
+from midealocal.cloud_session import CloudSessionStore
+from midealocal.download_cache import DownloadCache
 from midealocal.exceptions import ElementMissing
 
 
+def _content(*chunks: bytes) -> Mock:
+    """Mock a response body read in chunks."""
+
+    async def iter_chunked(_size: int) -> AsyncIterator[bytes]:
+        for chunk in chunks:
+            yield chunk
+
+    content = Mock()
+    content.iter_chunked = iter_chunked
+    return content
+
+
 class CloudTest(IsolatedAsyncioTestCase):
     """Cloud test case."""
 
@@ -205,6 +226,110 @@ class CloudTest(IsolatedAsyncioTestCase):
         assert len(keys) == 1
         assert keys == DEFAULT_KEYS
 
+    async def test_get_cloud_keys_many(self) -> None:
+        """Test getToken requests run concurrently up to the limit."""
+        in_flight = 0
+        peak = 0
+
+        async def request(*_: object, data: str, **__: object) -> Mock:
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            udp_id = json.loads(data)["udpid"]
+            response = Mock()
+            response.read = AsyncMock(
+                return_value=json.dumps(
+                    {
+                        "code": 0,
+                        "data": {
+                            "tokenlist": [
+                                {"udpId": udp_id, "token": udp_id, "key": "KEY"},
+                            ],
+                        },
+                    },
+                ),
+            )
+            return response
+
+        session = Mock()
+        session.request = request
+        cloud = get_midea_cloud(
+            "美的美居",
+            session=session,
+            account="account",
+            password="password",
+        )
+        assert cloud is not None
+        found = {
+            appliance_id: keys
+            async for appliance_id, keys in cloud.get_cloud_keys_many(
+                [*range(1, 11), 1],
+                max_concurrency=4,
+            )
+        }
+        assert sorted(found) == list(range(1, 11))
+        assert peak == 4
+        for appliance_id, keys in found.items():
+            assert keys == {
+                method: {
+                    "token": cloud._security.get_udp_id(appliance_id, method),
+                    "key": "key",
+                }
+                for method in [1, 2]
+            }
+
+    async def test_get_cloud_keys_many_failures(self) -> None:
+        """Test a failing getToken request is logged, the others still return."""
+        cloud = get_midea_cloud("美的美居", Mock(), "account", "password")
+        assert cloud is not None
+
+        async def get_token(
+            appliance_id: int,
+            method: int,
+            _: object = None,
+        ) -> dict[str, str]:
+            if appliance_id == 2 and method == 1:
+                raise KeyError("token")
+            return {"token": f"{appliance_id}/{method}", "key": "key"}
+
+        with (
+            patch.object(cloud, "_get_token", side_effect=get_token),
+            self.assertLogs("midealocal.cloud", "WARNING") as logs,
+        ):
+            found = {
+                appliance_id: keys
+                async for appliance_id, keys in cloud.get_cloud_keys_many([1, 2, 3])
+            }
+        assert sorted(found) == [1, 2, 3]
+        assert found[2] == {2: {"token": "2/2", "key": "key"}}
+        assert found[3] == {
+            1: {"token": "3/1", "key": "key"},
+            2: {"token": "3/2", "key": "key"},
+        }
+        assert len(logs.output) == 1
+        assert "appliance 2 with method 1: KeyError('token')" in logs.output[0]
+
+    async def test_logins_are_serialized(self) -> None:
+        """Test concurrent logins do not overlap."""
+        cloud = get_midea_cloud("美的美居", Mock(), "account", "password")
+        assert cloud is not None
+        in_flight = 0
+        peak = 0
+
+        async def login() -> bool:
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return True
+
+        with patch.object(cloud, "_login", side_effect=login):
+            assert await asyncio.gather(cloud.login(), cloud.login()) == [True, True]
+        assert peak == 1
+
     async def test_meijucloud_list_home(self) -> None:
         """Test MeijuCloud list_home."""
         session = Mock()
@@ -280,6 +405,74 @@ class CloudTest(IsolatedAsyncioTestCase):
         appliances = await cloud.list_appliances("1")
         assert appliances is None
 
+    async def test_meijucloud_refresh_inventory(self) -> None:
+        """Test the inventory lists every home and returns the changes."""
+        homes = json.loads(self.responses["meijucloud_list_appliances.json"])
+        room = homes["data"]["homeList"][0]["roomList"][0]
+        second = {**room["applianceList"][0], "applianceCode": "3", "name": "Other"}
+        appliances = {"1": room["applianceList"], "2": [second]}
+
+        async def request(*args: object, **kwargs: object) -> Mock:
+            data = json.loads(str(kwargs["data"]))
+            response = Mock()
+            if str(args[1]).endswith("/v1/homegroup/list/get"):
+                response.read = AsyncMock(
+                    return_value=self.responses["meijucloud_list_home.json"],
+                )
+                return response
+            home_list = [
+                {"roomList": [{"applianceList": appliances[data["homegroupId"]]}]},
+            ]
+            response.read = AsyncMock(
+                return_value=json.dumps(
+                    {"code": 0, "data": {"homeList": home_list}},
+                ).encode(),
+            )
+            return response
+
+        session = Mock()
+        session.request = AsyncMock(side_effect=request)
+        cloud = get_midea_cloud("美的美居", session, "account", "password")
+        login = json.loads(self.responses["meijucloud_login.json"])
+        cloud._set_aes_keys(
+            cloud._security.aes_decrypt_with_fixed_key(login["data"]["key"]),
+            b"0",
+        )
+        with patch.object(
+            cloud._security,
+            "aes_decrypt",
+            wraps=cloud._security.aes_decrypt,
+        ) as aes_decrypt:
+            diff = await cloud.refresh_inventory()
+            assert diff is not None
+            assert sorted(diff.added) == [1, 2, 3]
+            assert not diff.removed
+            assert cloud.inventory[3]["sn"] == cloud.inventory[1]["sn"]
+            # appliances 1 and 3 share the serial number ciphertext
+            assert aes_decrypt.call_count == 1
+
+            second["onlineStatus"] = "0"
+            appliances["1"] = appliances["1"][:1]
+            diff = await cloud.refresh_inventory()
+            assert diff is not None
+            assert not diff.added
+            assert list(diff.removed) == [2]
+            assert list(diff.online_changed) == [3]
+            assert not diff.online_changed[3]["online"]
+            assert aes_decrypt.call_count == 1
+
+            diff = await cloud.refresh_inventory()
+            assert diff is not None
+            assert not diff
+
+            # a failed listing keeps the last inventory
+            session.request.side_effect = None
+            session.request.return_value.read = AsyncMock(
+                return_value=self.responses["cloud_invalid_response.json"],
+            )
+            assert await cloud.refresh_inventory() is None
+            assert sorted(cloud.inventory) == [1, 3]
+
     async def test_meijucloud_get_device_info(self) -> None:
         """Test MeijuCloud get_device_info."""
         session = Mock()
@@ -364,7 +557,7 @@ class CloudTest(IsolatedAsyncioTestCase):
         session.request = AsyncMock(return_value=response)
         res = Mock()
         res.status = 200
-        res.text = AsyncMock(return_value="9d52c159dcdd32bac5109cf54080fca7")
+        res.content = _content(b"9d52c159dcdd32bac5109cf54080fca7")
         session.get = AsyncMock(return_value=res)
         cloud = get_midea_cloud(
             "美的美居",
@@ -387,6 +580,86 @@ class CloudTest(IsolatedAsyncioTestCase):
                 await cloud.download_lua(tmpdir, 10, "00000000", "0xAC", "0010") is None
             )
 
+    async def test_meijucloud_download_lua_many(self) -> None:
+        """Test shared files are downloaded once and cached files never again."""
+        names = {"sn1": "a.lua", "sn2": "a.lua", "sn3": "b.lua"}
+
+        async def request(*_args: object, **kwargs: object) -> Mock:
+            sn = json.loads(str(kwargs["data"]))["applianceSn"]
+            data = {"url": f"http://host/{names[sn]}?sig={sn}", "fileName": names[sn]}
+            response = Mock()
+            response.read = AsyncMock(
+                return_value=json.dumps({"code": 0, "data": data}).encode(),
+            )
+            return response
+
+        session = Mock()
+        session.request = AsyncMock(side_effect=request)
+        cloud = get_midea_cloud("美的美居", session, "account", "password")
+        plain = b"-- lua\r\nlocal a = 1\r\n" * 5
+        encrypted = cloud._security.aes_encrypt_with_fixed_key(plain).hex().encode()
+        res = Mock()
+        res.status = 200
+        # chunks cut through blocks and \r\n pairs
+        res.content = _content(
+            *(encrypted[i : i + 7] for i in range(0, len(encrypted), 7)),
+        )
+        session.get = AsyncMock(return_value=res)
+        devices = [(0xAC, "sn1", "m"), (0xAC, "sn2", "m"), (0xAC, "sn3", None)]
+
+        with TemporaryDirectory() as tmpdir:
+            cache = DownloadCache(Path(tmpdir, "cache"))
+            files = await cloud.download_lua_many(tmpdir, devices, cache)
+            assert files == {
+                "sn1": f"{tmpdir}/a.lua",
+                "sn2": f"{tmpdir}/a.lua",
+                "sn3": f"{tmpdir}/b.lua",
+            }
+            assert session.get.await_count == 2
+            expected = LUA_HEADER + plain.replace(b"\r\n", b"\n")
+            assert await asyncio.to_thread(Path(tmpdir, "a.lua").read_bytes) == expected
+            assert not Path.exists(Path(tmpdir, "a.lua.part"))
+
+            await asyncio.to_thread(Path(tmpdir, "out").mkdir)
+            files = await cloud.download_lua_many(f"{tmpdir}/out", devices, cache)
+            assert files["sn3"] == f"{tmpdir}/out/b.lua"
+            out = Path(tmpdir, "out", "b.lua")
+            assert await asyncio.to_thread(out.read_bytes) == expected
+            assert session.get.await_count == 2
+
+            res.status = 404
+            names["sn4"] = "c.lua"
+            files = await cloud.download_lua_many(tmpdir, [(0xAC, "sn4", None)])
+            assert files == {"sn4": None}
+
+    async def test_download_lua_many_failure_is_per_device(self) -> None:
+        """Test a device failing to download leaves the others downloaded."""
+        session = Mock()
+        cloud = get_midea_cloud("美的美居", session, "account", "password")
+        assert cloud is not None
+        res = Mock()
+        res.status = 200
+        res.content = _content(
+            cloud._security.aes_encrypt_with_fixed_key(b"-- lua").hex().encode(),
+        )
+        session.get = AsyncMock(return_value=res)
+
+        async def lua_request(_type: int, sn: str, *_args: object) -> dict[str, str]:
+            if sn == "bad":
+                raise KeyError("url")
+            return {"url": "http://host/a.lua", "fileName": "a.lua"}
+
+        devices = [(0xAC, "bad", None), (0xAC, "sn1", None)]
+        with (
+            TemporaryDirectory() as tmpdir,
+            patch.object(cloud, "_lua_request", side_effect=lua_request),
+            self.assertLogs("midealocal.cloud", logging.WARNING) as logs,
+        ):
+            files = await cloud.download_lua_many(tmpdir, devices)
+            assert files == {"bad": None, "sn1": f"{tmpdir}/a.lua"}
+        assert "Unable to download the lua of bad" in logs.output[0]
+        res.release.assert_called_once_with()
+
     async def test_meijucloud_download_plugin(self) -> None:
         """Test MeijuCloud download_plugin."""
         session = Mock()
@@ -399,7 +672,7 @@ class CloudTest(IsolatedAsyncioTestCase):
         session.request = AsyncMock(return_value=response)
         res = Mock()
         res.status = 200
-        res.read = AsyncMock(return_value=b"plugin content")
+        res.content = _content(b"plugin ", b"content")
         session.get = AsyncMock(return_value=res)
         cloud = get_midea_cloud(
             "美的美居",
@@ -443,6 +716,31 @@ class CloudTest(IsolatedAsyncioTestCase):
         assert cloud is not None
         assert await cloud.login()
 
+    async def test_msmartcloud_route_resolved_once(self) -> None:
+        """Test clouds sharing a transport resolve the regional url once."""
+        session = Mock()
+        response = Mock()
+        response.read = AsyncMock(
+            side_effect=[
+                self.responses["msmartcloud_reroute.json"],
+                self.responses["cloud_login_id.json"],
+                self.responses["msmartcloud_login.json"],
+                self.responses["cloud_login_id.json"],
+                self.responses["msmartcloud_login.json"],
+            ],
+        )
+        session.request = AsyncMock(return_value=response)
+        cloud = get_midea_cloud("SmartHome", session, "account", "password")
+        assert await cloud.login()
+        other = get_midea_cloud("SmartHome", Mock(), "account", "password")
+        other.set_transport(cloud.transport)
+        assert other._session is session
+        assert await other.login()
+        assert other._api_url == "https://reroute.url/"
+        assert session.request.await_count == 5
+        assert cloud.transport.stats["/mj/user/login"].requests == 2
+        assert cloud.transport.stats["/v1/multicloud/platform/user/route"].requests == 1
+
     async def test_msmartcloud_login_invalid_user(self) -> None:
         """Test MSmartCloud login invalid user."""
         session = Mock()
@@ -577,7 +875,7 @@ class CloudTest(IsolatedAsyncioTestCase):
         session.request = AsyncMock(return_value=response)
         res = Mock()
         res.status = 200
-        res.text = AsyncMock(return_value="4ABE0FE395F3AD3B6BC4D223F1ADFA7C")
+        res.content = _content(b"4ABE0FE395F3AD3B6BC4D223F1ADFA7C")
         session.get = AsyncMock(return_value=res)
         cloud = get_midea_cloud(
             "SmartHome",
@@ -607,7 +905,7 @@ class CloudTest(IsolatedAsyncioTestCase):
         session.request = AsyncMock(return_value=response)
         res = Mock()
         res.status = 200
-        res.read = AsyncMock(return_value=b"plugin content")
+        res.content = _content(b"plugin ", b"content")
         session.get = AsyncMock(return_value=res)
         cloud = get_midea_cloud(
             "SmartHome",
@@ -681,6 +979,134 @@ class CloudTest(IsolatedAsyncioTestCase):
         assert homes is not None
         assert len(homes.keys()) == 1
 
+    async def test_meijucloud_reuses_stored_session(self) -> None:
+        """Test a stored session is reused without logging in."""
+        session = Mock()
+        response = Mock()
+        response.read = AsyncMock(
+            side_effect=[
+                self.responses["cloud_login_id.json"],
+                self.responses["meijucloud_login.json"],
+            ],
+        )
+        session.request = AsyncMock(return_value=response)
+        with TemporaryDirectory() as tmpdir:
+            store = CloudSessionStore(Path(tmpdir, "sessions.json"))
+            cloud = get_midea_cloud("美的美居", session, "account", "password")
+            cloud.set_session_store(store)
+            assert await cloud.login()
+            assert session.request.await_count == 2
+
+            other = get_midea_cloud("美的美居", session, "account", "password")
+            other.set_session_store(store)
+            assert await other.login()
+            assert session.request.await_count == 2
+            assert other._access_token == "returnedAccessToken"
+            assert other._login_id == "returnedLoginId"
+            assert other._security._aes_key == cloud._security._aes_key
+            assert other._security._aes_iv == cloud._security._aes_iv
+
+            # another account logs in
+            other = get_midea_cloud("美的美居", session, "account2", "password")
+            other.set_session_store(store)
+            response.read.side_effect = [self.responses["cloud_invalid_response.json"]]
+            assert not await other.login()
+
+    async def test_session_store_runs_in_a_thread(self) -> None:
+        """Test the session store is not used from the event loop thread."""
+        session = Mock()
+        response = Mock()
+        response.read = AsyncMock(
+            side_effect=[
+                self.responses["cloud_login_id.json"],
+                self.responses["meijucloud_login.json"],
+            ],
+        )
+        session.request = AsyncMock(return_value=response)
+        threads: set[int] = set()
+        store = Mock()
+
+        def get(_: str) -> None:
+            threads.add(threading.get_ident())
+
+        def set_(_: str, __: dict) -> None:
+            threads.add(threading.get_ident())
+
+        store.get.side_effect = get
+        store.set.side_effect = set_
+        cloud = get_midea_cloud("美的美居", session, "account", "password")
+        cloud.set_session_store(store)
+        assert await cloud.login()
+        store.get.assert_called_once()
+        store.set.assert_called_once()
+        assert threads
+        assert threading.get_ident() not in threads
+
+    async def test_mideaaircloud_relogin_on_expired_session(self) -> None:
+        """Test an expired session logs in again and retries the request."""
+        session = Mock()
+        response = Mock()
+        expired = b'{"errorCode": 3106, "msg": "invalidSession"}'
+        response.read = AsyncMock(
+            side_effect=[
+                expired,
+                self.responses["mideaaircloud_login_id.json"],
+                self.responses["mideaaircloud_login.json"],
+                self.responses["mideaaircloud_list_appliances.json"],
+            ],
+        )
+        session.request = AsyncMock(return_value=response)
+        with TemporaryDirectory() as tmpdir:
+            store = CloudSessionStore(Path(tmpdir, "sessions.json"))
+            store.set(
+                "1117/account",
+                {
+                    "access_token": "expired",
+                    "uid": "uid",
+                    "login_id": "login",
+                    "api_url": SUPPORTED_CLOUDS["Midea Air"]["api_url"],
+                    "aes_keys": None,
+                    "session_id": "stale",
+                },
+            )
+            cloud = get_midea_cloud("Midea Air", session, "account", "password")
+            cloud.set_session_store(store)
+            assert await cloud.login()
+            appliances = await cloud.list_appliances(None)
+            assert appliances is not None
+            assert len(appliances) == 2
+            retry = session.request.await_args_list[-1].kwargs
+            assert retry["headers"]["accessToken"].startswith("ddfb3efb")
+            assert retry["data"]["sessionId"].startswith("ab527a62")
+            stored = store.get("1117/account")
+            assert stored is not None
+            assert stored["session_id"].startswith("ab527a62")
+
+            # the login fails too: no retry loop, the session is dropped
+            response.read.side_effect = [
+                expired,
+                self.responses["mideaaircloud_invalid_response.json"],
+            ]
+            assert await cloud.list_appliances(None) is None
+            assert store.get("1117/account") is None
+
+    async def test_login_with_stale_session(self) -> None:
+        """Test a login over a rejected session does not wait for itself."""
+        session = Mock()
+        response = Mock()
+        response.read = AsyncMock(
+            return_value=b'{"errorCode": 3106, "msg": "invalidSession"}',
+        )
+        session.request = AsyncMock(return_value=response)
+        cloud = get_midea_cloud("Midea Air", session, "account", "password")
+        assert isinstance(cloud, MideaAirCloud)
+        cloud._access_token = "stale"
+        cloud._session_id = "stale"
+        async with asyncio.timeout(1):
+            assert not await cloud.login()
+        assert session.request.await_count == 1
+        assert "accessToken" not in session.request.await_args.kwargs["headers"]
+
     async def test_mideaaircloud_list_appliances(self) -> None:
         """Test MideaAirCloud list_appliances."""
         session = Mock()
@@ -0,0 +1,142 @@
+"""Midea local cloud HTTP transport test."""
+
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from aiohttp import ClientConnectionError, ClientSession, web
+
+from midealocal.cloud_transport import CloudTransport, TokenBucket, create_session
+
+
+def _response(status: int = 200, body: bytes = b'{"code": 0}') -> Mock:
+    response = Mock()
+    response.status = status
+    response.headers = {"Retry-After": "0"}
+    response.read = AsyncMock(return_value=body)
+    response.release = Mock()
+    return response
+
+
+@asynccontextmanager
+async def _throttling_server() -> AsyncIterator[tuple[str, list[web.Request]]]:
+    """Serve 429 to every request, yield the url and the requests served."""
+    requests: list[web.Request] = []
+
+    async def throttle(request: web.Request) -> web.Response:
+        requests.append(request)
+        # larger than the socket buffers, never read to its end by the client
+        return web.Response(status=429, headers={"Retry-After": "0"}, body=bytes(2**22))
+
+    app = web.Application()
+    app.router.add_post("/a", throttle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    try:
+        yield f"http://127.0.0.1:{port}/a", requests
+    finally:
+        await runner.cleanup()
+
+
+class TokenBucketTest(IsolatedAsyncioTestCase):
+    """Token bucket test case."""
+
+    async def test_burst_then_rate(self) -> None:
+        """Test a burst is served at once and the rest at the given rate."""
+        bucket = TokenBucket(rate=50, burst=2)
+        start = time.monotonic()
+        await bucket.acquire()
+        await bucket.acquire()
+        assert time.monotonic() - start < 0.01
+        await asyncio.gather(bucket.acquire(), bucket.acquire())
+        assert time.monotonic() - start >= 0.035
+
+    async def test_pause(self) -> None:
+        """Test no token is handed out while paused."""
+        bucket = TokenBucket(rate=1000, burst=10)
+        bucket.pause(0.05)
+        start = time.monotonic()
+        await bucket.acquire()
+        assert time.monotonic() - start >= 0.045
+
+
+class CloudTransportTest(IsolatedAsyncioTestCase):
+    """Cloud transport test case."""
+
+    async def test_throttled_connections_are_released(self) -> None:
+        """Test every throttled response gives its connection back to the pool."""
+        async with _throttling_server() as (url, requests):
+            session = create_session(limit_per_host=1)
+            transport = CloudTransport(session, host_rates={"127.0.0.1": 1000})
+            with (
+                patch("midealocal.cloud_transport.API_RETRY_BACKOFF", 0.001),
+                patch("midealocal.cloud_transport.API_TIMEOUT", 1),
+            ):
+                for _ in range(3):
+                    assert await transport.post(url, "/a", {}, "{}") is None
+            assert len(requests) == 9
+            await session.close()
+
+    async def test_create_session(self) -> None:
+        """Test the session pools connections per host."""
+        session = create_session(limit_per_host=4)
+        assert isinstance(session, ClientSession)
+        assert session.connector is not None
+        assert session.connector.limit_per_host == 4
+        await session.close()
+
+    async def test_post_retries_and_stats(self) -> None:
+        """Test failed attempts are retried and accounted per endpoint."""
+        session = Mock()
+        session.request = AsyncMock(
+            side_effect=[
+                _response(429),
+                ClientConnectionError(),
+                _response(),
+                ClientConnectionError(),
+                ClientConnectionError(),
+                _response(body=b"not json"),
+            ],
+        )
+        transport = CloudTransport(session, host_rates={"api.host": 1000})
+        with patch("midealocal.cloud_transport.API_RETRY_BACKOFF", 0.001):
+            response = await transport.post("https://api.host/a", "/a", {}, "{}")
+            assert response == {"code": 0}
+            assert await transport.post("https://api.host/b", "/b", {}, "{}") is None
+        assert session.request.await_count == 6
+        stats = transport.stats["/a"]
+        assert (stats.requests, stats.retries, stats.errors) == (1, 2, 0)
+        assert stats.latency_max >= stats.latency_mean >= 0
+        stats = transport.stats["/b"]
+        assert (stats.requests, stats.retries, stats.errors) == (1, 2, 1)
+        assert transport._buckets["api.host"]._rate == 1000
+
+    async def test_get_releases_every_response(self) -> None:
+        """Test download responses are released, failed, streamed or not."""
+        responses = [_response(429), _response(404), _response(), _response()]
+        session = Mock()
+        session.get = AsyncMock(
+            side_effect=[responses[0], ClientConnectionError(), *responses[1:]],
+        )
+        transport = CloudTransport(session, host_rates={"cdn.host": 1000})
+        with patch("midealocal.cloud_transport.API_RETRY_BACKOFF", 0.001):
+            async with transport.get("https://cdn.host/a.lua", "download") as r:
+                assert r is None
+            async with transport.get("https://cdn.host/a.lua", "download") as r:
+                assert r is responses[2]
+                assert not r.release.called
+            with pytest.raises(OSError, match="disk full"):
+                async with transport.get("https://cdn.host/a.lua", "download"):
+                    raise OSError("disk full")
+        assert session.get.await_count == 5
+        for response in responses:
+            response.release.assert_called_once_with()
+        stats = transport.stats["download"]
+        assert (stats.requests, stats.retries, stats.errors) == (3, 2, 1)
@@ -14,6 +14,7 @@ from midealocal.device import (
     QUERY_TIMEOUT,
     RESPONSE_TIMEOUT,
     SKIP_ATTRIBUTE,
+    SOCKET_TIMEOUT,
     AuthException,
     MessageResult,
     MideaDevice,
@@ -24,8 +25,10 @@ from midealocal.device import (
     precision_halves_translator,
     sentinel_translator,
 )
+from midealocal.devices.ac.message import MessageQuery as MessageACQuery
 from midealocal.exceptions import SocketException
-from midealocal.message import MessageType
+from midealocal.message import MessageQuestCustom, MessageType
+from midealocal.security import LocalSecurity
 
 
 class _DictDevice(MideaDevice):
@@ -229,8 +232,8 @@ def test_parse_message_short_appliance_query_message_skips_process_message() ->
     with (
         patch.object(
             device._security,
-            "decode_8370",
-            return_value=([encrypted_message], b""),
+            "decode_8370_frames",
+            return_value=[encrypted_message],
         ),
         patch.object(
             device._security,
@@ -346,6 +349,15 @@ class TestMideaDevice:
                 "previous",
                 id="skip_attribute_preserves_stored_value",
             ),
+            pytest.param(
+                "previous",
+                {"mode": SKIP_ATTRIBUTE},
+                None,
+                None,
+                {},
+                "previous",
+                id="skip_attribute_field_preserves_stored_value",
+            ),
         ],
     )
     def test_update_attributes_from_message(
@@ -368,6 +380,57 @@ class TestMideaDevice:
         assert new_status == expected_status
         assert self.device._attributes["mode"] == expected_attribute
 
+    def test_attribute_plan_is_compiled_once(self) -> None:
+        """Test responses of one layout reuse the compiled attribute plan."""
+        self.device._attributes = {"mode": 0, "power": False, "unused": None}
+        with patch.object(
+            self.device,
+            "_compile_attribute_plan",
+            wraps=self.device._compile_attribute_plan,
+        ) as compile_plan:
+            for mode in range(3):
+                message = SimpleNamespace(mode=mode, power=True, other=1)
+                assert self.device.update_attributes_from_message(message) == {
+                    "mode": mode,
+                    "power": True,
+                }
+            assert compile_plan.call_count == 1
+            # another layout, then a new attribute, compile new plans
+            self.device.update_attributes_from_message(SimpleNamespace(mode=4))
+            self.device._attributes["other"] = 0
+            assert self.device.update_attributes_from_message(message) == {
+                "mode": 2,
+                "power": True,
+                "other": 1,
+            }
+            assert compile_plan.call_count == 3
+            # restored to the same number of attributes under other keys
+            self.device._restore_attributes(
+                {"mode": 2, "unused": None, "other": 1, "extra": None},
+            )
+            assert self.device.update_attributes_from_message(message) == {
+                "mode": 2,
+                "other": 1,
+            }
+            assert compile_plan.call_count == 4
+
+    def test_subscribe_sends_changes_only(self) -> None:
+        """Test subscribers get the changed keys, filtered by attribute."""
+        full: list[dict[str, Any]] = []
+        changes: list[dict[str, Any]] = []
+        power: list[dict[str, Any]] = []
+        self.device.register_update(full.append)
+        self.device.subscribe(changes.append)
+        unsubscribe = self.device.subscribe(power.append, attributes=["power"])
+        self.device.update_all({"power": True, "mode": 1})
+        self.device.update_all({"power": True, "mode": 2})
+        self.device.update_all({"power": True, "mode": 2})
+        unsubscribe()
+        self.device.update_all({"power": False})
+        assert len(full) == 4
+        assert changes == [{"power": True, "mode": 1}, {"mode": 2}, {"power": False}]
+        assert power == [{"power": True}]
+
     def test_celsius_to_fahrenheit(self) -> None:
         """Test celsius_to_fahrenheit conversion and pass-through branches."""
         assert self.device.celsius_to_fahrenheit(20, is_fahrenheit=True) == 68
@@ -402,7 +465,7 @@ class TestMideaDevice:
         """Test connect."""
         # Pre-populate buffer to confirm the failure path runs close_socket(),
         # which clears it (the old code only nulled _socket).
-        self.device._buffer = b"stale"
+        self.device._buffer.feed(b"stale")
         with (
             patch("socket.socket.connect", side_effect=exc),
             patch.object(self.device, "authenticate"),
@@ -413,18 +476,18 @@ class TestMideaDevice:
             assert (self.device._socket is None) is socket_is_none
             if socket_is_none:
                 # close_socket() was invoked: it also resets the buffer.
-                assert self.device._buffer == b""
+                assert len(self.device._buffer) == 0
 
     def test_connect_generic_exception(self) -> None:
         """Test connect with generic exception."""
-        self.device._buffer = b"stale"
+        self.device._buffer.feed(b"stale")
         with patch("socket.socket.connect") as connect_mock:
             connect_mock.side_effect = Exception()
 
             assert self.device.connect() is False
             assert self.device.available is False
             assert self.device._socket is None
-            assert self.device._buffer == b""
+            assert len(self.device._buffer) == 0
 
     def test_authenticate(self) -> None:
         """Test authenticate."""
@@ -571,6 +634,84 @@ class TestMideaDevice:
         send_mock.assert_called_once()
         assert send_mock.call_args.kwargs["query"] is True
 
+    def test_build_send_caches_queries(self) -> None:
+        """Test equal queries reuse their encrypted payload until invalidated."""
+        query = MessageQuestCustom(DeviceType.AC, 0, MessageType.query, bytearray([1]))
+        serialized = query.serialize()
+        with (
+            patch.object(self.device, "send_message") as send_mock,
+            patch.object(
+                MessageQuestCustom,
+                "serialize",
+                autospec=True,
+                side_effect=MessageQuestCustom.serialize,
+            ) as serialize,
+        ):
+            self.device.build_send(query, query=True)
+            self.device.build_send(
+                MessageQuestCustom(DeviceType.AC, 0, MessageType.query, bytearray([1])),
+                query=True,
+            )
+            assert serialize.call_count == 1
+            # same payload, only the packet time and checksum may differ
+            first, second = (call.args[0] for call in send_mock.call_args_list)
+            assert first[40:-16] == second[40:-16]
+            assert LocalSecurity().aes_decrypt(first[40:-16]) == serialized
+            # a different query, a set or a protocol change serialize again
+            self.device.build_send(
+                MessageQuestCustom(DeviceType.AC, 0, MessageType.query, bytearray([2])),
+                query=True,
+            )
+            self.device.build_send(query)
+            self.device._message_protocol_version = 3
+            self.device.build_send(query, query=True)
+            assert serialize.call_count == 4
+
+    def test_rolling_queries_are_cached(self) -> None:
+        """Test a query embedding a message id reuses all but its rolling tail."""
+        security = LocalSecurity()
+        first, second = MessageACQuery(0), MessageACQuery(0)
+        assert first._message_id != second._message_id
+        expected = second.serialize()
+        with patch.object(
+            MessageACQuery,
+            "serialize",
+            autospec=True,
+            side_effect=MessageACQuery.serialize,
+        ) as serialize:
+            self.device._encrypt_command(first, query=True)
+            encrypted = self.device._encrypt_command(second, query=True)
+        assert serialize.call_count == 1
+        assert security.aes_decrypt(encrypted) == expected
+
+    def test_query_cache_evicts_least_recently_sent(self) -> None:
+        """Test a full cache drops the query sent the longest time ago."""
+        queries = [
+            MessageQuestCustom(DeviceType.AC, 0, MessageType.query, bytearray([i]))
+            for i in range(3)
+        ]
+        with patch("midealocal.device.QUERY_CACHE_SIZE", 2):
+            for query in (queries[0], queries[1], queries[0], queries[2]):
+                self.device._encrypt_command(query, query=True)
+        assert list(self.device._query_cache) == [
+            self.device._query_cache_key(queries[0]),
+            self.device._query_cache_key(queries[2]),
+        ]
+
+    def test_build_send_skips_uncacheable_queries(self) -> None:
+        """Test queries not serializing the same twice are never cached."""
+        with (
+            patch.object(self.device, "send_message"),
+            patch.object(
+                MessageQuestCustom,
+                "CACHEABLE",
+                new=False,
+            ),
+        ):
+            query = MessageQuestCustom(DeviceType.AC, 0, MessageType.query, bytearray())
+            self.device.build_send(query, query=True)
+        assert self.device._query_cache == {}
+
     def test_refresh_status(self) -> None:
         """Test refresh status."""
         with pytest.raises(NotImplementedError):
@@ -647,6 +788,61 @@ class TestMideaDevice:
         assert self.device._unsupported_protocol == []
         assert build_send.call_count == 2
 
+    def test_match_responses(self) -> None:
+        """Test responses are matched by body type first, then oldest first."""
+        first = MagicMock(message_type=0x03, body_type=0x41)
+        second = MagicMock(message_type=0x03, body_type=0xB1)
+        third = MagicMock(message_type=0x03, body_type=0x41)
+        other = MagicMock(message_type=0xA0, body_type=0x41)
+        pending = [first, second, third, other]
+        self.device._responses = [(0x03, 0xB1), (0x03, 0xC0), (0x04, 0x41)]
+        self.device._match_responses(pending)
+        # 0xB1 answers second, 0xC0 falls back to the oldest 0x03 query
+        assert pending == [third, other]
+        assert self.device._responses == []
+
+    def test_refresh_status_pipelined(self) -> None:
+        """Test pipelined probe only falls back for the unanswered queries."""
+        answered = MagicMock(message_type=0x03, body_type=0x41)
+        unanswered = MagicMock(message_type=0xB1, body_type=0x01)
+        socket_mock = MagicMock()
+
+        def parse_message(_: bytes) -> MessageResult:
+            assert self.device._responses is not None
+            self.device._responses.append((0x03, 0x41))
+            return MessageResult.SUCCESS
+
+        self.device._appliance_query = False
+        self.device.set_pipelined_refresh(True)
+        self.device._socket = socket_mock
+        with (
+            patch.object(
+                self.device,
+                "build_query",
+                return_value=[answered, unanswered],
+            ),
+            patch.object(
+                socket_mock,
+                "recv",
+                side_effect=[bytearray([0x0]), TimeoutError(), TimeoutError()],
+            ),
+            patch.object(self.device, "build_send", return_value=None) as build_send,
+            patch.object(self.device, "parse_message", side_effect=parse_message),
+            patch("midealocal.device.QUERY_TIMEOUT", 0.05),
+            patch("midealocal.device.QUERY_PROBE_RETRIES", 1),
+        ):
+            self.device.refresh_status(True)
+
+        assert self.device._responses is None
+        # both pipelined, then only the unanswered one probed again
+        assert [c.args[0] for c in build_send.call_args_list] == [
+            answered,
+            unanswered,
+            unanswered,
+        ]
+        assert self.device._unsupported_protocol == [unanswered.__class__.__name__]
+        socket_mock.settimeout.assert_any_call(SOCKET_TIMEOUT)
+
     def test_refresh_status_appliance_success_does_not_mask_query_failure(self) -> None:
         """Regression test for #575: appliance success must not mask query timeouts."""
         real_cmd = MagicMock()
@@ -717,7 +913,7 @@ class TestMideaDevice:
     def test_parse_message(self) -> None:
         """Test parse message."""
         with (
-            patch.object(self.device._security, "decode_8370", return_value=([], b"")),
+            patch.object(self.device._security, "decode_8370_frames", return_value=[]),
             patch.object(
                 self.device._security,
                 "aes_decrypt",
@@ -725,20 +921,17 @@ class TestMideaDevice:
             ),
             patch.object(
                 self.device,
-                "fetch_v2_message",
+                "fetch_v2_frames",
                 side_effect=[
-                    ([b"ERROR"], b""),
-                    (
-                        [
-                            bytearray([0x0, 0x0, 0x01, 0x10, 0x0, 0x0]),
-                            bytearray([0x0] * 4 + [0x8, 0x1] + [0x1] * 56),
-                            bytearray([0x0] * 4 + [0x8, 0x1] + [0x1] * 56),
-                            bytearray([0x0] * 4 + [0x8, 0x1] + [0x1] * 56),
-                            bytearray([0x0] * 4 + [0x2, 0x1] + [0x1] * 56),
-                            bytearray([0x1] * 50),
-                        ],
-                        b"",
-                    ),
+                    [b"ERROR"],
+                    [
+                        bytearray([0x0, 0x0, 0x01, 0x10, 0x0, 0x0]),
+                        bytearray([0x0] * 4 + [0x8, 0x1] + [0x1] * 56),
+                        bytearray([0x0] * 4 + [0x8, 0x1] + [0x1] * 56),
+                        bytearray([0x0] * 4 + [0x8, 0x1] + [0x1] * 56),
+                        bytearray([0x0] * 4 + [0x2, 0x1] + [0x1] * 56),
+                        bytearray([0x1] * 50),
+                    ],
                 ],
             ),
         ):
@@ -845,11 +1038,8 @@ class TestMideaDevice:
             ),
             patch.object(
                 self.device,
-                "fetch_v2_message",
-                return_value=(
-                    [bytearray([0x0] * 4 + [0x8, 0x1] + [0x1] * 56)],
-                    b"",
-                ),
+                "fetch_v2_frames",
+                return_value=[bytearray([0x0] * 4 + [0x8, 0x1] + [0x1] * 56)],
             ),
             patch.object(
                 self.device,
@@ -1019,11 +1209,11 @@ class TestMideaDevice:
             + [None] * RESPONSE_TIMEOUT  # pass 5, iters c..: timeouts
         )
         recv_side_effect = [
-            b"",  # pass 1: empty -> ConnectionResetError
-            b"\x01",  # pass 2: parsed as ERROR
+            0,  # pass 1: empty -> ConnectionResetError
+            1,  # pass 2: parsed as ERROR
             OSError("boom"),  # pass 3
             ValueError("boom"),  # pass 4
-            b"\x01",  # pass 5, iter b: parsed as SUCCESS
+            1,  # pass 5, iter b: parsed as SUCCESS
             *([TimeoutError()] * RESPONSE_TIMEOUT),  # pass 5: hits the threshold
         ]
         parse_message_side_effect = [MessageResult.ERROR, MessageResult.SUCCESS]
@@ -1037,10 +1227,14 @@ class TestMideaDevice:
                 side_effect=check_refresh_side_effect,
             ),
             patch.object(self.device, "_check_heartbeat"),
-            patch.object(self.device._socket, "recv", side_effect=recv_side_effect),
+            patch.object(
+                self.device._socket,
+                "recv_into",
+                side_effect=recv_side_effect,
+            ),
             patch.object(
                 self.device,
-                "parse_message",
+                "_parse_buffer",
                 side_effect=parse_message_side_effect,
             ),
             patch("time.sleep"),
@@ -294,6 +294,93 @@ class TestMideaACDevice:
             assert temp_message.mode == 2
             assert temp_message.target_temperature == 21
 
+    def test_set_attributes_coalesces_set_messages(self) -> None:
+        """Test changes set together go out in one frame per message family."""
+        with (
+            patch.object(self.device, "_encrypt_command", return_value=b"") as encrypt,
+            patch.object(self.device, "send_message") as send_message,
+        ):
+            self.device.set_attributes(
+                {
+                    DeviceAttributes.mode.value: 2,
+                    DeviceAttributes.target_temperature.value: 21,
+                    DeviceAttributes.breezeless.value: True,
+                    DeviceAttributes.fan_speed.value: 40,
+                    DeviceAttributes.indirect_wind.value: True,
+                },
+            )
+            assert send_message.call_count == 2
+            general, new_protocol = (call[0][0] for call in encrypt.call_args_list)
+            assert (general.power, general.mode) == (True, 2)
+            assert general.target_temperature == 21
+            assert general.fan_speed == 40
+            assert new_protocol.breezeless is True
+            assert new_protocol.indirect_wind is True
+
+            send_message.reset_mock()
+            # nothing is sent when a change of the transaction fails
+            with (
+                patch.object(
+                    self.device,
+                    "make_newprotocol_message_set",
+                    side_effect=RuntimeError,
+                ),
+                pytest.raises(RuntimeError),
+            ):
+                self.device.set_attributes(
+                    {
+                        DeviceAttributes.fan_speed.value: 60,
+                        DeviceAttributes.breezeless.value: False,
+                    },
+                )
+            send_message.assert_not_called()
+            self.device.set_attribute(DeviceAttributes.fan_speed.value, 60)
+            send_message.assert_called_once()
+
+    def test_failed_set_attributes_restores_attributes(self) -> None:
+        """Test optimistic changes are undone when a coalesced change fails."""
+        self.device._attributes[DeviceAttributes.power] = False
+        self.device._attributes[DeviceAttributes.mode] = 1
+        self.device._attributes[DeviceAttributes.self_clean] = False
+        updates: list[dict] = []
+        self.device.subscribe(updates.append)
+        make_set = self.device.make_newprotocol_message_set
+
+        def failing_set(attr: str, value: bool | float | str) -> object:
+            if attr == DeviceAttributes.breezeless:
+                raise RuntimeError
+            return make_set(attr=attr, value=value)
+
+        with (
+            patch.object(self.device, "send_message") as send_message,
+            patch.object(
+                self.device,
+                "make_newprotocol_message_set",
+                side_effect=failing_set,
+            ),
+            pytest.raises(RuntimeError),
+        ):
+            self.device.set_attributes(
+                {
+                    DeviceAttributes.mode.value: 4,
+                    DeviceAttributes.self_clean.value: True,
+                    DeviceAttributes.breezeless.value: True,
+                },
+            )
+        send_message.assert_not_called()
+        assert self.device.get_attribute(DeviceAttributes.power) is False
+        assert self.device.get_attribute(DeviceAttributes.mode) == 1
+        assert self.device.get_attribute(DeviceAttributes.self_clean) is False
+        assert self.device._pending_self_clean is None
+        assert updates == [
+            {DeviceAttributes.self_clean.value: True},
+            {
+                DeviceAttributes.power.value: False,
+                DeviceAttributes.mode.value: 1,
+                DeviceAttributes.self_clean.value: False,
+            },
+        ]
+
     def test_customize_temperature_limits(self) -> None:
         """Test customize min/max temperature limits."""
         self.device.set_customize('{"min_temperature": 17, "max_temperature": 28}')
@@ -556,6 +643,33 @@ class TestMideaACDevice:
             "anion": True,
         }
 
+    def test_export_import_capabilities(self) -> None:
+        """Test the B5 capabilities round trip through the capability store."""
+        self.device._capabilities["eco"] = True
+        self.device._temperature_limits = {2: (17.0, 30.0), 4: (16.0, 31.0)}
+        extra = self.device._export_capabilities()
+        assert extra == {
+            "capabilities": {"eco": True},
+            "temperature_limits": {"2": [17.0, 30.0], "4": [16.0, 31.0]},
+        }
+        device = MideaACDevice(
+            name="Test Device",
+            device_id=1,
+            ip_address="192.168.1.1",
+            port=12345,
+            token="AA",
+            key="BB",
+            device_protocol=ProtocolVersion.V1,
+            model="test_model",
+            subtype=1,
+            customize="",
+        )
+        device._import_capabilities(extra)
+        assert device.capabilities == {"eco": True}
+        assert device._temperature_limits == {2: (17.0, 30.0), 4: (16.0, 31.0)}
+        assert device.attributes[DeviceAttributes.min_temperature] == 17.0
+        assert device.attributes[DeviceAttributes.max_temperature] == 30.0
+
     def test_process_message_reports_capabilities_only_change(self) -> None:
         """A capability-only frame must still produce a non-empty status delta.
 
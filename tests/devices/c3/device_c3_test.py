@@ -247,6 +247,27 @@ class TestMideaC3Device:
             assert message.mode == 1
             assert message.zone2_power
 
+    def test_zone_setpoint_update(self) -> None:
+        """Test a zone setpoint changed in place is still published."""
+        updates: list[dict] = []
+        self.device.subscribe(updates.append, ["zone_target_temp"])
+        with patch("midealocal.devices.c3.MessageC3Response") as mock_message_response:
+            mock_message = mock_message_response.return_value
+            mock_message.zone_temp_type = [True, False]
+            mock_message.zone_target_temp = [25, 30]
+            self.device.update_all(self.device.process_message(b""))
+            assert updates == [{"zone_target_temp": [25, 30]}]
+
+            with patch.object(self.device, "build_send"):
+                self.device.set_target_temperature(22.5, None, 0)
+            mock_message.zone_target_temp = [22.5, 30]
+            self.device.update_all(self.device.process_message(b""))
+
+        assert updates == [
+            {"zone_target_temp": [25, 30]},
+            {"zone_target_temp": [22.5, 30]},
+        ]
+
     def test_set_mode(self) -> None:
         """Test set mode."""
         with patch.object(self.device, "build_send") as mock_build_send:
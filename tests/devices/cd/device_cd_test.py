@@ -154,6 +154,26 @@ class TestMideaCDDevice:
             assert msg.body[10] == 30  # vacation days low
             assert msg.body[23] == 65
 
+    def test_set_attributes_sends_one_frame(self) -> None:
+        """Power, mode and temperature set together share one MessageSet."""
+        self.device._attributes[DeviceAttributes.max_temperature] = 65.0
+
+        with (
+            patch.object(self.device, "_encrypt_command", return_value=b"") as encrypt,
+            patch.object(self.device, "send_message"),
+        ):
+            self.device.set_attributes(
+                {
+                    DeviceAttributes.power.value: True,
+                    DeviceAttributes.target_temperature.value: 55,
+                },
+            )
+            encrypt.assert_called_once()
+            msg = encrypt.call_args[0][0]
+            assert msg.power is True
+            assert msg.target_temperature == 55
+            assert msg.body[23] == 65
+
     def test_ts_max_falls_back_when_max_missing(self) -> None:
         """Missing max_temperature still yields non-zero tsMax via MessageSet."""
         self.device._attributes[DeviceAttributes.max_temperature] = None
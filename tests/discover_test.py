@@ -1,5 +1,8 @@
 """Midea local discover test."""
 
+import asyncio
+from typing import Any
+from unittest import IsolatedAsyncioTestCase
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -7,11 +10,15 @@ import pytest
 from midealocal.discover import (
     _extract_mac,
     _parse_discover_response,
+    async_discover,
+    async_get_device_info,
     bytes2port,
     discover,
     enum_all_broadcast,
     get_device_info,
     get_id_from_response,
+    iter_discover,
+    iter_sweep,
 )
 from midealocal.exceptions import ElementMissing
 from midealocal.security import LocalSecurity
@@ -259,6 +266,234 @@ class TestDiscover:
         assert result == {}
 
 
+class _FakeAppliances(asyncio.DatagramProtocol):
+    """Answer every discovery broadcast with the configured replies."""
+
+    def __init__(self, replies: list[bytes]) -> None:
+        self.replies = replies
+        self.transport: asyncio.DatagramTransport | None = None
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport  # type: ignore[assignment]
+
+    def datagram_received(self, data: bytes, addr: tuple[str | Any, int]) -> None:  # noqa: ARG002
+        assert self.transport is not None
+        for reply in self.replies:
+            self.transport.sendto(reply, addr)
+
+
+class TestAsyncDiscover(IsolatedAsyncioTestCase):
+    """Asyncio discovery test case."""
+
+    async def asyncSetUp(self) -> None:
+        """Start fake appliances answering on a local port."""
+        self.appliances = _FakeAppliances([])
+        transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            lambda: self.appliances,
+            local_addr=("127.0.0.1", 0),
+        )
+        self.transport = transport
+        port = transport.get_extra_info("sockname")[1]
+        self.ports = patch("midealocal.discover.DISCOVERY_PORTS", (port,))
+        self.ports.start()
+
+    async def asyncTearDown(self) -> None:
+        """Stop the fake appliances."""
+        self.ports.stop()
+        self.transport.close()
+
+    async def test_devices_are_yielded_as_decoded(self) -> None:
+        """Test devices come out before the window ends and duplicates are skipped."""
+        self.appliances.replies = [
+            _build_v2_packet(),
+            _build_v2_packet(),
+            _build_v3_packet(DEVICE_ID + 1),
+        ]
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        found = []
+        async for device in iter_discover(ip_address="127.0.0.1", listen_time=0.2):
+            found.append(device["device_id"])
+            assert loop.time() - start < 0.2
+        assert found == [DEVICE_ID, DEVICE_ID + 1]
+
+    async def test_stop_once_expected_found(self) -> None:
+        """Test discovery returns as soon as the expected devices are found."""
+        self.appliances.replies = [_build_v2_packet()]
+        seen: list[dict[str, Any]] = []
+        async with asyncio.timeout(1):
+            with patch("midealocal.discover.DISCOVERY_TIMEOUT", 30):
+                found = await async_discover(
+                    discover_type=[0xAC],
+                    ip_address="127.0.0.1",
+                    expected=[DEVICE_ID],
+                    callback=seen.append,
+                )
+        assert list(found) == [DEVICE_ID]
+        assert seen == [found[DEVICE_ID]]
+
+    async def test_type_filter(self) -> None:
+        """Test a device with a non-matching type is not yielded."""
+        self.appliances.replies = [_build_v2_packet()]
+        found = [
+            device
+            async for device in iter_discover(
+                discover_type=[0xFF],
+                ip_address="127.0.0.1",
+                listen_time=0.1,
+            )
+        ]
+        assert found == []
+
+    async def test_v1_lookups_run_concurrently(self) -> None:
+        """Test protocol 1 device IDs are fetched concurrently past the window."""
+        in_flight = 0
+        peak = 0
+
+        async def handle(
+            reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter,
+        ) -> None:
+            nonlocal in_flight, peak
+            await reader.read(512)
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.2)
+            in_flight -= 1
+            writer.write(_build_id_response())
+            await writer.drain()
+            writer.close()
+
+        servers = [
+            await asyncio.start_server(handle, host, 0)
+            for host in ("127.0.0.1", "127.0.0.2")
+        ]
+        ports = [server.sockets[0].getsockname()[1] for server in servers]
+        xml = (
+            b'<?xml version="1.0" encoding="utf-8"?><root><body>'
+            b'<device port="%d" apc_sn="%s" apc_type="172"/></body></root>'
+        )
+        self.appliances.replies = [xml % (ports[0], SN_TYPE1)]
+        # a second appliance, reachable through another loopback address
+        other = _FakeAppliances([xml % (ports[1], SN_TYPE1)])
+        other_transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            lambda: other,
+            local_addr=("127.0.0.2", 0),
+        )
+        other_port = other_transport.get_extra_info("sockname")[1]
+        try:
+            with (
+                patch(
+                    "midealocal.discover.enum_all_broadcast",
+                    return_value=["127.0.0.1", "127.0.0.2"],
+                ),
+                patch(
+                    "midealocal.discover.DISCOVERY_PORTS",
+                    (self.transport.get_extra_info("sockname")[1], other_port),
+                ),
+            ):
+                found = [device async for device in iter_discover(listen_time=0.05)]
+        finally:
+            other_transport.close()
+            for server in servers:
+                server.close()
+                await server.wait_closed()
+        # same device ID from both, only one yielded, both looked up at once
+        assert [device["device_id"] for device in found] == [0x78563412]
+        assert found[0]["protocol"] == 1
+        assert peak == 2
+
+    async def test_failed_lookup_is_logged(self) -> None:
+        """Test a device ID lookup failing in the background is logged."""
+
+        async def handle(
+            reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter,
+        ) -> None:
+            await reader.read(512)
+            writer.write(_build_id_response(b'<?xml version="1.0"?><root'))
+            await writer.drain()
+            writer.close()
+
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        self.appliances.replies = [
+            b'<?xml version="1.0" encoding="utf-8"?><root><body>'
+            b'<device port="%d" apc_sn="%s" apc_type="172"/></body></root>'
+            % (port, SN_TYPE1),
+        ]
+        try:
+            with self.assertLogs("midealocal.discover", "ERROR") as logs:
+                found = [
+                    device
+                    async for device in iter_discover(
+                        ip_address="127.0.0.1",
+                        listen_time=0.05,
+                    )
+                ]
+        finally:
+            server.close()
+            await server.wait_closed()
+        assert found == []
+        assert "Discovery task" in logs.output[0]
+        assert "ParseError" in logs.output[0]
+
+    async def test_sweep_deduplicates(self) -> None:
+        """Test a sweep probes every host and yields a device ID once."""
+        self.appliances.replies = [_build_v2_packet()]
+        other = _FakeAppliances([_build_v2_packet()])
+        port = self.transport.get_extra_info("sockname")[1]
+        other_transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            lambda: other,
+            local_addr=("127.0.0.2", port),
+        )
+        try:
+            found = [
+                device async for device in iter_sweep(["127.0.0.0/29"], listen_time=0.1)
+            ]
+        finally:
+            other_transport.close()
+        assert [device["device_id"] for device in found] == [DEVICE_ID]
+
+    async def test_sweep_rate(self) -> None:
+        """Test a sweep sends at most rate hosts per second."""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        found = [
+            device
+            async for device in iter_sweep(
+                ["127.1.0.0/26"],
+                rate=200,
+                window=8,
+                listen_time=0,
+            )
+        ]
+        assert found == []
+        # 62 hosts at 200 hosts/s
+        assert loop.time() - start >= 0.3
+
+    async def test_get_device_info(self) -> None:
+        """Test the device info exchange and its connection errors."""
+
+        async def handle(
+            reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter,
+        ) -> None:
+            await reader.read(512)
+            writer.write(b"\x12\x34")
+            await writer.drain()
+            writer.close()
+
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        assert await async_get_device_info("127.0.0.1", port) == bytearray(
+            b"\x12\x34",
+        )
+        server.close()
+        await server.wait_closed()
+        assert await async_get_device_info("127.0.0.1", port) == bytearray(0)
+
+
 class TestGetIdFromResponse:
     """get_id_from_response test case."""
 
@@ -0,0 +1,28 @@
+"""Midea local content addressed download cache test."""
+
+from hashlib import sha256
+from pathlib import Path
+
+from midealocal.download_cache import INDEX_FILE, DownloadCache
+
+
+def test_cache_round_trip(tmp_path: Path) -> None:
+    """Test files are stored once by digest and found by url."""
+    file = tmp_path / "a.lua"
+    file.write_bytes(b"content")
+    digest = sha256(b"content").hexdigest()
+    cache = DownloadCache(tmp_path / "cache")
+    assert cache.get("http://host/a.lua?sig=1") is None
+    cache.add("http://host/a.lua?sig=1", file, digest)
+    cache.add("http://host/b.lua", file, digest)
+    # the signed query does not take part in the key
+    blob = DownloadCache(tmp_path / "cache").get("http://host/a.lua?sig=2")
+    assert blob == tmp_path / "cache" / digest
+    assert blob.read_bytes() == b"content"
+    assert sorted(p.name for p in (tmp_path / "cache").iterdir()) == [
+        digest,
+        INDEX_FILE,
+        f"{INDEX_FILE}.lock",
+    ]
+    blob.unlink()
+    assert cache.get("http://host/b.lua") is None
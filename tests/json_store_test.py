@@ -0,0 +1,76 @@
+"""Midea local shared JSON file test."""
+
+import json
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+from midealocal.json_store import JsonFile
+
+
+def test_write_and_read(tmp_path: Path) -> None:
+    """Test the document round trips with its version, written aside."""
+    path = tmp_path / "store.json"
+    file = JsonFile(path, 2, "test store", private=True, indent=2)
+    assert file.read(dict) is None
+    file.write({"items": {"a": 1}})
+    assert json.loads(path.read_text()) == {"version": 2, "items": {"a": 1}}
+    assert "\n  " in path.read_text()
+    assert path.stat().st_mode & 0o077 == 0
+    assert sorted(tmp_path.iterdir()) == [path]
+    assert file.read(lambda data: data["items"]) == {"a": 1}
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "{not json",
+        "[]",
+        json.dumps({"version": 3, "items": {}}),
+        json.dumps({"version": 2}),
+    ],
+)
+def test_read_invalid_file(
+    tmp_path: Path,
+    caplog: pytest.LogCaptureFixture,
+    content: str,
+) -> None:
+    """Test a corrupt, outdated or unparsable file reads as nothing."""
+    path = tmp_path / "store.json"
+    path.write_text(content)
+    assert JsonFile(path, 2, "test store").read(lambda data: data["items"]) is None
+    outdated = '"version": 3' in content
+    assert ("Ignoring test store" in caplog.text) is not outdated
+
+
+def test_write_failure(tmp_path: Path, caplog: pytest.LogCaptureFixture) -> None:
+    """Test a failed write is logged and leaves no temporary file."""
+    path = tmp_path / "store.json"
+    path.mkdir()
+    JsonFile(path, 1, "test store").write({})
+    assert "Unable to save test store" in caplog.text
+    assert sorted(tmp_path.iterdir()) == [path]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="no file locks on Windows")
+def test_update_waits_for_other_processes(tmp_path: Path) -> None:
+    """Test locked() waits for the flock held by another process."""
+    import fcntl  # noqa: PLC0415
+
+    path = tmp_path / "store.json"
+    file = JsonFile(path, 1, "test store")
+    entered = threading.Event()
+
+    def update() -> None:
+        with file.locked():
+            entered.set()
+
+    with (tmp_path / "store.json.lock").open("w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        thread = threading.Thread(target=update)
+        thread.start()
+        assert not entered.wait(0.1)
+    thread.join(1)
+    assert entered.is_set()
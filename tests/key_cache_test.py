@@ -0,0 +1,107 @@
+"""Midea local persistent cloud key cache test."""
+
+import json
+from collections.abc import Iterator
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from midealocal.cloud import DEFAULT_KEYS
+from midealocal.const import DeviceType, ProtocolVersion
+from midealocal.device import AuthException, MideaDevice
+from midealocal.key_cache import KeyCache
+
+KEYS = {
+    1: {"token": "AA" * 64, "key": "bb" * 32},
+    2: {"token": "cc" * 64, "key": "dd" * 32},
+}
+
+
+@pytest.fixture(autouse=True)
+def _fast_kdf() -> Iterator[None]:
+    with patch("midealocal.key_cache.KDF_ITERATIONS", 1):
+        yield
+
+
+def test_cache_round_trip(tmp_path: Path) -> None:
+    """Test keys survive a new cache on the same file and are encrypted."""
+    path = tmp_path / "keys.json"
+    KeyCache(path, "secret").set(1234, KEYS)
+    assert KeyCache(path, "secret").get(1234) == KEYS
+    assert KeyCache(path, "secret").get(5678) == {}
+    assert not list(tmp_path.glob("*.tmp"))
+    assert path.stat().st_mode & 0o077 == 0
+    content = path.read_text()
+    assert KEYS[1]["token"] not in content
+    # only the hex fields of the encryption are stored in the clear
+    data = json.loads(content)
+    assert set(data) == {"version", "salt", "nonce", "tag", "data"}
+    assert 1234 not in data.values()
+    assert "1234" not in data.values()
+    # a wrong secret fails the tag verification, the cache starts empty
+    assert KeyCache(path, "other").get(1234) == {}
+
+
+def test_cache_expiry(tmp_path: Path) -> None:
+    """Test entries older than the ttl are ignored."""
+    cache = KeyCache(tmp_path / "keys.json", "secret", ttl=100)
+    with patch("time.time", return_value=1000):
+        cache.set(1234, KEYS)
+    with patch("time.time", return_value=1099):
+        assert cache.get(1234) == KEYS
+    with patch("time.time", return_value=1100):
+        assert cache.get(1234) == {}
+
+
+def test_cache_invalidate(tmp_path: Path) -> None:
+    """Test a rejected token is dropped, other methods are kept."""
+    path = tmp_path / "keys.json"
+    cache = KeyCache(path, "secret")
+    cache.set(1234, KEYS)
+    cache.invalidate(1234, KEYS[1]["token"].lower())
+    assert KeyCache(path, "secret").get(1234) == {2: KEYS[2]}
+    cache.invalidate(1234, "ee" * 64)
+    assert cache.get(1234) == {2: KEYS[2]}
+    cache.invalidate(1234)
+    assert KeyCache(path, "secret").get(1234) == {}
+
+
+def test_cache_update_keeps_other_instances_keys(tmp_path: Path) -> None:
+    """Test an update reads the file again instead of its loaded entries."""
+    path = tmp_path / "keys.json"
+    cache = KeyCache(path, "secret")
+    assert cache.get(1234) == {}
+    KeyCache(path, "secret").set(1234, KEYS)
+    cache.set(5678, KEYS)
+    cache = KeyCache(path, "secret")
+    assert cache.get(1234) == cache.get(5678) == KEYS
+
+
+def test_auth_failure_invalidates_token(tmp_path: Path) -> None:
+    """Test a failed handshake drops the token from the key cache."""
+    cache = KeyCache(tmp_path / "keys.json", "secret")
+    cache.set(1, {1: DEFAULT_KEYS[99], 2: KEYS[2]})
+    device = MideaDevice(
+        name="Test Device",
+        device_id=1,
+        device_type=DeviceType.AC,
+        ip_address="192.168.1.100",
+        port=6444,
+        token=DEFAULT_KEYS[99]["token"],
+        key=DEFAULT_KEYS[99]["key"],
+        device_protocol=ProtocolVersion.V3,
+        model="test_model",
+        subtype=1,
+        attributes={},
+    )
+    device.set_key_cache(cache)
+    with pytest.raises(AuthException):
+        device._auth_complete(bytes(72))
+    assert cache.get(1) == {2: KEYS[2]}
+    cache.set(1, {1: DEFAULT_KEYS[99]})
+    device._socket = MagicMock()
+    device._socket.recv.return_value = b"\x00"
+    with pytest.raises(AuthException):
+        device.authenticate()
+    assert cache.get(1) == {}
@@ -0,0 +1,189 @@
+"""Midea local multi-device scheduler test."""
+
+import asyncio
+import itertools
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import PropertyMock, patch
+
+import pytest
+
+from midealocal.async_device import AsyncMideaDevice
+from midealocal.cloud import DEFAULT_KEYS
+from midealocal.const import DeviceType, ProtocolVersion
+from midealocal.device import MideaDevice
+from midealocal.manager import CommandResult, DeviceManager, Job
+
+
+def _device(device_id: int, device_type: DeviceType = DeviceType.AC) -> MideaDevice:
+    return MideaDevice(
+        name=f"Device {device_id}",
+        device_id=device_id,
+        device_type=device_type,
+        ip_address="127.0.0.1",
+        port=6444,
+        token=DEFAULT_KEYS[99]["token"],
+        key=DEFAULT_KEYS[99]["key"],
+        device_protocol=ProtocolVersion.V2,
+        model="test_model",
+        subtype=1,
+        attributes={},
+    )
+
+
+class DeviceManagerTest(IsolatedAsyncioTestCase):
+    """Device manager test case."""
+
+    async def asyncSetUp(self) -> None:
+        """Create the manager."""
+        self.manager = DeviceManager(max_in_flight=2, jitter=0)
+
+    async def asyncTearDown(self) -> None:
+        """Stop the manager."""
+        await self.manager.stop()
+
+    async def test_add_returns_scheduled_device(self) -> None:
+        """Test added devices are wrapped once and leave the timers to us."""
+        device = _device(1)
+        managed = self.manager.add(device)
+        assert self.manager.add(device) is managed
+        assert self.manager.get(1) is managed
+        assert self.manager.devices == [managed]
+        with patch.object(device, "_check_refresh") as check_refresh:
+            managed._service_tick(0)
+        check_refresh.assert_not_called()
+
+    async def test_initial_refreshes_are_spread(self) -> None:
+        """Test devices added together do not refresh at the same time."""
+        now = asyncio.get_running_loop().time()
+        for device_id in range(8):
+            self.manager.add(_device(device_id))
+        due = sorted(
+            entry[0] - now for entry in self.manager._queue if entry[2] == Job.REFRESH
+        )
+        assert len(due) == 8
+        assert all(0 <= delay < 30 for delay in due)
+        gaps = [b - a for a, b in itertools.pairwise(due)]
+        assert min(gaps) > 1
+
+    async def test_refresh_interval_overrides(self) -> None:
+        """Test per-device overrides win over per-type and global intervals."""
+        ac = _device(1)
+        fan = _device(2, DeviceType.FA)
+        self.manager.add(ac)
+        self.manager.add(fan)
+        self.manager.set_refresh_interval(60)
+        assert self.manager.refresh_interval(ac) == 60
+        self.manager.set_refresh_interval(15, device_type=DeviceType.AC)
+        assert self.manager.refresh_interval(ac) == 15
+        assert self.manager.refresh_interval(fan) == 60
+        self.manager.set_refresh_interval(5, device_id=1)
+        assert self.manager.refresh_interval(ac) == 5
+        self.manager.set_refresh_interval(0, device_id=2)
+        refreshes = [
+            entry[3] for entry in self.manager._queue if entry[2] == Job.REFRESH
+        ]
+        assert refreshes == [1]
+
+    async def test_polls_are_capped(self) -> None:
+        """Test no more than max_in_flight polls run at the same time."""
+        in_flight = 0
+        peak = 0
+        polled: set[int] = set()
+
+        async def poll(managed: AsyncMideaDevice) -> None:
+            nonlocal in_flight, peak
+            async with managed._limiter or asyncio.Semaphore():
+                in_flight += 1
+                peak = max(peak, in_flight)
+                polled.add(managed.device_id)
+                await asyncio.sleep(0.3)
+                in_flight -= 1
+
+        for device_id in range(6):
+            self.manager.add(_device(device_id))
+        self.manager.set_refresh_interval(1)
+        with (
+            patch.object(AsyncMideaDevice, "poll", poll),
+            patch.object(AsyncMideaDevice, "open"),
+            patch.object(
+                AsyncMideaDevice,
+                "connected",
+                new_callable=PropertyMock,
+                return_value=True,
+            ),
+            patch.object(MideaDevice, "send_heartbeat"),
+        ):
+            self.manager.start()
+            await asyncio.sleep(1.5)
+        assert polled == set(range(6))
+        assert peak == 2
+
+    async def test_remove(self) -> None:
+        """Test removed devices are closed and unscheduled."""
+        managed = self.manager.add(_device(1))
+        with patch.object(managed, "close") as close:
+            await self.manager.remove(1)
+        close.assert_awaited_once()
+        assert self.manager.get(1) is None
+        assert self.manager._queue == []
+
+    async def test_apply_many(self) -> None:
+        """Test commands fan out across devices and keep their order per device."""
+        applied: list[tuple[int, str, object]] = []
+        in_flight = 0
+        peak = 0
+
+        async def apply(
+            managed: AsyncMideaDevice,
+            attr: str,
+            value: bool | float | str,
+        ) -> bool:
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            if attr == "broken":
+                raise OSError("unreachable")
+            applied.append((managed.device_id, attr, value))
+            return managed.device_id != 3
+
+        device = _device(1)
+        for device_id in (1, 2, 3):
+            self.manager.add(device if device_id == 1 else _device(device_id))
+        commands = [
+            (device, "power", True),
+            (2, "power", True),
+            (1, "target_temperature", 22),
+            (3, "power", True),
+            (2, "broken", 1),
+            (1, "mode", 2),
+        ]
+        with patch.object(AsyncMideaDevice, "apply", apply):
+            results = await self.manager.apply_many(commands, max_in_flight=2)
+        assert [(r.device_id, r.attr, r.value) for r in results] == [
+            (1, "power", True),
+            (2, "power", True),
+            (1, "target_temperature", 22),
+            (3, "power", True),
+            (2, "broken", 1),
+            (1, "mode", 2),
+        ]
+        assert [r.acknowledged for r in results] == [
+            True,
+            True,
+            True,
+            False,
+            False,
+            True,
+        ]
+        assert isinstance(results[4].error, OSError)
+        assert results[0] == CommandResult(1, "power", True, acknowledged=True)
+        assert [a[1] for a in applied if a[0] == 1] == [
+            "power",
+            "target_temperature",
+            "mode",
+        ]
+        assert peak == 2
+        with pytest.raises(ValueError, match="not managed"):
+            await self.manager.apply_many([(4, "power", True)])
@@ -8,6 +8,7 @@ from midealocal.message import (
     BodyType,
     BoolParser,
     FloatParser,
+    HexDump,
     IntEnumParser,
     IntParser,
     ListTypes,
@@ -316,6 +317,7 @@ class TestMessageRequest:
         assert message.body == bytearray([0x01, 0x11, 0x22])
         serialized = message.serialize()
         assert serialized[10:-1] == bytearray([0x01, 0x11, 0x22])
+        assert serialized[-1] == -sum(serialized[1:-1]) & 0xFF
 
 
 class TestMessageQuestCustom:
@@ -355,6 +357,15 @@ class TestMessageQueryAppliance:
         assert "'body_type': '00'" in result
 
 
+def test_hex_dump() -> None:
+    """Test bytes are only formatted when the dump is."""
+    data = bytearray([0xAA, 0x01])
+    dump = HexDump(data)
+    data.append(0xFF)
+    assert str(dump) == "aa01ff"
+    assert "%s" % dump == "aa01ff"  # noqa: UP031
+
+
 class TestMessageBit:
     """Test MessageBit."""
 
@@ -442,15 +453,22 @@ class TestNewProtocolMessageBody:
         assert body.parse() == {}
 
     def test_parse_non_standard_short_body(self) -> None:
-        """Test parse with a body too short to hold the param count.
-
-        Source quirk (midealocal/message.py:886-898): the IndexError handler
-        leaves `param_count` unbound, so the debug log after the handler
-        raises UnboundLocalError instead of returning an empty result.
-        """
+        """Test parse with a body too short to hold the param count."""
         body = NewProtocolMessageBody(bytearray([0xB1]), ListTypes.B5)
-        with pytest.raises(UnboundLocalError):
-            body.parse()
+        assert body.parse() == {}
+        assert body.index() == {}
+
+    def test_index(self) -> None:
+        """Test index returns read-only views of the asked params."""
+        # 0x0001 = aabb, 0x0002 without value, 0x0003 = cc
+        data = bytearray.fromhex("b103010002aabb020000030001cc")
+        body = NewProtocolMessageBody(data, ListTypes.B5)
+        params = body.index()
+        assert params == {0x0001: b"\xaa\xbb", 0x0003: b"\xcc"}
+        assert params[0x0001].obj is data
+        assert params[0x0001].readonly
+        assert body.index((0x0003, 0x0004)) == {0x0003: b"\xcc"}
+        assert isinstance(body.parse()[0x0001], bytearray)
 
 
 class TestMessageResponse:
@@ -474,6 +492,17 @@ class TestMessageResponse:
         assert response.device_type == DeviceType.AC
         assert response.protocol_version == 3
 
+    def test_str(self) -> None:
+        """Test header and body are formatted once, as their properties."""
+        message = bytearray(
+            [0xAA, 0x0C, 0xAC, 0x00, 0x00, 0x00, 0x00, 0x00, 0x03, 0xA0, 0xC0, 0x00],
+        )
+        result = str(MessageApplianceResponse(message))
+        assert f"'header': '{message[:10].hex()}'" in result
+        assert "'body': 'c0'" in result
+        assert "'_header'" not in result
+        assert "'_body'" not in result
+
     def test_set_body_and_set_attr(self) -> None:
         """Test set_body replaces the body and set_attr copies its attrs."""
         message = bytearray(
@@ -487,3 +516,28 @@ class TestMessageResponse:
         response.set_attr()
         assert response.body == bytearray([0xC0, 0x01])
         assert getattr(response, "power", False) is True
+
+    def test_set_attr_takes_over_body_attrs(self) -> None:
+        """Test set_attr moves the body attrs, the body ones win on conflicts."""
+        message = bytearray(
+            [0xAA, 0x0C, 0xAC, 0x00, 0x00, 0x00, 0x00, 0x00, 0x03, 0xA0, 0xC0, 0x00],
+        )
+        response = MessageApplianceResponse(message)
+        response.mode = 1
+        response.power = False
+        body = MessageBody(bytearray([0xC0, 0x01]))
+        body.power = True
+        response.set_body(body)
+        response.set_attr()
+        assert (response.mode, response.power) == (1, True)
+        assert response.body_type == ListTypes.C0
+        assert vars(body) == {"_data": body.data, "parser_list": []}
+        # properties of the response are still set through their setters
+        response = MessageApplianceResponse(message)
+        body = MessageBody(bytearray([0xC0, 0x01]))
+        body.protocol_version = 2
+        body.power = True
+        response.set_body(body)
+        response.set_attr()
+        assert response.protocol_version == 2
+        assert response.power is True
@@ -25,6 +25,16 @@ class TestPacketBuilder:
         # the encrypted command round trips back to the original command
         assert LocalSecurity().aes_decrypt(packet[40:-16]) == command
 
+    def test_finalize_encrypted_command(self) -> None:
+        """Test finalize with an already encrypted command."""
+        command = bytearray([0xAA, 0x20, 0xAC] + [0x00] * 10)
+        encrypted = LocalSecurity().aes_encrypt(command)
+        packet = PacketBuilder(1, encrypted, encrypted=True).finalize()
+
+        assert packet[40:-16] == encrypted
+        assert int.from_bytes(packet[4:6], "little") == len(packet)
+        assert packet[-16:] == LocalSecurity().encode32_data(packet[:-16])
+
     def test_finalize_other_message_type(self) -> None:
         """Test finalize with a non-default message type."""
         builder = PacketBuilder(1, bytearray([0xAA]))
@@ -0,0 +1,153 @@
+"""Midea local replay test."""
+
+import json
+import os
+import struct
+from hashlib import sha256
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import pytest
+
+from midealocal.const import ProtocolVersion
+from midealocal.devices.ac import MideaACDevice
+from midealocal.packet_builder import PacketBuilder
+from midealocal.replay import (
+    DEVICE_PORT,
+    read_capture,
+    read_pcap,
+    replay,
+)
+from midealocal.security import MSGTYPE_ENCRYPTED_RESPONSE, LocalSecurity
+
+# AC 0xC0 status response: power on, cool, 24.5 degrees
+STATUS = bytearray([0xAA, 0x21, 0xAC, 0, 0, 0, 0, 0, 0x03, 0x03]) + bytearray(
+    [0xC0, 0x01, 0x58, 0x66] + [0x00] * 20,
+)
+
+
+def _device(protocol: ProtocolVersion, key: str = "") -> MideaACDevice:
+    return MideaACDevice(
+        name="Replay",
+        device_id=1,
+        ip_address="127.0.0.1",
+        port=DEVICE_PORT,
+        token="00" * 64,
+        key=key,
+        device_protocol=protocol,
+        model="",
+        subtype=0,
+        customize="",
+    )
+
+
+def _packet() -> bytes:
+    return PacketBuilder(1, STATUS).finalize(msg_type=1)
+
+
+def _tcp(
+    seq: int,
+    payload: bytes,
+    flags: int = 0x18,
+    sport: int = DEVICE_PORT,
+) -> bytes:
+    tcp = struct.pack(">HHIIBBHHH", sport, 50000, seq, 0, 5 << 4, flags, 0, 0, 0)
+    total = 20 + len(tcp) + len(payload)
+    ip = struct.pack(
+        ">BBHHHBBH4s4s",
+        0x45,
+        0,
+        total,
+        0,
+        0,
+        64,
+        6,
+        0,
+        b"\x01" * 4,
+        b"\x02" * 4,
+    )
+    return b"\x00" * 12 + b"\x08\x00" + ip + tcp + payload
+
+
+def _pcap(path: Path, frames: list[bytes]) -> None:
+    data = struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1)
+    for frame in frames:
+        data += struct.pack("<IIII", 0, 0, len(frame), len(frame)) + frame
+    path.write_bytes(data)
+
+
+def test_replay_v2() -> None:
+    """Test V2 frames split over chunks go through the whole pipeline."""
+    packet = _packet()
+    streams = [[packet[:30], packet[30:] + packet], [packet]]
+    device = _device(ProtocolVersion.V2)
+    report = replay(device, streams, repeat=2)
+    assert report.chunks == 6
+    assert report.frames == 6
+    assert report.frames_per_second > 0
+    assert len(report.stages["parse_message"].samples) == 6
+    assert len(report.stages["aes_decrypt"].samples) == 6
+    assert not report.stages["decode_8370_frames"].samples
+    assert report.stages["process_message"].p50 > 0
+    assert report.allocated_per_frame > 0
+    assert device.attributes["target_temperature"] == 24.5
+    # the instrumentation is removed
+    assert "parse_message" not in vars(device)
+    assert len(report.lines()) == 2 + 5
+
+
+def test_replay_v3() -> None:
+    """Test the handshake response of a V3 stream gives the session key."""
+    key = os.urandom(32)
+    plain = os.urandom(32)
+    security = LocalSecurity()
+    handshake = bytes(8) + security.aes_cbc_encrypt(plain, key) + sha256(plain).digest()
+    security.tcp_key(handshake[8:72], key)
+    frame = security.encode_8370(_packet(), MSGTYPE_ENCRYPTED_RESPONSE)
+    device = _device(ProtocolVersion.V3, key.hex())
+    report = replay(device, [[handshake, frame, frame]], trace_allocations=False)
+    assert report.chunks == 2
+    assert report.frames == 2
+    assert len(report.stages["decode_8370_frames"].samples) == 2
+    assert report.allocated_per_frame == 0
+    assert device.attributes["power"] is True
+
+
+def test_read_jsonl() -> None:
+    """Test JSON lines are grouped by stream, sent data is skipped."""
+    with TemporaryDirectory() as tmp:
+        path = Path(tmp, "capture.jsonl")
+        lines = [
+            {"data": "aa01"},
+            {"data": "ff", "direction": "out"},
+            {"data": "bb", "stream": 1},
+            {"data": "aa02", "direction": "in"},
+        ]
+        path.write_text("\n".join(json.dumps(line) for line in lines) + "\n\n")
+        assert read_capture(path) == [[b"\xaa\x01", b"\xaa\x02"], [b"\xbb"]]
+
+
+def test_read_pcap() -> None:
+    """Test TCP payloads of the device are reassembled per connection."""
+    with TemporaryDirectory() as tmp:
+        path = Path(tmp, "capture.pcap")
+        _pcap(
+            path,
+            [
+                _tcp(99, b"", flags=0x12),
+                _tcp(100, b"abc"),
+                _tcp(100, b"abc"),  # retransmitted
+                _tcp(101, b"bcde"),  # partly retransmitted
+                _tcp(5, b"to device", sport=50000),
+                _tcp(200, b"", flags=0x12),  # new connection
+                _tcp(201, b"xyz"),
+            ],
+        )
+        assert read_pcap(path) == [[b"abc", b"de"], [b"xyz"]]
+        assert read_capture(path, port=1) == []
+        path.write_bytes(b"\x0a\x0d\x0d\x0a" + bytes(28))
+        with pytest.raises(ValueError, match="pcapng"):
+            read_pcap(path)
+        path.write_bytes(bytes(28))
+        with pytest.raises(ValueError, match="not a pcap"):
+            read_pcap(path)
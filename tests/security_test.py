@@ -3,6 +3,7 @@
 from hashlib import sha256
 
 import pytest
+from Crypto.Cipher import AES
 from Crypto.Util.strxor import strxor
 
 from midealocal.const import MAX_DOUBLE_BYTE_VALUE
@@ -16,12 +17,81 @@ from midealocal.exceptions import (
 from midealocal.security import (
     MSGTYPE_ENCRYPTED_REQUEST,
     MSGTYPE_HANDSHAKE_REQUEST,
+    CbcCipher,
     CloudSecurity,
     LocalSecurity,
     MeijuCloudSecurity,
     MideaAirSecurity,
     MSmartCloudSecurity,
+    StreamDecryptor,
 )
+from midealocal.stream import StreamBuffer
+
+
+class TestCbcCipher:
+    """Test CbcCipher."""
+
+    def test_matches_fresh_cipher_per_message(self) -> None:
+        """Test every message is encrypted as if by a new CBC cipher."""
+        key = bytes(range(16))
+        iv = bytes(range(16, 32))
+        cipher = CbcCipher(key, iv)
+        for size in (16, 48, 16, 96):
+            data = bytes(range(size))
+            encrypted = AES.new(key, AES.MODE_CBC, iv=iv).encrypt(data)
+            assert cipher.encrypt(data) == encrypted
+            assert cipher.decrypt(encrypted) == data
+            assert cipher.decrypt(memoryview(encrypted)) == data
+
+    def test_empty_message(self) -> None:
+        """Test empty messages are passed through."""
+        cipher = CbcCipher(bytes(16), bytes(16))
+        assert cipher.encrypt(b"") == b""
+        assert cipher.decrypt(b"") == b""
+
+    def test_wrong_length(self) -> None:
+        """Test messages must be a multiple of the block size."""
+        cipher = CbcCipher(bytes(16), bytes(16))
+        with pytest.raises(ValueError, match="16 byte boundary"):
+            cipher.encrypt(bytes(20))
+        # the chaining is left untouched
+        assert cipher.encrypt(bytes(16)) == AES.new(bytes(16), AES.MODE_ECB).encrypt(
+            bytes(16),
+        )
+
+
+class TestStreamDecryptor:
+    """Test StreamDecryptor."""
+
+    @pytest.mark.parametrize(
+        "security",
+        [
+            MeijuCloudSecurity("login_key", "iot_key", "hmac_key"),
+            MSmartCloudSecurity("login_key", "iot_key", "hmac_key"),
+        ],
+    )
+    def test_matches_whole_decrypt(self, security: CloudSecurity) -> None:
+        """Test chunked decryption matches decrypting the whole text."""
+        plain = bytes(range(256)) * 3 + b"tail"
+        encrypted = security.aes_encrypt_with_fixed_key(plain).hex()
+        for size in (1, 7, 32, 33, 1000):
+            decryptor = security.fixed_key_decryptor()
+            data = b"".join(
+                decryptor.update(encrypted[i : i + size])
+                for i in range(0, len(encrypted), size)
+            )
+            assert data + decryptor.finalize() == plain
+
+    def test_empty_and_truncated(self) -> None:
+        """Test empty text and text cut inside a block."""
+        decryptor = StreamDecryptor(bytes(16))
+        assert decryptor.update("") == b""
+        assert decryptor.finalize() == b""
+        decryptor.update("00" * 17)
+        with pytest.raises(ValueError, match="block size"):
+            decryptor.finalize()
+        with pytest.raises(ValueError, match="need a key"):
+            CloudSecurity("login_key", None, None).fixed_key_decryptor()
 
 
 class TestCloudSecurity:
@@ -278,6 +348,19 @@ class TestLocalSecurity:
         assert incomplete == b"\x83"
         assert self.security._response_count == 1
 
+    def test_decode_8370_frames_back_to_back(self) -> None:
+        """Test many back-to-back frames are decoded from the stream buffer."""
+        self._authenticate()
+        data = bytes(range(20))
+        packet = self.security.encode_8370(data, MSGTYPE_ENCRYPTED_REQUEST)
+        buffer = StreamBuffer()
+        buffer.feed(packet * 2000 + packet[:10])
+        assert self.security.decode_8370_frames(buffer) == [data] * 2000
+        assert bytes(buffer) == packet[:10]
+        buffer.feed(packet[10:])
+        assert self.security.decode_8370_frames(buffer) == [data]
+        assert len(buffer) == 0
+
     def test_decode_8370_short_data(self) -> None:
         """Test decoding data shorter than the minimum length."""
         assert self.security.decode_8370(b"\x83\x70") == ([], b"\x83\x70")
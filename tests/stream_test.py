@@ -0,0 +1,73 @@
+"""Midea local stream reassembly buffer test."""
+
+import socket
+
+from midealocal.device import MideaDevice
+from midealocal.stream import StreamBuffer
+
+
+def test_feed_view_consume() -> None:
+    """Test pending bytes are read by view and dropped by offset."""
+    buffer = StreamBuffer(8)
+    buffer.feed(b"\x01\x02\x03")
+    buffer.feed(b"\x04")
+    assert len(buffer) == 4
+    assert buffer.view() == b"\x01\x02\x03\x04"
+    buffer.consume(1)
+    assert bytes(buffer) == b"\x02\x03\x04"
+    assert buffer.hex() == "020304"
+    buffer.consume(10)
+    assert len(buffer) == 0
+    buffer.feed(b"\x05")
+    buffer.clear()
+    assert bytes(buffer) == b""
+
+
+def test_compact_and_grow() -> None:
+    """Test the consumed prefix is reused and the storage grows as needed."""
+    buffer = StreamBuffer(8)
+    buffer.feed(b"\x00" * 6)
+    buffer.consume(5)
+    view = buffer.view()
+    buffer.feed(b"\x01" * 6)  # fits after compaction
+    assert bytes(buffer) == b"\x00" + b"\x01" * 6
+    buffer.feed(b"\x02" * 20)  # does not fit, grows
+    assert bytes(buffer) == b"\x00" + b"\x01" * 6 + b"\x02" * 20
+    # views handed out before growing stay usable
+    assert len(view) == 1
+
+
+def test_recv_into() -> None:
+    """Test bytes are received straight into the buffer."""
+    left, right = socket.socketpair()
+    with left, right:
+        buffer = StreamBuffer(4)
+        left.sendall(b"\x01" * 600)
+        received = 0
+        while received < 600:
+            received += buffer.recv_into(right)
+        assert bytes(buffer) == b"\x01" * 600
+        left.close()
+        assert buffer.recv_into(right) == 0
+
+
+def test_buffered_protocol_hooks() -> None:
+    """Test get_buffer/buffer_updated commit the written bytes."""
+    buffer = StreamBuffer()
+    free = buffer.get_buffer(-1)
+    assert len(free) >= 512
+    free[:2] = b"\xaa\xbb"
+    buffer.buffer_updated(2)
+    assert bytes(buffer) == b"\xaa\xbb"
+
+
+def test_fetch_v2_frames_back_to_back() -> None:
+    """Test many back-to-back frames are split without recursion."""
+    frame = bytes([0x5A, 0x5A, 0x01, 0x11, 0x08, 0x00, 0x00, 0x00])
+    buffer = StreamBuffer()
+    buffer.feed(frame * 5000 + frame[:3])
+    assert MideaDevice.fetch_v2_frames(buffer) == [frame] * 5000
+    assert bytes(buffer) == frame[:3]
+    buffer.feed(frame[3:])
+    assert MideaDevice.fetch_v2_frames(buffer) == [frame]
+    assert len(buffer) == 0